@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...core.auth import CurrentUser, authenticate, create_access_token, hash_password, require_user
+from ...core.database import get_async_db
+from ...models.user import LoginRequest, Token, User, UserCreate, UserResponse
+
+router = APIRouter(prefix="/auth", tags=["auth"])
+
+def _issue_token(user: User) -> Token:
+    access_token, expires_in = create_access_token(user.id)
+    return Token(access_token=access_token, expires_in=expires_in)
+
+async def _login(email: str, password: str) -> Token:
+    user = await authenticate(email, password)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return _issue_token(user)
+
+@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+async def register(
+    account: UserCreate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create an account; its rows are separate from the local profile's"""
+    email = account.email.lower()
+    # Hash before touching the session, so the writer connection is not held meanwhile
+    hashed_password = await hash_password(account.password)
+    if await db.scalar(select(User.id).where(User.email == email)) is not None:
+        raise HTTPException(status_code=409, detail="Email already registered")
+
+    user = User(email=email, full_name=account.full_name, hashed_password=hashed_password)
+    db.add(user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="Email already registered")
+    await db.refresh(user)
+    return user
+
+@router.post("/token", response_model=Token)
+async def login_for_access_token(form: OAuth2PasswordRequestForm = Depends()):
+    """OAuth2 password flow: exchange the email (as ``username``) and password for a bearer token"""
+    return await _login(form.username, form.password)
+
+@router.post("/login", response_model=Token)
+async def login(credentials: LoginRequest):
+    """Exchange an email and password for a bearer token"""
+    return await _login(credentials.email, credentials.password)
+
+@router.get("/me", response_model=UserResponse)
+async def read_current_user(user: CurrentUser = Depends(require_user)):
+    """The account the bearer token belongs to"""
+    return user
@@ -1,84 +1,310 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime, date
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, Query, Response, status
+from sqlalchemy import delete, insert, null, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+from datetime import datetime, date, time, timezone
+import heapq
 
-from ...core.database import get_db
-from ...models.calendar_event import CalendarEvent, CalendarEventCreate, CalendarEventResponse
+from ...core.auth import CurrentUser, current_user, owned_by, owner_id
+from ...core.database import get_async_db, get_async_read_db
+from ...core.etag import collection_etag, conditional_get, row_etag
+from ...core.pagination import NEXT_CURSOR_HEADER, CursorQuery, decode_cursor, encode_cursor, keyset_page
+from ...core.recurrence import MAX_OCCURRENCES, expand, load_occurrences, occurrence_starts, recurrence_end
+from ...core.response_cache import cached_response
+from ...core.serialization import records_response, response_columns
+from ...core.streaming import export_response, import_ndjson
+from ...models.bulk import MAX_BULK_ITEMS, BulkCreateResponse, BulkDeleteResponse, BulkIds, ImportResponse
+from ...models.calendar_event import (
+    BusyBlock,
+    CalendarEvent,
+    CalendarEventCreate,
+    CalendarEventResponse,
+    CalendarOccurrence,
+    FreeBusyResponse,
+    SERIES_TIME_COLUMNS,
+    overlapping,
+)
+from ...models.calendar_event_exception import (
+    CalendarEventException,
+    CalendarEventExceptionResponse,
+    CalendarOccurrenceUpdate,
+)
 
 router = APIRouter(prefix="/calendar", tags=["calendar"])
 
-@router.get("/", response_model=List[CalendarEventResponse])
+_EVENT_COLUMNS = response_columns(CalendarEvent, CalendarEventResponse)
+_calendar_etag = Depends(collection_etag(CalendarEvent, CalendarEventException))
+
+def _naive_utc(value: datetime) -> datetime:
+    """Event times are stored as naive UTC"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+async def _get_event_or_404(db: AsyncSession, event_id: int, user: Optional[CurrentUser]) -> CalendarEvent:
+    event = await db.get(CalendarEvent, event_id)
+    # Other users' events are reported missing, not forbidden
+    if event is None or event.user_id != owner_id(user):
+        raise HTTPException(status_code=404, detail="Calendar event not found")
+    return event
+
+@router.get("/", response_model=List[CalendarOccurrence], dependencies=[_calendar_etag])
+@cached_response(CalendarEvent, CalendarEventException)
 async def get_calendar_events(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     start_date: date = None,
     end_date: date = None,
-    db: Session = Depends(get_db)
+    mode: Literal["contained", "overlap"] = Query(
+        "contained",
+        description="contained: events lying within the dates; overlap: events intersecting [start_date, end_date)",
+    ),
+    cursor: Optional[str] = CursorQuery,
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    """Get calendar events with optional date filtering"""
-    query = db.query(CalendarEvent)
+    """Get calendar events ordered by (start_time, id), with optional date filtering and keyset pagination.
     
-    if start_date:
-        query = query.filter(CalendarEvent.start_time >= start_date)
-    if end_date:
-        query = query.filter(CalendarEvent.end_time <= end_date)
+    Recurring series are returned as their occurrences, expanded for the requested page only.
+    """
+    window_start = datetime.combine(start_date, time.min) if start_date else None
+    window_end = datetime.combine(end_date, time.min) if end_date else None
+    owned = owned_by(CalendarEvent, user)
+    query = select(*_EVENT_COLUMNS, null().label("recurrence_id")).where(CalendarEvent.rrule.is_(None))
     
-    events = query.offset(skip).limit(limit).all()
-    return events
+    if mode == "overlap" and (window_start or window_end):
+        # The R*Tree drives this query, so the owner must not be index-usable
+        query = overlapping(query, window_start, window_end).where(owned_by(CalendarEvent, user, indexed=False))
+    else:
+        query = query.where(owned)
+        if start_date:
+            query = query.where(CalendarEvent.start_time >= start_date)
+        if end_date:
+            query = query.where(CalendarEvent.end_time <= end_date)
+    
+    position = decode_cursor(cursor) if cursor is not None else None
+    wanted = limit if cursor is not None else skip + limit
+    occurrences = await load_occurrences(
+        db, _EVENT_COLUMNS, window_start, window_end, mode == "contained", position, max(wanted, 0), where=[owned],
+    )
+    
+    if cursor is not None:
+        query = keyset_page(query, CalendarEvent.start_time, CalendarEvent.id, cursor, limit)
+    elif occurrences:
+        query = query.order_by(CalendarEvent.start_time, CalendarEvent.id).limit(skip + limit)
+    else:
+        query = query.order_by(CalendarEvent.start_time, CalendarEvent.id).offset(skip).limit(limit)
+    events = [row._asdict() for row in (await db.execute(query))]
+    
+    if occurrences:
+        key = lambda event: (event["start_time"], event["id"])
+        events = list(heapq.merge(events, occurrences, key=key))[skip if cursor is None else 0:][:limit]
+    if cursor is not None and limit > 0 and len(events) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(events[-1]["start_time"], events[-1]["id"])
+    return records_response(events, response)
+
+@router.get("/freebusy", response_model=FreeBusyResponse, dependencies=[_calendar_etag])
+async def get_free_busy(
+    start: datetime,
+    end: datetime,
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Merged busy blocks within [start, end), computed from event times only"""
+    start, end = _naive_utc(start), _naive_utc(end)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    
+    query = overlapping(select(CalendarEvent.start_time, CalendarEvent.end_time), start, end)
+    query = query.where(owned_by(CalendarEvent, user, indexed=False), CalendarEvent.rrule.is_(None))
+    result = await db.execute(query.order_by(CalendarEvent.start_time))
+    occurrences = await load_occurrences(db, SERIES_TIME_COLUMNS, start, end, where=[owned_by(CalendarEvent, user)])
+    blocks = heapq.merge(map(tuple, result), ((occurrence["start_time"], occurrence["end_time"]) for occurrence in occurrences))
+    
+    busy: List[BusyBlock] = []
+    for block_start, block_end in blocks:
+        block_start, block_end = max(block_start, start), min(block_end, end)
+        if busy and block_start <= busy[-1].end:
+            busy[-1].end = max(busy[-1].end, block_end)
+        else:
+            busy.append(BusyBlock(start=block_start, end=block_end))
+    return FreeBusyResponse(start=start, end=end, busy=busy)
 
 @router.post("/", response_model=CalendarEventResponse)
 async def create_calendar_event(
     event: CalendarEventCreate,
-    db: Session = Depends(get_db)
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new calendar event"""
-    db_event = CalendarEvent(**event.dict())
+    db_event = CalendarEvent(**event.dict(), user_id=owner_id(user))
     db.add(db_event)
-    db.commit()
-    db.refresh(db_event)
+    await db.commit()
+    await db.refresh(db_event)
     return db_event
 
+@router.post("/bulk", response_model=BulkCreateResponse)
+async def create_calendar_events_bulk(
+    events: List[CalendarEventCreate] = Body(..., min_length=1, max_length=MAX_BULK_ITEMS),
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create many calendar events in one transaction, returning their ids in request order"""
+    result = await db.scalars(
+        insert(CalendarEvent).returning(CalendarEvent.id, sort_by_parameter_order=True),
+        [{**event.dict(), "user_id": owner_id(user)} for event in events],
+    )
+    ids = result.all()
+    await db.commit()
+    return BulkCreateResponse(ids=ids)
+
+@router.post("/bulk/delete", response_model=BulkDeleteResponse)
+async def delete_calendar_events_bulk(
+    bulk: BulkIds,
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Delete many calendar events by id"""
+    ids = (await db.scalars(select(CalendarEvent.id).where(CalendarEvent.id.in_(bulk.ids), owned_by(CalendarEvent, user)))).all()
+    await db.execute(delete(CalendarEventException).where(CalendarEventException.event_id.in_(ids)))
+    result = await db.execute(
+        delete(CalendarEvent).where(CalendarEvent.id.in_(ids)).execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return BulkDeleteResponse(deleted=result.rowcount)
+
+@router.get("/export")
+async def export_calendar_events(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    user: Optional[CurrentUser] = Depends(current_user)
+):
+    """Stream all calendar events as NDJSON (default) or CSV"""
+    return export_response(CalendarEvent, CalendarEventResponse, format, "calendar_events", owned_by(CalendarEvent, user))
+
+@router.post("/import", response_model=ImportResponse)
+async def import_calendar_events(request: Request, user: Optional[CurrentUser] = Depends(current_user)):
+    """Import calendar events from an NDJSON request body in batched transactions"""
+    return ImportResponse(imported=await import_ndjson(
+        request, CalendarEvent, CalendarEventCreate, values={"user_id": owner_id(user)},
+    ))
+
 @router.get("/{event_id}", response_model=CalendarEventResponse)
 async def get_calendar_event(
     event_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get a specific calendar event by ID"""
-    event = db.query(CalendarEvent).filter(CalendarEvent.id == event_id).first()
-    if event is None:
-        raise HTTPException(status_code=404, detail="Calendar event not found")
+    event = await _get_event_or_404(db, event_id, user)
+    conditional_get(request, response, row_etag(event))
     return event
 
 @router.put("/{event_id}", response_model=CalendarEventResponse)
 async def update_calendar_event(
     event_id: int,
     event_update: CalendarEventCreate,
-    db: Session = Depends(get_db)
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Update a calendar event"""
-    event = db.query(CalendarEvent).filter(CalendarEvent.id == event_id).first()
-    if event is None:
-        raise HTTPException(status_code=404, detail="Calendar event not found")
+    """Update a calendar event; changing a series' rule or first start drops its exceptions"""
+    event = await _get_event_or_404(db, event_id, user)
+    rule = (event.rrule, event.start_time)
     
     for key, value in event_update.dict(exclude_unset=True).items():
         setattr(event, key, value)
+    try:
+        # The stored rule was only checked against the stored start
+        event.recurrence_end = recurrence_end(event.rrule, event.start_time, event.end_time)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     event.updated_at = datetime.utcnow()
+    if (event.rrule, event.start_time) != rule:
+        await db.execute(delete(CalendarEventException).where(CalendarEventException.event_id == event_id))
     
-    db.commit()
-    db.refresh(event)
+    await db.commit()
+    await db.refresh(event)
     return event
 
 @router.delete("/{event_id}")
 async def delete_calendar_event(
     event_id: int,
-    db: Session = Depends(get_db)
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Delete a calendar event"""
-    event = db.query(CalendarEvent).filter(CalendarEvent.id == event_id).first()
-    if event is None:
-        raise HTTPException(status_code=404, detail="Calendar event not found")
+    """Delete a calendar event, with all occurrences if it is a series"""
+    event = await _get_event_or_404(db, event_id, user)
     
-    db.delete(event)
-    db.commit()
-    return {"message": "Calendar event deleted successfully"}
\ No newline at end of file
+    await db.execute(delete(CalendarEventException).where(CalendarEventException.event_id == event_id))
+    await db.delete(event)
+    await db.commit()
+    return {"message": "Calendar event deleted successfully"}
+
+async def _get_series_or_404(db: AsyncSession, event_id: int, user: Optional[CurrentUser]) -> CalendarEvent:
+    event = await _get_event_or_404(db, event_id, user)
+    if event.rrule is None:
+        raise HTTPException(status_code=400, detail="Calendar event is not recurring")
+    return event
+
+@router.get("/{event_id}/occurrences", response_model=List[CalendarOccurrence])
+async def get_calendar_event_occurrences(
+    event_id: int,
+    start: datetime,
+    end: datetime,
+    limit: int = Query(500, ge=1, le=MAX_OCCURRENCES),
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Occurrences of a recurring event intersecting [start, end), with exceptions applied"""
+    start, end = _naive_utc(start), _naive_utc(end)
+    event = await _get_series_or_404(db, event_id, user)
+    series = {column.key: getattr(event, column.key) for column in _EVENT_COLUMNS}
+    exceptions = await db.scalars(select(CalendarEventException).where(CalendarEventException.event_id == event_id))
+    return expand([series], exceptions, start, end, limit=limit)
+
+async def _set_exception(db: AsyncSession, event: CalendarEvent, recurrence_id: datetime, **values) -> CalendarEventException:
+    recurrence_id = _naive_utc(recurrence_id)
+    if occurrence_starts(event.rrule, event.start_time, recurrence_id, recurrence_id, 1) != (recurrence_id,):
+        raise HTTPException(status_code=404, detail="No occurrence starts at this time")
+    exception = await db.scalar(select(CalendarEventException).where(
+        CalendarEventException.event_id == event.id, CalendarEventException.original_start == recurrence_id,
+    ))
+    if exception is None:
+        exception = CalendarEventException(event_id=event.id, original_start=recurrence_id)
+        db.add(exception)
+    for key, value in values.items():
+        setattr(exception, key, value)
+    exception.updated_at = datetime.utcnow()
+    await db.commit()
+    await db.refresh(exception)
+    return exception
+
+@router.put("/{event_id}/occurrences/{recurrence_id}", response_model=CalendarEventExceptionResponse)
+async def update_calendar_event_occurrence(
+    event_id: int,
+    recurrence_id: datetime,
+    update: CalendarOccurrenceUpdate,
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Override or cancel the occurrence originally starting at ``recurrence_id``; null fields keep the series' values"""
+    event = await _get_series_or_404(db, event_id, user)
+    values = update.dict()
+    for key in ("start_time", "end_time"):
+        if values[key] is not None:
+            values[key] = _naive_utc(values[key])
+    return await _set_exception(db, event, recurrence_id, **values)
+
+@router.delete("/{event_id}/occurrences/{recurrence_id}")
+async def cancel_calendar_event_occurrence(
+    event_id: int,
+    recurrence_id: datetime,
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Cancel one occurrence of a recurring event"""
+    event = await _get_series_or_404(db, event_id, user)
+    await _set_exception(db, event, recurrence_id, cancelled=True)
+    return {"message": "Occurrence cancelled successfully"}
@@ -0,0 +1,282 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, List, Optional, Tuple
+from datetime import datetime
+import asyncio
+import json
+import logging
+import time
+import uuid
+
+from ...core.completion import CompletionBackend, PromptMessage, get_completion_backend
+from ...core.database import AsyncReadSessionLocal, AsyncSessionLocal, get_async_db, get_async_read_db
+from ...core.etag import collection_etag
+from ...core.pagination import NEXT_CURSOR_HEADER, CursorQuery, keyset_page, next_cursor
+from ...models.chat_message import (
+    ChatCompletionRequest,
+    ChatContextResponse,
+    ChatMessage,
+    ChatMessageCreate,
+    ChatMessageResponse,
+    ChatThread,
+    ChatThreadResponse,
+    thread_title,
+)
+
+router = APIRouter(prefix="/chat", tags=["chat"])
+
+logger = logging.getLogger(__name__)
+
+# Context retrieval walks (created_at, id, token_count) newest first in chunks of
+# this size and stops once the budget is spent, so its cost follows the budget
+# rather than the length of the thread
+_CONTEXT_CHUNK = 64
+
+# Upper bound on how many messages a completion prompt is built from
+_PROMPT_MESSAGES = 200
+
+async def _get_thread_or_404(db: AsyncSession, thread_id: str) -> ChatThread:
+    thread = await db.scalar(select(ChatThread).where(ChatThread.thread_id == thread_id))
+    if thread is None:
+        raise HTTPException(status_code=404, detail="Chat thread not found")
+    return thread
+
+async def _context_messages(
+    db: AsyncSession, thread_id: str, max_tokens: int, max_messages: int
+) -> Tuple[List[ChatMessage], int, bool]:
+    """Most recent messages within the budget (oldest first), their token total and whether any were left out"""
+    selected: List[int] = []
+    total = 0
+    truncated = False
+    position = None
+    while True:
+        # One row past the message cap is enough to tell whether anything was left out
+        chunk = min(_CONTEXT_CHUNK, max_messages - len(selected) + 1)
+        query = (
+            select(ChatMessage.id, ChatMessage.created_at, ChatMessage.token_count)
+            .where(ChatMessage.thread_id == thread_id)
+            .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+            .limit(chunk)
+        )
+        if position is not None:
+            query = query.where(tuple_(ChatMessage.created_at, ChatMessage.id) < tuple_(*position))
+        rows = (await db.execute(query)).all()
+        for row in rows:
+            tokens = row.token_count or 0
+            if len(selected) == max_messages or total + tokens > max_tokens:
+                truncated = True
+                break
+            selected.append(row.id)
+            total += tokens
+        if truncated or len(rows) < chunk:
+            break
+        position = (rows[-1].created_at, rows[-1].id)
+
+    result = await db.scalars(
+        select(ChatMessage).where(ChatMessage.id.in_(selected)).order_by(ChatMessage.created_at, ChatMessage.id)
+    )
+    return result.all(), total, truncated
+
+async def _append_message(
+    db: AsyncSession, thread_id: Optional[str], content: str, role: str, is_ai_response: bool = False
+) -> ChatMessage:
+    """Add a message and bring its thread's summary up to date, starting the thread if needed; the caller commits"""
+    now = datetime.utcnow()
+    thread_id = thread_id or uuid.uuid4().hex
+
+    thread = await db.scalar(select(ChatThread).where(ChatThread.thread_id == thread_id))
+    if thread is None:
+        thread = ChatThread(thread_id=thread_id, title=thread_title(content), message_count=0, created_at=now)
+        db.add(thread)
+    thread.message_count += 1
+    thread.last_message_at = now
+
+    message = ChatMessage(content=content, role=role, thread_id=thread_id, is_ai_response=is_ai_response, created_at=now)
+    db.add(message)
+    return message
+
+@router.get("/threads", response_model=List[ChatThreadResponse], dependencies=[Depends(collection_etag(ChatThread))])
+async def get_chat_threads(
+    response: Response,
+    skip: int = 0,
+    limit: int = 50,
+    cursor: Optional[str] = CursorQuery,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """List conversation threads, most recently active first"""
+    query = select(ChatThread)
+    if cursor is None:
+        query = query.order_by(ChatThread.last_message_at.desc(), ChatThread.id.desc())
+        result = await db.scalars(query.offset(skip).limit(limit))
+        return result.all()
+
+    query = keyset_page(query, ChatThread.last_message_at, ChatThread.id, cursor, limit, descending=True)
+    threads = (await db.scalars(query)).all()
+    token = next_cursor(threads, "last_message_at", limit)
+    if token:
+        response.headers[NEXT_CURSOR_HEADER] = token
+    return threads
+
+@router.get("/threads/{thread_id}", response_model=ChatThreadResponse, dependencies=[Depends(collection_etag(ChatThread))])
+async def get_chat_thread(
+    thread_id: str,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get a thread's summary"""
+    return await _get_thread_or_404(db, thread_id)
+
+@router.get(
+    "/threads/{thread_id}/messages",
+    response_model=List[ChatMessageResponse],
+    dependencies=[Depends(collection_etag(ChatMessage))],
+)
+async def get_chat_history(
+    thread_id: str,
+    response: Response,
+    skip: int = 0,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = CursorQuery,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Thread history newest first, with offset or keyset (created_at, id) pagination"""
+    await _get_thread_or_404(db, thread_id)
+    query = select(ChatMessage).where(ChatMessage.thread_id == thread_id)
+    if cursor is None:
+        query = query.order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+        result = await db.scalars(query.offset(skip).limit(limit))
+        return result.all()
+
+    query = keyset_page(query, ChatMessage.created_at, ChatMessage.id, cursor, limit, descending=True)
+    messages = (await db.scalars(query)).all()
+    token = next_cursor(messages, "created_at", limit)
+    if token:
+        response.headers[NEXT_CURSOR_HEADER] = token
+    return messages
+
+@router.get(
+    "/threads/{thread_id}/context",
+    response_model=ChatContextResponse,
+    dependencies=[Depends(collection_etag(ChatMessage))],
+)
+async def get_chat_context(
+    thread_id: str,
+    max_tokens: int = Query(4000, ge=1, description="Token budget for the returned messages"),
+    max_messages: int = Query(200, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """The most recent messages of a thread that fit within a token budget, oldest first"""
+    await _get_thread_or_404(db, thread_id)
+    messages, total, truncated = await _context_messages(db, thread_id, max_tokens, max_messages)
+    return ChatContextResponse(messages=messages, token_count=total, truncated=truncated)
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _save_reply(thread_id: str, content: str) -> ChatMessage:
+    async with AsyncSessionLocal() as db:
+        message = await _append_message(db, thread_id, content, "assistant", is_ai_response=True)
+        await db.commit()
+        return message
+
+async def _completion_stream(
+    backend: CompletionBackend, thread_id: str, prompt: List[PromptMessage], max_tokens: int
+) -> AsyncIterator[str]:
+    started = time.perf_counter()
+    first_token_at = None
+    parts: List[str] = []
+    try:
+        async for token in backend.stream(prompt, max_tokens):
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            parts.append(token)
+            yield _sse_event("token", {"text": token})
+    except Exception as exc:
+        # The response has already started, so failures are reported in-band; nothing is saved
+        logger.exception("Chat completion for thread %s failed after %d tokens", thread_id, len(parts))
+        yield _sse_event("error", {"detail": str(exc) or type(exc).__name__})
+        return
+
+    finished = time.perf_counter()
+    # A client disconnect cancels this generator: mid-stream that discards the
+    # partial reply, but a save that has started is shielded so it runs to the end
+    message = await asyncio.shield(_save_reply(thread_id, "".join(parts)))
+    generation = finished - (first_token_at or started)
+    yield _sse_event("done", {
+        "message": ChatMessageResponse.model_validate(message).model_dump(mode="json"),
+        "tokens": len(parts),
+        "time_to_first_token_ms": round(((first_token_at or finished) - started) * 1000, 3),
+        "tokens_per_second": round(len(parts) / generation, 1) if generation > 0 else None,
+    })
+
+@router.post("/{thread_id}/complete")
+async def complete_chat(
+    thread_id: str,
+    completion: Optional[ChatCompletionRequest] = None,
+    backend: CompletionBackend = Depends(get_completion_backend),
+):
+    """Stream an assistant reply to the thread over SSE, saving it once the last token is sent"""
+    completion = completion or ChatCompletionRequest()
+    # A session of its own rather than a dependency, so no connection is held
+    # for the whole time the reply is being generated
+    async with AsyncReadSessionLocal() as db:
+        await _get_thread_or_404(db, thread_id)
+        messages, _, _ = await _context_messages(db, thread_id, completion.context_tokens, _PROMPT_MESSAGES)
+    prompt: List[PromptMessage] = [{"role": message.role, "content": message.content} for message in messages]
+
+    return StreamingResponse(
+        _completion_stream(backend, thread_id, prompt, completion.max_tokens),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post("/messages", response_model=ChatMessageResponse)
+async def create_chat_message(
+    message: ChatMessageCreate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Append a message to its thread, starting a new thread when none is given"""
+    db_message = await _append_message(db, **message.dict())
+    await db.commit()
+    return db_message
+
+@router.delete("/messages/{message_id}")
+async def delete_chat_message(
+    message_id: int,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Delete a single message, keeping its thread's summary current"""
+    message = await db.get(ChatMessage, message_id)
+    if message is None:
+        raise HTTPException(status_code=404, detail="Chat message not found")
+
+    await db.delete(message)
+    thread = await db.scalar(select(ChatThread).where(ChatThread.thread_id == message.thread_id))
+    if thread is not None:
+        thread.message_count -= 1
+        if thread.message_count <= 0:
+            await db.delete(thread)
+        else:
+            await db.flush()
+            # Seek on (thread_id, created_at, id) rather than rescanning the thread
+            thread.last_message_at = await db.scalar(
+                select(func.max(ChatMessage.created_at)).where(ChatMessage.thread_id == thread.thread_id)
+            )
+    await db.commit()
+    return {"message": "Chat message deleted successfully"}
+
+@router.delete("/threads/{thread_id}")
+async def delete_chat_thread(
+    thread_id: str,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Delete a thread and all of its messages"""
+    thread = await _get_thread_or_404(db, thread_id)
+
+    await db.execute(
+        delete(ChatMessage).where(ChatMessage.thread_id == thread_id).execution_options(synchronize_session=False)
+    )
+    await db.delete(thread)
+    await db.commit()
+    return {"message": "Chat thread deleted successfully"}
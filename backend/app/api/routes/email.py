@@ -1,96 +1,399 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, Query, Response, status
+from sqlalchemy import Select, case, delete, func, insert, literal_column, or_, select, tuple_, update
+from sqlalchemy.orm import aliased
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+import re
 
-from ...core.database import get_db
-from ...models.email_message import EmailMessage, EmailMessageCreate, EmailMessageResponse
+from ...core.auth import CurrentUser, current_user, owned_by, owner_id
+from ...core.database import IS_SQLITE, get_async_db, get_async_read_db
+from ...core.email_threads import assign_threads, conversation_threads
+from ...core.etag import collection_etag
+from ...core.write_behind import flag_writer
+from ...core.pagination import NEXT_CURSOR_HEADER, CursorQuery, decode_cursor, encode_cursor, keyset_page, next_cursor
+from ...core.response_cache import cached_response
+from ...core.serialization import FastJSONResponse, response_columns, rows_response
+from ...core.streaming import export_response, import_ndjson
+from ...models.bulk import MAX_BULK_ITEMS, BulkCreateResponse, BulkDeleteResponse, BulkIds, BulkUpdateResponse, ImportResponse
+from ...models.email_message import (
+    EmailConversation,
+    EmailMessage,
+    EmailMessageCreate,
+    EmailMessageResponse,
+    EmailMessageSummary,
+    EmailSearchHit,
+    EmailThread,
+    email_message_search,
+)
 
 router = APIRouter(prefix="/email", tags=["email"])
 
-@router.get("/", response_model=List[EmailMessageResponse])
+# Emails have no updated_at, so detail responses are tagged by the table version too.
+# Thread rows only change along with email_messages, so its version covers them.
+_email_etag = Depends(collection_etag(EmailMessage))
+
+_EMAIL_COLUMNS = response_columns(EmailMessage, EmailMessageResponse)
+_SUMMARY_COLUMNS = response_columns(EmailMessage, EmailMessageSummary)
+
+_SEARCH_TOKEN = re.compile(r"(\w+)(\*?)", re.UNICODE)
+
+# Lower bm25 is better; subject hits weigh more than sender, sender more than body
+_SEARCH_RANK = "bm25(10.0, 5.0, 1.0)"
+
+def _fts_query(q: str) -> str:
+    """Turn free text into an FTS5 query: every word must match, ``word*`` as a prefix"""
+    return " ".join(f'"{word}"{star}' for word, star in _SEARCH_TOKEN.findall(q))
+
+def _check_email(email: Optional[EmailMessage], user: Optional[CurrentUser]) -> EmailMessage:
+    # Other users' mail is reported missing, not forbidden
+    if email is None or email.user_id != owner_id(user):
+        raise HTTPException(status_code=404, detail="Email message not found")
+    return email
+
+async def _get_email_or_404(db: AsyncSession, email_id: int, user: Optional[CurrentUser]) -> EmailMessage:
+    return _check_email(await db.get(EmailMessage, email_id), user)
+
+async def _load_email_or_404(email_id: int, user: Optional[CurrentUser]) -> EmailMessage:
+    """Load an email with its queued flag changes applied, without waiting for them to flush"""
+    return _check_email(await flag_writer.load(EmailMessage, email_id), user)
+
+async def _list_emails(
+    db: AsyncSession,
+    response: Response,
+    query: Select,
+    skip: int,
+    limit: int,
+    is_read: Optional[bool],
+    is_important: Optional[bool],
+    cursor: Optional[str],
+) -> FastJSONResponse:
+    """Apply the shared inbox filters and offset or keyset paging, newest first"""
+    if is_read is not None:
+        query = query.where(EmailMessage.is_read == is_read)
+    if is_important is not None:
+        query = query.where(EmailMessage.is_important == is_important)
+    
+    if cursor is None:
+        # Order by received_at descending (newest first)
+        query = query.order_by(EmailMessage.received_at.desc()).offset(skip).limit(limit)
+        result = await db.execute(query)
+        return rows_response(result.all(), response)
+    
+    query = keyset_page(query, EmailMessage.received_at, EmailMessage.id, cursor, limit, descending=True)
+    result = await db.execute(query)
+    emails = result.all()
+    token = next_cursor(emails, "received_at", limit)
+    if token:
+        response.headers[NEXT_CURSOR_HEADER] = token
+    return rows_response(emails, response)
+
+def _conversations(user: Optional[CurrentUser]):
+    """Query for ``user``'s conversation list and the relation holding each root thread's counts"""
+    if IS_SQLITE:
+        source = EmailThread.__table__
+    else:
+        # No triggers keep the counts: aggregate them from the messages
+        root = func.coalesce(EmailThread.parent_id, EmailThread.id)
+        ranked = (
+            select(
+                root.label("id"),
+                EmailMessage.id.label("latest_message_id"),
+                EmailMessage.received_at.label("latest_received_at"),
+                func.count().over(partition_by=root).label("message_count"),
+                func.sum(case((EmailMessage.is_read, 0), else_=1)).over(partition_by=root).label("unread_count"),
+                func.row_number().over(
+                    partition_by=root, order_by=(EmailMessage.received_at.desc(), EmailMessage.id.desc()),
+                ).label("position"),
+            )
+            .join(EmailThread, EmailThread.id == EmailMessage.thread_id)
+            .where(owned_by(EmailMessage, user))
+            .subquery()
+        )
+        roots = aliased(EmailThread)
+        source = (
+            select(
+                ranked.c.id, roots.subject, ranked.c.message_count, ranked.c.unread_count,
+                ranked.c.latest_message_id, ranked.c.latest_received_at,
+            )
+            .join(roots, roots.id == ranked.c.id)
+            .where(ranked.c.position == 1)
+            .subquery()
+        )
+    query = (
+        select(
+            source.c.id.label("thread_id"), source.c.subject, source.c.message_count, source.c.unread_count,
+            source.c.latest_message_id, EmailMessage.sender.label("latest_sender"),
+            EmailMessage.preview.label("latest_preview"), source.c.latest_received_at,
+        )
+        .join(EmailMessage, EmailMessage.id == source.c.latest_message_id)
+    )
+    if IS_SQLITE:
+        query = query.where(source.c.parent_id.is_(None), owned_by(EmailThread, user))
+    return query, source
+
+@router.get("/", response_model=List[EmailMessageResponse], dependencies=[_email_etag])
+@cached_response(EmailMessage)
 async def get_email_messages(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     is_read: bool = None,
     is_important: bool = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = CursorQuery,
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    """Get email messages with optional filtering"""
-    query = db.query(EmailMessage)
+    """Get email messages with optional filtering, newest first"""
+    query = select(*_EMAIL_COLUMNS).where(owned_by(EmailMessage, user))
+    return await _list_emails(db, response, query, skip, limit, is_read, is_important, cursor)
+
+@router.get("/summary", response_model=List[EmailMessageSummary], dependencies=[_email_etag])
+@cached_response(EmailMessage)
+async def get_email_summaries(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    is_read: bool = None,
+    is_important: bool = None,
+    cursor: Optional[str] = CursorQuery,
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Inbox list projection: same filters and paging as the full list, without bodies"""
+    query = select(*_SUMMARY_COLUMNS).where(owned_by(EmailMessage, user))
+    return await _list_emails(db, response, query, skip, limit, is_read, is_important, cursor)
+
+@router.get("/threads", response_model=List[EmailConversation], dependencies=[_email_etag])
+@cached_response(EmailMessage)
+async def get_email_conversations(
+    response: Response,
+    skip: int = 0,
+    limit: int = 50,
+    unread: bool = None,
+    cursor: Optional[str] = CursorQuery,
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Conversation list: one row per thread with its counts and newest message, most recent first"""
+    query, source = _conversations(user)
+    if unread is not None:
+        query = query.where(source.c.unread_count > 0 if unread else source.c.unread_count == 0)
     
-    if is_read is not None:
-        query = query.filter(EmailMessage.is_read == is_read)
-    if is_important is not None:
-        query = query.filter(EmailMessage.is_important == is_important)
+    if cursor is None:
+        query = query.order_by(source.c.latest_received_at.desc(), source.c.id.desc()).offset(skip).limit(limit)
+        result = await db.execute(query)
+        return rows_response(result.all(), response)
+    
+    query = keyset_page(query, source.c.latest_received_at, source.c.id, cursor, limit, descending=True)
+    result = await db.execute(query)
+    threads = result.all()
+    if threads and len(threads) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(threads[-1].latest_received_at, threads[-1].thread_id)
+    return rows_response(threads, response)
+
+@router.get("/threads/{thread_id}", response_model=List[EmailMessageResponse], dependencies=[_email_etag])
+@cached_response(EmailMessage)
+async def get_email_conversation(
+    response: Response,
+    thread_id: int,
+    limit: int = Query(500, ge=1, le=5000),
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Messages of a conversation, oldest first; the id of a thread since merged into another still works"""
+    thread = await db.get(EmailThread, thread_id)
+    if thread is None or thread.user_id != owner_id(user):
+        raise HTTPException(status_code=404, detail="Email thread not found")
     
-    # Order by received_at descending (newest first)
-    emails = query.order_by(EmailMessage.received_at.desc()).offset(skip).limit(limit).all()
-    return emails
+    result = await db.execute(
+        select(*_EMAIL_COLUMNS)
+        .where(EmailMessage.thread_id.in_(conversation_threads(thread.parent_id or thread.id)))
+        .order_by(EmailMessage.received_at, EmailMessage.id)
+        .limit(limit)
+    )
+    return rows_response(result.all(), response)
+
+@router.get("/search", response_model=List[EmailSearchHit], dependencies=[_email_etag])
+async def search_email_messages(
+    response: Response,
+    q: str = Query(..., min_length=1, description="Words to find in subject, sender or body; end a word with * to match it as a prefix"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = CursorQuery,
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Full-text search over email subjects, senders and bodies, best matches first"""
+    match = _fts_query(q)
+    if not match:
+        return []
+    owned = owned_by(EmailMessage, user)
+    
+    if IS_SQLITE:
+        fts = literal_column(email_message_search.name)
+        rowid, rank = email_message_search.c.rowid, email_message_search.c.rank
+        # Every match is ranked; pages continue after the (rank, id) of the last hit
+        query = (
+            select(rowid.label("id"), rank.label("rank"))
+            .join(EmailMessage, EmailMessage.id == rowid)
+            .where(fts.op("MATCH")(match), rank.op("MATCH")(_SEARCH_RANK), owned)
+            .order_by(rank, rowid)
+            .limit(limit)
+        )
+        position = decode_cursor(cursor)
+        if position is not None:
+            query = query.where(tuple_(rank, rowid) > tuple_(*position))
+        ranks = dict((await db.execute(query)).all())
+        if not ranks:
+            return []
+        
+        # Snippets are only built for the page being returned
+        snippet = func.snippet(fts, -1, "<mark>", "</mark>", "…", 16).label("snippet")
+        result = await db.execute(
+            select(
+                EmailMessage.id, EmailMessage.subject, EmailMessage.sender, EmailMessage.received_at,
+                EmailMessage.is_read, EmailMessage.is_important, snippet,
+            )
+            .select_from(email_message_search)
+            .join(EmailMessage, EmailMessage.id == rowid)
+            .where(fts.op("MATCH")(match), rowid.in_(ranks))
+        )
+        hits = sorted((EmailSearchHit(**row._mapping, rank=ranks[row.id]) for row in result), key=lambda hit: (hit.rank, hit.id))
+        if len(hits) == limit:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(hits[-1].rank, hits[-1].id)
+        return hits
+    
+    # Portable fallback without a full-text index: substring match, newest first
+    query = select(EmailMessage).where(owned)
+    for word, _ in _SEARCH_TOKEN.findall(q):
+        pattern = f"%{word}%"
+        query = query.where(or_(
+            EmailMessage.subject.ilike(pattern),
+            EmailMessage.sender.ilike(pattern),
+            EmailMessage.body.ilike(pattern),
+        ))
+    emails = (await db.scalars(keyset_page(query, EmailMessage.received_at, EmailMessage.id, cursor, limit, descending=True))).all()
+    token = next_cursor(emails, "received_at", limit)
+    if token:
+        response.headers[NEXT_CURSOR_HEADER] = token
+    return [
+        EmailSearchHit(
+            id=email.id, subject=email.subject, sender=email.sender, received_at=email.received_at,
+            is_read=email.is_read, is_important=email.is_important, snippet=email.body[:160], rank=0.0,
+        )
+        for email in emails
+    ]
 
 @router.post("/", response_model=EmailMessageResponse)
 async def create_email_message(
     email: EmailMessageCreate,
-    db: Session = Depends(get_db)
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new email message"""
-    db_email = EmailMessage(**email.dict())
+    db_email = EmailMessage(**email.dict(), user_id=owner_id(user))
     db.add(db_email)
-    db.commit()
-    db.refresh(db_email)
+    await db.commit()
+    await db.refresh(db_email)
     return db_email
 
-@router.get("/{email_id}", response_model=EmailMessageResponse)
+@router.post("/bulk", response_model=BulkCreateResponse)
+async def create_email_messages_bulk(
+    emails: List[EmailMessageCreate] = Body(..., min_length=1, max_length=MAX_BULK_ITEMS),
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Ingest many email messages in one transaction, returning their ids in request order"""
+    rows = [{**email.dict(), "user_id": owner_id(user)} for email in emails]
+    await db.run_sync(lambda session: assign_threads(session.connection(), rows))
+    result = await db.scalars(
+        insert(EmailMessage).returning(EmailMessage.id, sort_by_parameter_order=True),
+        rows,
+    )
+    ids = result.all()
+    await db.commit()
+    return BulkCreateResponse(ids=ids)
+
+@router.patch("/bulk/read", response_model=BulkUpdateResponse)
+async def mark_emails_as_read_bulk(
+    bulk: BulkIds,
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Mark many emails as read"""
+    result = await db.execute(
+        update(EmailMessage)
+        .where(EmailMessage.id.in_(bulk.ids), owned_by(EmailMessage, user), EmailMessage.is_read.is_(False))
+        .values(is_read=True)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return BulkUpdateResponse(updated=result.rowcount)
+
+@router.post("/bulk/delete", response_model=BulkDeleteResponse)
+async def delete_email_messages_bulk(
+    bulk: BulkIds,
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Delete many email messages by id"""
+    result = await db.execute(
+        delete(EmailMessage)
+        .where(EmailMessage.id.in_(bulk.ids), owned_by(EmailMessage, user))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return BulkDeleteResponse(deleted=result.rowcount)
+
+@router.get("/export")
+async def export_email_messages(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    user: Optional[CurrentUser] = Depends(current_user)
+):
+    """Stream all email messages as NDJSON (default) or CSV"""
+    return export_response(EmailMessage, EmailMessageResponse, format, "email_messages", owned_by(EmailMessage, user))
+
+@router.post("/import", response_model=ImportResponse)
+async def import_email_messages(request: Request, user: Optional[CurrentUser] = Depends(current_user)):
+    """Import email messages from an NDJSON request body in batched transactions"""
+    return ImportResponse(imported=await import_ndjson(
+        request, EmailMessage, EmailMessageCreate, assign_threads, values={"user_id": owner_id(user)},
+    ))
+
+@router.get("/{email_id}", response_model=EmailMessageResponse, dependencies=[_email_etag])
 async def get_email_message(
     email_id: int,
-    db: Session = Depends(get_db)
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get a specific email message by ID"""
-    email = db.query(EmailMessage).filter(EmailMessage.id == email_id).first()
-    if email is None:
-        raise HTTPException(status_code=404, detail="Email message not found")
-    return email
+    return await _get_email_or_404(db, email_id, user)
 
 @router.patch("/{email_id}/read", response_model=EmailMessageResponse)
-async def mark_email_as_read(
-    email_id: int,
-    db: Session = Depends(get_db)
-):
-    """Mark an email as read"""
-    email = db.query(EmailMessage).filter(EmailMessage.id == email_id).first()
-    if email is None:
-        raise HTTPException(status_code=404, detail="Email message not found")
+async def mark_email_as_read(email_id: int, user: Optional[CurrentUser] = Depends(current_user)):
+    """Mark an email as read; the write is batched with other flag changes"""
+    email = await _load_email_or_404(email_id, user)
     
-    email.is_read = True
-    db.commit()
-    db.refresh(email)
+    if not email.is_read:
+        flag_writer.set(email, is_read=True)
     return email
 
 @router.patch("/{email_id}/important", response_model=EmailMessageResponse)
-async def toggle_email_importance(
-    email_id: int,
-    db: Session = Depends(get_db)
-):
-    """Toggle email importance status"""
-    email = db.query(EmailMessage).filter(EmailMessage.id == email_id).first()
-    if email is None:
-        raise HTTPException(status_code=404, detail="Email message not found")
+async def toggle_email_importance(email_id: int, user: Optional[CurrentUser] = Depends(current_user)):
+    """Toggle email importance status; the write is batched with other flag changes"""
+    email = await _load_email_or_404(email_id, user)
     
-    email.is_important = not email.is_important
-    db.commit()
-    db.refresh(email)
+    flag_writer.set(email, is_important=not email.is_important)
     return email
 
 @router.delete("/{email_id}")
 async def delete_email_message(
     email_id: int,
-    db: Session = Depends(get_db)
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete an email message"""
-    email = db.query(EmailMessage).filter(EmailMessage.id == email_id).first()
-    if email is None:
-        raise HTTPException(status_code=404, detail="Email message not found")
+    email = await _get_email_or_404(db, email_id, user)
     
-    db.delete(email)
-    db.commit()
-    return {"message": "Email message deleted successfully"}
\ No newline at end of file
+    await db.delete(email)
+    await db.commit()
+    return {"message": "Email message deleted successfully"}
@@ -0,0 +1,77 @@
+from fastapi import APIRouter, Depends, Header, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, List, Optional
+import asyncio
+
+from ...core.auth import CurrentUser, current_user, owner_id, websocket_user
+from ...core.feed import ChangeEvent, change_feed
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+# Idle connections get a heartbeat so proxies keep them open and dead clients are noticed
+HEARTBEAT_SECONDS = 15.0
+
+_PING = '{"op": "ping"}'
+
+EntityQuery = Query(None, description="Only stream changes to these tables, e.g. tasks, calendar_events, email_messages")
+
+SinceQuery = Query(
+    None,
+    description="Resume after this feed version; a reset event is sent if it is no longer retained",
+)
+
+def _sse_message(event: ChangeEvent) -> str:
+    kind = "reset" if event.op == "reset" else "change"
+    return f"id: {event.version}\nevent: {kind}\ndata: {event.payload}\n\n"
+
+async def _sse_stream(since: Optional[int], entities: Optional[List[str]], owner: Optional[int]) -> AsyncIterator[str]:
+    subscription = change_feed.subscribe(since, entities, owner)
+    try:
+        yield f"retry: 3000\n: version {change_feed.version}\n\n"
+        while True:
+            event = await subscription.next(HEARTBEAT_SECONDS)
+            yield _sse_message(event) if event is not None else ": keepalive\n\n"
+    finally:
+        change_feed.unsubscribe(subscription)
+
+@router.get("/")
+async def stream_changes(
+    since: Optional[int] = SinceQuery,
+    entity: Optional[List[str]] = EntityQuery,
+    last_event_id: Optional[int] = Header(None),
+    user: Optional[CurrentUser] = Depends(current_user),
+):
+    """Server-sent events stream of committed creates, updates and deletes visible to the caller"""
+    return StreamingResponse(
+        _sse_stream(since if since is not None else last_event_id, entity, owner_id(user)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def _send_changes(websocket: WebSocket, since: Optional[int], entities: Optional[List[str]], owner: Optional[int]):
+    subscription = change_feed.subscribe(since, entities, owner)
+    try:
+        while True:
+            event = await subscription.next(HEARTBEAT_SECONDS)
+            await websocket.send_text(event.payload if event is not None else _PING)
+    finally:
+        change_feed.unsubscribe(subscription)
+
+@router.websocket("/ws")
+async def change_socket(
+    websocket: WebSocket,
+    since: Optional[int] = SinceQuery,
+    entity: Optional[List[str]] = EntityQuery,
+    user: Optional[CurrentUser] = Depends(websocket_user),
+):
+    """WebSocket carrying the same change events as the SSE stream, one JSON text frame each"""
+    await websocket.accept()
+    sender = asyncio.create_task(_send_changes(websocket, since, entity, owner_id(user)))
+    try:
+        # Client frames are ignored; receiving is how a disconnect is noticed
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
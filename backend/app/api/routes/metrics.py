@@ -0,0 +1,29 @@
+from fastapi import APIRouter
+from typing import Any, Dict, List
+
+from ...core.auth import token_cache
+from ...core.instrumentation import recent_slow_queries
+from ...core.response_cache import response_cache
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+@router.get("/cache")
+async def get_cache_metrics() -> Dict[str, Any]:
+    """Response cache size, hit rate and lookup latency (recent samples, in milliseconds)"""
+    return response_cache.stats()
+
+@router.delete("/cache")
+async def clear_cache():
+    """Drop every cached response"""
+    response_cache.clear()
+    return {"message": "Cache cleared"}
+
+@router.get("/auth")
+async def get_auth_metrics() -> Dict[str, Any]:
+    """Verified-token cache size and hit rate"""
+    return token_cache.stats()
+
+@router.get("/slow-queries")
+async def get_slow_queries() -> List[Dict[str, Any]]:
+    """The most recent SQL statements slower than ``SLOW_QUERY_MS``, newest first"""
+    return [query._asdict() for query in reversed(recent_slow_queries)]
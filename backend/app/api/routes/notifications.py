@@ -0,0 +1,78 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from ...core.auth import CurrentUser, current_user, owned_by, owner_id
+from ...core.database import get_async_db, get_async_read_db
+from ...core.pagination import NEXT_CURSOR_HEADER, CursorQuery, keyset_page, next_cursor
+from ...core.reminders import REMINDER
+from ...models.push_subscription import PushSubscription, PushSubscriptionCreate, PushSubscriptionResponse
+from ...models.scheduled_job import ScheduledJob, ScheduledJobResponse
+
+router = APIRouter(prefix="/notifications", tags=["notifications"])
+
+@router.get("/subscriptions", response_model=List[PushSubscriptionResponse])
+async def get_subscriptions(
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """The caller's registered push subscriptions"""
+    result = await db.scalars(select(PushSubscription).where(owned_by(PushSubscription, user)).order_by(PushSubscription.id))
+    return result.all()
+
+@router.post("/subscriptions", response_model=PushSubscriptionResponse)
+async def create_subscription(
+    subscription: PushSubscriptionCreate,
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Register a push subscription for the caller's reminders; registering an endpoint
+    again updates its keys and hands it to the caller, as when another user signs in
+    on the same browser"""
+    db_subscription = await db.scalar(
+        select(PushSubscription).where(PushSubscription.endpoint == subscription.endpoint)
+    )
+    if db_subscription is None:
+        db_subscription = PushSubscription(**subscription.dict(), user_id=owner_id(user))
+        db.add(db_subscription)
+    else:
+        db_subscription.keys = subscription.keys
+        db_subscription.user_id = owner_id(user)
+    await db.commit()
+    await db.refresh(db_subscription)
+    return db_subscription
+
+@router.delete("/subscriptions/{subscription_id}")
+async def delete_subscription(
+    subscription_id: int,
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Unregister a push subscription"""
+    subscription = await db.get(PushSubscription, subscription_id)
+    # Other users' subscriptions are reported missing, not forbidden
+    if subscription is None or subscription.user_id != owner_id(user):
+        raise HTTPException(status_code=404, detail="Subscription not found")
+    await db.delete(subscription)
+    await db.commit()
+    return {"message": "Subscription deleted successfully"}
+
+@router.get("/reminders", response_model=List[ScheduledJobResponse])
+async def get_reminders(
+    response: Response,
+    limit: int = 50,
+    cursor: Optional[str] = CursorQuery,
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """The caller's pending reminders, soonest first, with keyset (run_at, id) pagination"""
+    query = keyset_page(
+        select(ScheduledJob).where(owned_by(ScheduledJob, user), ScheduledJob.kind == REMINDER),
+        ScheduledJob.run_at, ScheduledJob.id, cursor, limit,
+    )
+    reminders = (await db.scalars(query)).all()
+    token = next_cursor(reminders, "run_at", limit)
+    if token:
+        response.headers[NEXT_CURSOR_HEADER] = token
+    return reminders
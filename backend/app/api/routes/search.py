@@ -0,0 +1,49 @@
+from collections import defaultdict
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+
+from ...core.auth import CurrentUser, current_user, owned_by
+from ...core.database import get_async_read_db
+from ...core.semantic_search import semantic_index
+from ...models.search import SearchHit, SearchIndexStatus
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+@router.get("/", response_model=List[SearchHit])
+async def search(
+    q: str = Query(..., min_length=1, description="Text to find tasks, emails and chat messages about"),
+    types: Optional[List[Literal["task", "email", "chat"]]] = Query(None, description="Only return these kinds of items"),
+    limit: int = Query(20, ge=1, le=100),
+    exact: bool = Query(False, description="Scan the whole index instead of its nearest partitions"),
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Items across tasks, emails and chat most similar to the query, best first"""
+    hits = await semantic_index.search(q, types, limit, exact)
+    ids = defaultdict(list)
+    for hit in hits:
+        ids[hit.kind].append(hit.id)
+    rows = {}
+    for kind, kind_ids in ids.items():
+        model = semantic_index.source(kind).model
+        query = select(model).where(model.id.in_(kind_ids))
+        if hasattr(model, "user_id"):
+            query = query.where(owned_by(model, user))
+        for row in await db.scalars(query):
+            rows[(kind, row.id)] = row
+    # Rows deleted since they were indexed, and other users' rows, are left out
+    return [
+        SearchHit(
+            type=semantic_index.source(hit.kind).type, id=hit.id, score=hit.score,
+            **semantic_index.source(hit.kind).describe(rows[(hit.kind, hit.id)]),
+        )
+        for hit in hits
+        if (hit.kind, hit.id) in rows
+    ]
+
+@router.get("/status", response_model=SearchIndexStatus)
+async def search_status():
+    """Size and freshness of the search index"""
+    return semantic_index.stats()
@@ -0,0 +1,95 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from ...core.auth import CurrentUser, current_user, owned_by, owner_id
+from ...core.database import get_async_db, get_async_read_db
+from ...core.etag import collection_etag
+from ...core.pagination import NEXT_CURSOR_HEADER, CursorQuery, keyset_page, next_cursor
+from ...core.write_behind import flag_writer
+from ...models.suggestion import Suggestion, SuggestionCreate, SuggestionResponse
+
+router = APIRouter(prefix="/suggestions", tags=["suggestions"])
+
+def _check_suggestion(suggestion: Optional[Suggestion], user: Optional[CurrentUser]) -> Suggestion:
+    # Other users' suggestions are reported missing, not forbidden
+    if suggestion is None or suggestion.user_id != owner_id(user):
+        raise HTTPException(status_code=404, detail="Suggestion not found")
+    return suggestion
+
+async def _get_suggestion_or_404(db: AsyncSession, suggestion_id: int, user: Optional[CurrentUser]) -> Suggestion:
+    return _check_suggestion(await db.get(Suggestion, suggestion_id), user)
+
+@router.get("/", response_model=List[SuggestionResponse], dependencies=[Depends(collection_etag(Suggestion))])
+async def get_suggestions(
+    response: Response,
+    skip: int = 0,
+    limit: int = 50,
+    include_dismissed: bool = False,
+    action_type: Optional[str] = None,
+    cursor: Optional[str] = CursorQuery,
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Current suggestions, newest first, with offset or keyset (created_at, id) pagination"""
+    query = select(Suggestion).where(owned_by(Suggestion, user))
+    if not include_dismissed:
+        query = query.where(Suggestion.is_dismissed.is_(False))
+    if action_type is not None:
+        query = query.where(Suggestion.action_type == action_type)
+    if cursor is None:
+        query = query.order_by(Suggestion.created_at.desc(), Suggestion.id.desc())
+        result = await db.scalars(query.offset(skip).limit(limit))
+        return result.all()
+
+    query = keyset_page(query, Suggestion.created_at, Suggestion.id, cursor, limit, descending=True)
+    suggestions = (await db.scalars(query)).all()
+    token = next_cursor(suggestions, "created_at", limit)
+    if token:
+        response.headers[NEXT_CURSOR_HEADER] = token
+    return suggestions
+
+@router.post("/", response_model=SuggestionResponse)
+async def create_suggestion(
+    suggestion: SuggestionCreate,
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Add a suggestion by hand; generated ones come from the suggestion engine"""
+    db_suggestion = Suggestion(**suggestion.dict(), user_id=owner_id(user))
+    db.add(db_suggestion)
+    await db.commit()
+    await db.refresh(db_suggestion)
+    return db_suggestion
+
+@router.get("/{suggestion_id}", response_model=SuggestionResponse)
+async def get_suggestion(
+    suggestion_id: int,
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get a specific suggestion by ID"""
+    return await _get_suggestion_or_404(db, suggestion_id, user)
+
+@router.patch("/{suggestion_id}/dismiss", response_model=SuggestionResponse)
+async def dismiss_suggestion(suggestion_id: int, user: Optional[CurrentUser] = Depends(current_user)):
+    """Dismiss a suggestion; the write is batched with other flag changes"""
+    suggestion = _check_suggestion(await flag_writer.load(Suggestion, suggestion_id), user)
+
+    if not suggestion.is_dismissed:
+        flag_writer.set(suggestion, is_dismissed=True)
+    return suggestion
+
+@router.delete("/{suggestion_id}")
+async def delete_suggestion(
+    suggestion_id: int,
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Delete a suggestion"""
+    suggestion = await _get_suggestion_or_404(db, suggestion_id, user)
+
+    await db.delete(suggestion)
+    await db.commit()
+    return {"message": "Suggestion deleted successfully"}
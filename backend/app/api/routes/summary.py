@@ -0,0 +1,93 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from collections import OrderedDict
+from typing import Optional, Tuple
+from datetime import date, datetime, time, timedelta
+import os
+
+from ...core.auth import CurrentUser, current_user, owned_by, owner_id
+from ...core.changes import table_versions
+from ...core.database import get_async_read_db
+from ...core.recurrence import load_occurrences
+from ...models.calendar_event import SERIES_TIME_COLUMNS, CalendarEvent, overlapping
+from ...models.calendar_event_exception import CalendarEventException
+from ...models.email_message import EmailMessage
+from ...models.summary import DashboardSummary
+from ...models.task import Task
+
+router = APIRouter(prefix="/summary", tags=["summary"])
+
+_COUNTED_TABLES = (
+    Task.__tablename__, CalendarEvent.__tablename__, CalendarEventException.__tablename__, EmailMessage.__tablename__,
+)
+
+# Owner id (None: the local profile) -> (table versions, day, expires_at, summary) of
+# the owner's last computation. Counts only change on writes to the counted tables,
+# at midnight, and when the next open task falls due, so until one of those happens
+# the badges are served from memory. At most SUMMARY_CACHE_SIZE owners are kept,
+# least recently used first out.
+_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", "1000"))
+_cached: "OrderedDict[Optional[int], Tuple[Tuple[int, ...], date, Optional[datetime], DashboardSummary]]" = OrderedDict()
+
+async def _compute_summary(
+    db: AsyncSession, now: datetime, user: Optional[CurrentUser]
+) -> Tuple[DashboardSummary, Optional[datetime]]:
+    """Run one grouped COUNT per table over ``user``'s rows; also returns when the
+    overdue count next changes"""
+    day_start = datetime.combine(now.date(), time.min)
+    day_end = day_start + timedelta(days=1)
+    
+    unread, important = (await db.execute(select(
+        func.count().filter(EmailMessage.is_read.is_(False)),
+        func.count().filter(EmailMessage.is_important.is_(True)),
+    ).where(owned_by(EmailMessage, user)))).one()
+    
+    open_tasks = Task.completed.is_(False)
+    open_count, overdue, next_due = (await db.execute(select(
+        func.count().filter(open_tasks),
+        func.count().filter(open_tasks, Task.due_date < now),
+        func.min(Task.due_date).filter(open_tasks, Task.due_date >= now),
+    ).where(owned_by(Task, user)))).one()
+    
+    # The R*Tree drives the day's window, so the owner must not be index-usable
+    todays_events = await db.scalar(
+        overlapping(select(func.count()).select_from(CalendarEvent), day_start, day_end)
+        .where(owned_by(CalendarEvent, user, indexed=False), CalendarEvent.rrule.is_(None))
+    )
+    occurrences = await load_occurrences(db, SERIES_TIME_COLUMNS, day_start, day_end, where=[owned_by(CalendarEvent, user)])
+    todays_events += len(occurrences)
+    
+    summary = DashboardSummary(
+        unread_emails=unread,
+        important_emails=important,
+        open_tasks=open_count,
+        overdue_tasks=overdue,
+        todays_events=todays_events,
+        date=now.date(),
+        computed_at=now,
+    )
+    return summary, next_due
+
+@router.get("/", response_model=DashboardSummary)
+async def get_summary(
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Dashboard badge counters over the caller's rows; "today" and "overdue" are evaluated in UTC"""
+    now = datetime.utcnow()
+    versions = table_versions(*_COUNTED_TABLES)
+    owner = owner_id(user)
+    cached = _cached.get(owner)
+    if cached is not None:
+        cached_versions, day, expires_at, summary = cached
+        if cached_versions == versions and day == now.date() and (expires_at is None or now < expires_at):
+            _cached.move_to_end(owner)
+            return summary
+    
+    summary, next_due = await _compute_summary(db, now, user)
+    _cached[owner] = (versions, now.date(), next_due, summary)
+    _cached.move_to_end(owner)
+    while len(_cached) > _CACHE_SIZE:
+        _cached.popitem(last=False)
+    return summary
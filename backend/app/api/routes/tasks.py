@@ -1,92 +1,174 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, Response, status
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
 from datetime import datetime
 
-from ...core.database import get_db
-from ...models.task import Task, TaskCreate, TaskResponse
+from ...core.auth import CurrentUser, current_user, owned_by, owner_id
+from ...core.database import get_async_db, get_async_read_db
+from ...core.etag import collection_etag, conditional_get, row_etag
+from ...core.write_behind import flag_writer
+from ...core.response_cache import cached_response
+from ...core.serialization import response_columns, rows_response
+from ...core.pagination import NEXT_CURSOR_HEADER, CursorQuery, keyset_page, next_cursor
+from ...core.streaming import export_response, import_ndjson
+from ...models.bulk import MAX_BULK_ITEMS, BulkCreateResponse, BulkDeleteResponse, BulkIds, BulkUpdateResponse, ImportResponse
+from ...models.task import Task, TaskBulkCompletion, TaskCreate, TaskResponse
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
-@router.get("/", response_model=List[TaskResponse])
+_TASK_COLUMNS = response_columns(Task, TaskResponse)
+
+def _check_task(task: Optional[Task], user: Optional[CurrentUser]) -> Task:
+    # Other users' tasks are reported missing, not forbidden
+    if task is None or task.user_id != owner_id(user):
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
+
+async def _get_task_or_404(db: AsyncSession, task_id: int, user: Optional[CurrentUser]) -> Task:
+    return _check_task(await db.get(Task, task_id), user)
+
+@router.get("/", response_model=List[TaskResponse], dependencies=[Depends(collection_etag(Task))])
+@cached_response(Task)
 async def get_tasks(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = CursorQuery,
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    """Get all tasks with pagination"""
-    tasks = db.query(Task).offset(skip).limit(limit).all()
-    return tasks
+    """Get all tasks with offset or keyset (due_date, id) pagination"""
+    query = select(*_TASK_COLUMNS).where(owned_by(Task, user))
+    if cursor is None:
+        result = await db.execute(query.offset(skip).limit(limit))
+        return rows_response(result.all(), response)
+    
+    result = await db.execute(keyset_page(query, Task.due_date, Task.id, cursor, limit))
+    tasks = result.all()
+    token = next_cursor(tasks, "due_date", limit)
+    if token:
+        response.headers[NEXT_CURSOR_HEADER] = token
+    return rows_response(tasks, response)
 
 @router.post("/", response_model=TaskResponse)
 async def create_task(
     task: TaskCreate,
-    db: Session = Depends(get_db)
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new task"""
-    db_task = Task(**task.dict())
+    db_task = Task(**task.dict(), user_id=owner_id(user))
     db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
+    await db.commit()
+    await db.refresh(db_task)
     return db_task
 
+@router.post("/bulk", response_model=BulkCreateResponse)
+async def create_tasks_bulk(
+    tasks: List[TaskCreate] = Body(..., min_length=1, max_length=MAX_BULK_ITEMS),
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create many tasks in one transaction, returning their ids in request order"""
+    result = await db.scalars(
+        insert(Task).returning(Task.id, sort_by_parameter_order=True),
+        [{**task.dict(), "user_id": owner_id(user)} for task in tasks],
+    )
+    ids = result.all()
+    await db.commit()
+    return BulkCreateResponse(ids=ids)
+
+@router.patch("/bulk/complete", response_model=BulkUpdateResponse)
+async def set_tasks_completion_bulk(
+    bulk: TaskBulkCompletion,
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Set the completion status of many tasks at once"""
+    result = await db.execute(
+        update(Task)
+        .where(Task.id.in_(bulk.ids), owned_by(Task, user))
+        .values(completed=bulk.completed, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return BulkUpdateResponse(updated=result.rowcount)
+
+@router.post("/bulk/delete", response_model=BulkDeleteResponse)
+async def delete_tasks_bulk(
+    bulk: BulkIds,
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Delete many tasks by id"""
+    result = await db.execute(
+        delete(Task).where(Task.id.in_(bulk.ids), owned_by(Task, user)).execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return BulkDeleteResponse(deleted=result.rowcount)
+
+@router.get("/export")
+async def export_tasks(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    user: Optional[CurrentUser] = Depends(current_user)
+):
+    """Stream all tasks as NDJSON (default) or CSV"""
+    return export_response(Task, TaskResponse, format, "tasks", owned_by(Task, user))
+
+@router.post("/import", response_model=ImportResponse)
+async def import_tasks(request: Request, user: Optional[CurrentUser] = Depends(current_user)):
+    """Import tasks from an NDJSON request body in batched transactions"""
+    return ImportResponse(imported=await import_ndjson(request, Task, TaskCreate, values={"user_id": owner_id(user)}))
+
 @router.get("/{task_id}", response_model=TaskResponse)
 async def get_task(
     task_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get a specific task by ID"""
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if task is None:
-        raise HTTPException(status_code=404, detail="Task not found")
+    task = await _get_task_or_404(db, task_id, user)
+    conditional_get(request, response, row_etag(task))
     return task
 
 @router.put("/{task_id}", response_model=TaskResponse)
 async def update_task(
     task_id: int,
     task_update: TaskCreate,
-    db: Session = Depends(get_db)
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a task"""
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if task is None:
-        raise HTTPException(status_code=404, detail="Task not found")
+    task = await _get_task_or_404(db, task_id, user)
     
     for key, value in task_update.dict(exclude_unset=True).items():
         setattr(task, key, value)
     task.updated_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(task)
+    await db.commit()
+    await db.refresh(task)
     return task
 
 @router.patch("/{task_id}/toggle", response_model=TaskResponse)
-async def toggle_task_completion(
-    task_id: int,
-    db: Session = Depends(get_db)
-):
-    """Toggle task completion status"""
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if task is None:
-        raise HTTPException(status_code=404, detail="Task not found")
+async def toggle_task_completion(task_id: int, user: Optional[CurrentUser] = Depends(current_user)):
+    """Toggle task completion status; the write is batched with other toggles"""
+    task = _check_task(await flag_writer.load(Task, task_id), user)
     
-    task.completed = not task.completed
-    task.updated_at = datetime.utcnow()
-    
-    db.commit()
-    db.refresh(task)
+    flag_writer.set(task, completed=not task.completed, updated_at=datetime.utcnow())
     return task
 
 @router.delete("/{task_id}")
 async def delete_task(
     task_id: int,
-    db: Session = Depends(get_db)
+    user: Optional[CurrentUser] = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a task"""
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if task is None:
-        raise HTTPException(status_code=404, detail="Task not found")
+    task = await _get_task_or_404(db, task_id, user)
     
-    db.delete(task)
-    db.commit()
-    return {"message": "Task deleted successfully"}
\ No newline at end of file
+    await db.delete(task)
+    await db.commit()
+    return {"message": "Task deleted successfully"}
@@ -0,0 +1,277 @@
+"""
+Accounts: password hashing, access tokens and the current user.
+
+Passwords are hashed with bcrypt on a small pool of its own
+(``AUTH_HASH_THREADS``). A hash costs a few hundred milliseconds of CPU by
+design (``AUTH_BCRYPT_ROUNDS``); on the event loop that would stall every
+other request for as long, and on the default executor a burst of logins
+would queue the other work sent there behind it.
+
+Access tokens are HS256 JWTs naming the user (``sub``), signed with
+``AUTH_SECRET_KEY`` and valid for ``AUTH_TOKEN_MINUTES``. Checking one means
+verifying its signature and loading the user row, so the outcome is kept in
+``token_cache``, a bounded LRU whose entries live ``AUTH_TOKEN_CACHE_SECONDS``
+at most and never past the token's expiry. Committed writes to ``users``
+(``app.core.changes``) evict that user's entries, so a deactivated account is
+locked out on its next request.
+
+Requests without a token act as the local profile and see the rows no user
+owns (``user_id`` NULL), as every row was before accounts existed; setting
+``AUTH_REQUIRED`` rejects them instead. A request with a token sees only its
+user's rows. Invalid and expired tokens are always rejected.
+"""
+import asyncio
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+import bcrypt
+from fastapi import Depends, HTTPException, Query, Request, WebSocket, WebSocketException, status
+from fastapi.security import OAuth2PasswordBearer
+from jose import JWTError, jwt
+from sqlalchemy import select
+
+from .changes import Change, on_commit
+from .database import AsyncReadSessionLocal
+from ..models.user import MAX_PASSWORD_BYTES, User
+
+logger = logging.getLogger(__name__)
+
+ALGORITHM = "HS256"
+ACCESS_TOKEN_MINUTES = int(os.getenv("AUTH_TOKEN_MINUTES", "60"))
+AUTH_REQUIRED = os.getenv("AUTH_REQUIRED", "0") != "0"
+BCRYPT_ROUNDS = int(os.getenv("AUTH_BCRYPT_ROUNDS", "12"))
+
+SECRET_KEY = os.getenv("AUTH_SECRET_KEY")
+if not SECRET_KEY:
+    SECRET_KEY = secrets.token_urlsafe(32)
+    logger.warning("AUTH_SECRET_KEY is not set; access tokens will not survive a restart")
+
+_hash_pool = ThreadPoolExecutor(max_workers=int(os.getenv("AUTH_HASH_THREADS", "2")), thread_name_prefix="bcrypt")
+
+class CurrentUser(NamedTuple):
+    """The user a token was issued to, as loaded when it was verified"""
+    id: int
+    email: str
+    full_name: str
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+
+_USER_COLUMNS = [getattr(User, field) for field in CurrentUser._fields]
+
+def _hash(password: str) -> str:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(BCRYPT_ROUNDS)).decode()
+
+_unknown_user_hash: Optional[str] = None
+
+def _check(password: str, hashed: Optional[str]) -> bool:
+    global _unknown_user_hash
+    # bcrypt refuses longer secrets, and UserCreate never lets one be stored
+    secret = password.encode()[:MAX_PASSWORD_BYTES + 1]
+    if hashed is None:
+        # No such account: spend as long as a wrong password would, so response
+        # times do not tell which emails are registered
+        if _unknown_user_hash is None:
+            _unknown_user_hash = _hash(secrets.token_urlsafe(16))
+        bcrypt.checkpw(secret[:MAX_PASSWORD_BYTES], _unknown_user_hash.encode())
+        return False
+    if len(secret) > MAX_PASSWORD_BYTES:
+        return False
+    return bcrypt.checkpw(secret, hashed.encode())
+
+async def hash_password(password: str) -> str:
+    """bcrypt hash of ``password``, computed on the hashing pool"""
+    return await asyncio.get_running_loop().run_in_executor(_hash_pool, _hash, password)
+
+async def verify_password(password: str, hashed: Optional[str]) -> bool:
+    """Whether ``password`` matches ``hashed``, checked on the hashing pool; None never matches"""
+    return await asyncio.get_running_loop().run_in_executor(_hash_pool, _check, password, hashed)
+
+async def authenticate(email: str, password: str) -> Optional[User]:
+    """The active user with these credentials, or None"""
+    async with AsyncReadSessionLocal() as db:
+        user = await db.scalar(select(User).where(User.email == email.lower()))
+    valid = await verify_password(password, user.hashed_password if user is not None else None)
+    return user if valid and user.is_active else None
+
+def create_access_token(user_id: int) -> Tuple[str, int]:
+    """A signed token for ``user_id`` and its lifetime in seconds"""
+    now = datetime.utcnow()
+    lifetime = timedelta(minutes=ACCESS_TOKEN_MINUTES)
+    claims = {"sub": str(user_id), "iat": now, "exp": now + lifetime}
+    return jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM), int(lifetime.total_seconds())
+
+class TokenCache:
+    """Bounded LRU of verified tokens and their users, each entry with its own deadline"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, CurrentUser]]" = OrderedDict()
+        self._by_user: Dict[int, Set[str]] = {}
+        # Commit listeners may run on worker threads
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.expired = self.evictions = self.invalidations = 0
+
+    def get(self, token: str) -> Optional[CurrentUser]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.monotonic():
+                self.expired += 1
+                self._remove(token)
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, token: str, user: CurrentUser, expires_at: float):
+        """Cache ``user`` for ``token`` until the TTL or ``expires_at`` (epoch seconds), whichever is sooner"""
+        lifetime = min(self.ttl, expires_at - time.time())
+        if self.max_entries <= 0 or lifetime <= 0:
+            return
+        with self._lock:
+            if token in self._entries:
+                self._remove(token)
+            self._entries[token] = (time.monotonic() + lifetime, user)
+            self._by_user.setdefault(user.id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, token: str):
+        _, user = self._entries.pop(token)
+        tokens = self._by_user.get(user.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._by_user[user.id]
+
+    def invalidate(self, changes: List[Change]):
+        """``on_commit`` listener dropping the entries of every written user"""
+        changes = [change for change in changes if change.table == User.__tablename__]
+        if not changes:
+            return
+        with self._lock:
+            if any(change.id is None for change in changes):
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                self._by_user.clear()
+                return
+            for change in changes:
+                for token in list(self._by_user.get(change.id, ())):
+                    self._remove(token)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.expired
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+token_cache = TokenCache(
+    int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000")),
+    float(os.getenv("AUTH_TOKEN_CACHE_SECONDS", "60")),
+)
+
+on_commit(token_cache.invalidate)
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail, headers={"WWW-Authenticate": "Bearer"})
+
+async def verify_token(token: str) -> CurrentUser:
+    """The active user ``token`` was issued to; raises 401 otherwise"""
+    user = token_cache.get(token)
+    if user is not None:
+        return user
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        user_id = int(claims["sub"])
+    except (JWTError, KeyError, ValueError):
+        raise _unauthorized("Invalid or expired token")
+    async with AsyncReadSessionLocal() as db:
+        row = (await db.execute(select(*_USER_COLUMNS).where(User.id == user_id))).first()
+    if row is None or not row.is_active:
+        raise _unauthorized("Invalid or expired token")
+    user = CurrentUser(*row)
+    token_cache.put(token, user, claims["exp"])
+    return user
+
+_bearer = OAuth2PasswordBearer(tokenUrl="/api/auth/token", auto_error=False)
+
+async def current_user(request: Request, token: Optional[str] = Depends(_bearer)) -> Optional[CurrentUser]:
+    """Dependency: the user of the request's bearer token, or None for the local profile.
+
+    Also sets ``request.state.user_id``, which response caches and ETags are keyed by.
+    """
+    if token is None:
+        if AUTH_REQUIRED:
+            raise _unauthorized("Not authenticated")
+        user = None
+    else:
+        user = await verify_token(token)
+    request.state.user_id = owner_id(user)
+    return user
+
+async def websocket_user(
+    websocket: WebSocket,
+    access_token: Optional[str] = Query(None, description="Bearer token; browsers cannot set headers on a WebSocket"),
+) -> Optional[CurrentUser]:
+    """Dependency: ``current_user`` for WebSocket routes, which the bearer scheme cannot serve.
+
+    The token comes from the ``Authorization`` header or, for browsers, the
+    ``access_token`` query parameter. Failures close the handshake with 1008.
+    """
+    scheme, _, token = websocket.headers.get("authorization", "").partition(" ")
+    token = token if scheme.lower() == "bearer" and token else access_token
+    try:
+        if token is None:
+            if AUTH_REQUIRED:
+                raise _unauthorized("Not authenticated")
+            return None
+        return await verify_token(token)
+    except HTTPException as e:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=e.detail)
+
+async def require_user(user: Optional[CurrentUser] = Depends(current_user)) -> CurrentUser:
+    """Dependency: the user of the request's bearer token, even when ``AUTH_REQUIRED`` is off"""
+    if user is None:
+        raise _unauthorized("Not authenticated")
+    return user
+
+def owner_id(user: Optional[CurrentUser]) -> Optional[int]:
+    """``user_id`` of the rows ``user`` owns; None for the local profile"""
+    return user.id if user is not None else None
+
+def owned_by(model, user: Optional[CurrentUser], indexed: bool = True):
+    """Filter on ``model`` rows owned by ``user``.
+
+    ``indexed=False`` compares ``user_id + 0``, which no index can serve, for
+    queries another index should drive (the calendar R*Tree): given a usable
+    ``user_id`` index SQLite plans through it and never probes the R*Tree.
+    """
+    owner = model.user_id if indexed else model.user_id + 0
+    if user is None:
+        return owner.is_(None)
+    return owner == user.id
@@ -0,0 +1,106 @@
+"""
+Committed-write tracking for cache invalidation and the change feed.
+
+Every session records what it wrote: ORM flushes as one ``(table, op, id)``
+change per row, Core-style ``insert``/``update``/``delete`` statements as a
+single change with ``id=None`` unless they are keyed by primary key.
+Changes also carry the row's ``user_id`` where the session saw it: from the
+flushed instance, or from a ``change_owners`` ({id: user_id}) execution option
+on statements keyed by primary key; ``UNKNOWN_OWNER`` otherwise.
+Once the transaction commits, the written tables' versions are bumped and the
+changes are handed to the ``on_commit`` listeners; a rollback discards them.
+
+A cached result stamped with ``table_versions(...)`` is still valid while the
+stamp compares equal. Versions live in process memory, so they only see writes
+made through this process's sessions (the app runs as a single uvicorn worker).
+"""
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import ORMExecuteState, Session
+
+_PENDING_CHANGES = "pending_changes"
+
+UNKNOWN_OWNER: Any = object()
+
+class Change(NamedTuple):
+    table: str
+    op: str  # create, update or delete
+    id: Optional[int]
+    owner: Any = UNKNOWN_OWNER  # user_id of the row (None: the local profile)
+
+_versions: Dict[str, int] = defaultdict(int)
+
+_listeners: List[Callable[[List[Change]], None]] = []
+
+def table_versions(*table_names: str) -> Tuple[int, ...]:
+    """Current write versions of ``table_names``, in the order given"""
+    return tuple(_versions[name] for name in table_names)
+
+def bump_versions(*table_names: str):
+    """Invalidate cached reads of ``table_names`` ahead of a write that is not committed yet"""
+    for name in table_names:
+        _versions[name] += 1
+
+def on_commit(listener: Callable[[List[Change]], None]):
+    """Call ``listener`` with the changes of every committed transaction that wrote"""
+    _listeners.append(listener)
+    return listener
+
+def _pending(session: Session) -> Dict[Change, None]:
+    # Insertion-ordered set, so a row flushed twice is reported once
+    return session.info.setdefault(_PENDING_CHANGES, {})
+
+@event.listens_for(Session, "do_orm_execute")
+def _record_statement(state: ORMExecuteState):
+    if state.is_insert:
+        op = "create"
+    elif state.is_update:
+        op = "update"
+    elif state.is_delete:
+        op = "delete"
+    else:
+        return
+    table = getattr(state.statement, "table", None)
+    if table is None:
+        return
+    pending = _pending(state.session)
+    params = state.parameters
+    if isinstance(params, list) and params and all("id" in row for row in params):
+        # Executemany keyed by primary key (ORM bulk UPDATE): the rows are known
+        owners = state.execution_options.get("change_owners", {})
+        for row in params:
+            pending[Change(table.name, op, row["id"], owners.get(row["id"], UNKNOWN_OWNER))] = None
+    else:
+        pending[Change(table.name, op, None)] = None
+
+def _change(instance, op: str) -> Change:
+    # Only the loaded value: reading an expired attribute here would query
+    owner = inspect(instance).dict.get("user_id", UNKNOWN_OWNER)
+    return Change(instance.__table__.name, op, instance.id, owner)
+
+@event.listens_for(Session, "after_flush")
+def _record_flush(session: Session, flush_context):
+    pending = _pending(session)
+    for instance in session.new:
+        pending[_change(instance, "create")] = None
+    for instance in session.dirty:
+        if session.is_modified(instance, include_collections=False):
+            pending[_change(instance, "update")] = None
+    for instance in session.deleted:
+        pending[_change(instance, "delete")] = None
+
+@event.listens_for(Session, "after_commit")
+def _publish_changes(session: Session):
+    changes = list(session.info.pop(_PENDING_CHANGES, ()))
+    if not changes:
+        return
+    for name in {change.table for change in changes}:
+        _versions[name] += 1
+    for listener in _listeners:
+        listener(changes)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session: Session):
+    session.info.pop(_PENDING_CHANGES, None)
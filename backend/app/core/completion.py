@@ -0,0 +1,81 @@
+"""
+Pluggable chat completion backends.
+
+A backend turns the conversation context into a stream of text tokens. The
+backend used by the chat router is picked with ``CHAT_BACKEND``: a registered
+name (``stub`` is the default) or ``package.module:ClassName`` for a backend
+that lives outside this repo and is constructed without arguments.
+
+The stub backend is deterministic (the same prompt always yields the same
+reply), needs no model files and can simulate generation speed through
+``STUB_TOKEN_DELAY``, so streaming latency can be measured and exercised
+offline.
+"""
+import asyncio
+from abc import ABC, abstractmethod
+import hashlib
+import importlib
+import os
+import random
+from typing import AsyncIterator, Callable, Dict, List, Optional, TypedDict
+
+class PromptMessage(TypedDict):
+    role: str
+    content: str
+
+class CompletionBackend(ABC):
+    """Interface every backend implements"""
+
+    @abstractmethod
+    def stream(self, messages: List[PromptMessage], max_tokens: int) -> AsyncIterator[str]:
+        """Yield the reply to ``messages`` one token at a time, at most ``max_tokens`` of them"""
+
+_BACKENDS: Dict[str, Callable[[], CompletionBackend]] = {}
+
+def register_backend(name: str):
+    """Register a backend factory under ``name``"""
+    def register(factory: Callable[[], CompletionBackend]):
+        _BACKENDS[name] = factory
+        return factory
+    return register
+
+@register_backend("stub")
+class StubBackend(CompletionBackend):
+    """Deterministic offline generator seeded by the prompt"""
+
+    VOCABULARY = (
+        "sure I can help with that . here is a plan : first review the open tasks , "
+        "then block time on the calendar for the most urgent ones and reply to the "
+        "important emails before the end of the day"
+    ).split()
+
+    def __init__(self, token_delay: Optional[float] = None):
+        self.token_delay = float(os.getenv("STUB_TOKEN_DELAY", "0")) if token_delay is None else token_delay
+
+    async def stream(self, messages: List[PromptMessage], max_tokens: int) -> AsyncIterator[str]:
+        prompt = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+        rng = random.Random(hashlib.sha256(prompt.encode()).digest())
+        length = min(max_tokens, rng.randint(16, 96))
+        for n in range(length):
+            word = rng.choice(self.VOCABULARY)
+            # Always yield to the event loop, even with no simulated delay
+            await asyncio.sleep(self.token_delay)
+            yield word if n == 0 else f" {word}"
+
+def load_backend(spec: str) -> CompletionBackend:
+    """Instantiate a backend from a registered name or a ``module:Class`` path"""
+    if spec in _BACKENDS:
+        return _BACKENDS[spec]()
+    module_name, _, attribute = spec.partition(":")
+    if not attribute:
+        raise ValueError(f"Unknown chat backend {spec!r}; expected one of {sorted(_BACKENDS)} or module:Class")
+    return getattr(importlib.import_module(module_name), attribute)()
+
+_backend = None
+
+def get_completion_backend() -> CompletionBackend:
+    """Dependency returning the configured backend, created on first use"""
+    global _backend
+    if _backend is None:
+        _backend = load_backend(os.getenv("CHAT_BACKEND", "stub"))
+    return _backend
@@ -1,18 +1,131 @@
-from sqlalchemy import create_engine
+from dataclasses import dataclass, field
+from typing import Any, Dict
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 import os
 
 # Database URL - using SQLite for simplicity in development
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./ai_assistant.db")
+IS_SQLITE = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+
+def _async_url(url: str) -> str:
+    """Map a sync database URL onto its async driver (aiosqlite / asyncpg)"""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql:"):
+        return url.replace("postgresql:", "postgresql+asyncpg:", 1)
+    if url.startswith("postgres:"):
+        return url.replace("postgres:", "postgresql+asyncpg:", 1)
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", _async_url(SQLALCHEMY_DATABASE_URL))
+
+@dataclass(frozen=True)
+class StorageProfile:
+    """SQLite pragmas applied to every new connection, plus reader pool sizing"""
+    name: str
+    pragmas: Dict[str, Any] = field(default_factory=dict)
+    read_pool_size: int = 4
+
+STORAGE_PROFILES = {
+    # Single self-contained file and full fsyncs; easy to inspect, copy or delete
+    "dev": StorageProfile(
+        "dev",
+        {"journal_mode": "DELETE", "synchronous": "FULL", "busy_timeout": 5000},
+        read_pool_size=2,
+    ),
+    # WAL so reads never wait for the writer; NORMAL sync is durable against app
+    # crashes and only loses the last commits on power loss
+    "desktop": StorageProfile(
+        "desktop",
+        {
+            "journal_mode": "WAL", "synchronous": "NORMAL", "busy_timeout": 5000,
+            "cache_size": -16_000, "mmap_size": 64 * 2**20, "temp_store": "MEMORY",
+        },
+        read_pool_size=4,
+    ),
+    "server": StorageProfile(
+        "server",
+        {
+            "journal_mode": "WAL", "synchronous": "NORMAL", "busy_timeout": 15000,
+            "cache_size": -64_000, "mmap_size": 512 * 2**20, "temp_store": "MEMORY",
+            "wal_autocheckpoint": 4000,
+        },
+        read_pool_size=16,
+    ),
+}
+
+STORAGE_PROFILE = STORAGE_PROFILES[os.getenv("STORAGE_PROFILE", "desktop")]
+
+# Separate reader connections need a database they can all open; an in-memory
+# database exists per connection, so it gets by with the writer alone
+_SHARED_FILE = IS_SQLITE and ":memory:" not in SQLALCHEMY_DATABASE_URL
+
+def _apply_pragmas(dbapi_connection, read_only: bool = False):
+    cursor = dbapi_connection.cursor()
+    for name, value in STORAGE_PROFILE.pragmas.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+    if read_only:
+        cursor.execute("PRAGMA query_only = ON")
+    cursor.close()
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
+    SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False} if "sqlite" in SQLALCHEMY_DATABASE_URL else {}
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engines used by the API routers so queries never block the event loop.
+# SQLite allows one writer at a time: with a single pooled writer connection,
+# concurrent write sessions queue in the pool instead of failing with
+# "database is locked" after lock-upgrade deadlocks, while GET routes read
+# through their own pool of query_only connections.
+if IS_SQLITE:
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=AsyncAdaptedQueuePool, pool_size=1, max_overflow=0)
+    async_read_engine = (
+        create_async_engine(
+            ASYNC_DATABASE_URL,
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=STORAGE_PROFILE.read_pool_size,
+            max_overflow=0,
+        )
+        if _SHARED_FILE else async_engine
+    )
+
+    @event.listens_for(engine, "connect")
+    def _tune_sync_connection(dbapi_connection, connection_record):
+        _apply_pragmas(dbapi_connection)
+
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _tune_writer_connection(dbapi_connection, connection_record):
+        _apply_pragmas(dbapi_connection)
+
+    if async_read_engine is not async_engine:
+        @event.listens_for(async_read_engine.sync_engine, "connect")
+        def _tune_reader_connection(dbapi_connection, connection_record):
+            _apply_pragmas(dbapi_connection, read_only=True)
+else:
+    async_engine = create_async_engine(ASYNC_DATABASE_URL)
+    async_read_engine = async_engine
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+AsyncReadSessionLocal = async_sessionmaker(
+    async_read_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 Base = declarative_base()
 
 def get_db():
@@ -23,7 +136,27 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """Dependency to get an async database session on the writer connection"""
+    from .write_behind import flag_writer
+    # Queued flag toggles are committed first, so every session reads its own writes
+    await flag_writer.flush()
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    """Dependency to get a read-only async database session for GET routes"""
+    from .write_behind import flag_writer
+    await flag_writer.flush()
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+async def dispose_engines():
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
+
 def create_tables():
-    """Create all database tables"""
-    from ..models import task, calendar_event, email_message, user, chat_message, suggestion, push_subscription
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    """Create all database tables and indexes by applying pending schema migrations"""
+    from .migrations import run_migrations
+    run_migrations(engine)
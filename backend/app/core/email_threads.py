@@ -0,0 +1,210 @@
+"""
+Email conversation threading.
+
+Messages are threaded as they are inserted: a message joins the thread of any
+Message-ID it shares with an earlier message, whether its own (a parent that
+arrives after its replies), its In-Reply-To or one of its References. Every
+Message-ID seen is recorded in ``email_thread_refs``, including those of
+messages that have not arrived yet, so the lookup is a handful of primary key
+reads per message and never a scan of the mailbox.
+
+When a message links threads that were separate so far, they are merged
+union-find style: the younger threads get ``parent_id`` set to the oldest one
+(their own children are re-pointed too, so a root is always one step away)
+and their counts are folded into it. The messages keep their ``thread_id``, so
+a merge costs a few thread rows however long the conversations are; a
+conversation is its root thread and the threads pointing at it.
+
+Message counts, unread counts and the latest message of each root thread are
+kept by SQLite triggers (migration 11) on every insert, delete and read flag
+change, bulk statements and the write-behind flag writer included, so the
+conversation list reads one row per conversation. Other backends thread
+messages but keep no counts; their conversation list aggregates per request.
+
+Threads belong to the owner of their messages (``user_id``, app.core.auth):
+Message-IDs are only unique within a mailbox, so the references of a user's
+messages are recorded under keys prefixed with the user id, and two users'
+copies of a message never share a conversation.
+"""
+import re
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List
+
+from sqlalchemy import Select, func, insert, or_, select, update
+from sqlalchemy.engine import Connection
+
+from ..models.email_message import EmailThread, EmailThreadRef, thread_subject
+
+_MESSAGE_ID = re.compile(r"<([^<>\s]+)>")
+_KEY_LENGTH = 255
+_LOOKUP_CHUNK = 500
+
+# Root of the thread a message row was put in, in trigger SQL
+_ROOT = "(SELECT coalesce(parent_id, id) FROM email_threads WHERE id = {row}.thread_id)"
+
+def message_ids(header: str) -> List[str]:
+    """Message-IDs in a header value, without angle brackets; bare ids are split on whitespace"""
+    if not header:
+        return []
+    return _MESSAGE_ID.findall(header) or header.split()
+
+def _keys(row: Dict[str, Any]) -> List[str]:
+    keys = message_ids(row.get("message_id"))[:1] + message_ids(row.get("references")) + message_ids(row.get("in_reply_to"))
+    owner = row.get("user_id")
+    if owner is not None:
+        # Parsed ids never contain whitespace, so these cannot collide with the local profile's
+        keys = [f"{owner} {key}" for key in keys]
+    return list(dict.fromkeys(key[:_KEY_LENGTH] for key in keys))
+
+def _lookup(conn: Connection, keys: Iterable[str]) -> Dict[str, int]:
+    """Root thread of every known Message-ID among ``keys``"""
+    keys = list(keys)
+    root = func.coalesce(EmailThread.parent_id, EmailThread.id)
+    known = {}
+    for offset in range(0, len(keys), _LOOKUP_CHUNK):
+        result = conn.execute(
+            select(EmailThreadRef.message_id, root)
+            .join(EmailThread, EmailThread.id == EmailThreadRef.thread_id)
+            .where(EmailThreadRef.message_id.in_(keys[offset:offset + _LOOKUP_CHUNK]))
+        )
+        known.update(result.all())
+    return known
+
+def _merge(conn: Connection, root: int, merged: List[int]):
+    """Point ``merged`` root threads (and their children) at ``root`` and fold their counts into it"""
+    threads = conn.execute(
+        select(
+            EmailThread.message_count, EmailThread.unread_count,
+            EmailThread.latest_message_id, EmailThread.latest_received_at,
+        ).where(EmailThread.id.in_([root, *merged]))
+    ).all()
+    latest = max(
+        (thread for thread in threads if thread.latest_received_at is not None),
+        key=lambda thread: (thread.latest_received_at, thread.latest_message_id),
+        default=None,
+    )
+    conn.execute(update(EmailThread).where(EmailThread.id == root).values(
+        message_count=sum(thread.message_count for thread in threads),
+        unread_count=sum(thread.unread_count for thread in threads),
+        latest_message_id=latest.latest_message_id if latest else None,
+        latest_received_at=latest.latest_received_at if latest else None,
+    ))
+    conn.execute(
+        update(EmailThread)
+        .where(or_(EmailThread.id.in_(merged), EmailThread.parent_id.in_(merged)))
+        .values(parent_id=root, message_count=0, unread_count=0, latest_message_id=None, latest_received_at=None)
+    )
+
+def assign_threads(conn: Connection, rows: List[Dict[str, Any]]):
+    """Set ``thread_id`` on email rows about to be inserted, creating and merging threads as needed.
+
+    Rows are threaded in order, so a reply later in the batch finds the thread
+    of a message earlier in it. Rows that already have a ``thread_id`` are left
+    alone. Runs in the caller's transaction.
+    """
+    pending = [row for row in rows if row.get("thread_id") is None]
+    if not pending:
+        return
+    keys = [_keys(row) for row in pending]
+    known = _lookup(conn, {key for row_keys in keys for key in row_keys})
+
+    # Union-find over thread ids; threads started by this batch get negative ids
+    parent: Dict[int, int] = {}
+
+    def find(thread: int) -> int:
+        root = thread
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while parent.get(thread, thread) != root:
+            parent[thread], thread = root, parent[thread]
+        return root
+
+    subjects: Dict[int, str] = {}
+    owners: Dict[int, Any] = {}
+    new_refs: Dict[str, int] = {}
+    assigned = []
+    for row, row_keys in zip(pending, keys):
+        found = {find(known[key]) for key in row_keys if key in known}
+        if found:
+            # Stored threads win over new ones, and older over younger
+            thread = min(found, key=lambda t: (t < 0, abs(t)))
+            for other in found:
+                parent[other] = thread
+        else:
+            thread = -(len(subjects) + 1)
+            subjects[thread] = thread_subject(row["subject"])[:255]
+            owners[thread] = row.get("user_id")
+        for key in row_keys:
+            if key not in known:
+                known[key] = new_refs[key] = thread
+        assigned.append(thread)
+
+    created: Dict[int, int] = {}
+    started = [thread for thread in subjects if find(thread) == thread]
+    if started:
+        now = datetime.utcnow()
+        ids = conn.execute(
+            insert(EmailThread).returning(EmailThread.id, sort_by_parameter_order=True),
+            [
+                {"subject": subjects[thread], "user_id": owners[thread], "message_count": 0, "unread_count": 0, "created_at": now}
+                for thread in started
+            ],
+        ).scalars().all()
+        created = dict(zip(started, ids))
+
+    merges = defaultdict(list)
+    for thread in parent:
+        if thread > 0 and find(thread) != thread:
+            merges[find(thread)].append(thread)
+    for root, merged in merges.items():
+        _merge(conn, root, merged)
+
+    def resolve(thread: int) -> int:
+        root = find(thread)
+        return created.get(root, root)
+
+    if new_refs:
+        conn.execute(
+            insert(EmailThreadRef),
+            [{"message_id": key, "thread_id": resolve(thread)} for key, thread in new_refs.items()],
+        )
+    for row, thread in zip(pending, assigned):
+        row["thread_id"] = resolve(thread)
+
+def conversation_threads(thread_id: int) -> Select:
+    """Ids of the threads making up the conversation rooted at ``thread_id``"""
+    return select(EmailThread.id).where(or_(EmailThread.id == thread_id, EmailThread.parent_id == thread_id))
+
+def thread_triggers() -> List[str]:
+    """Trigger DDL keeping root threads' counts and latest message in step with email_messages"""
+    newer = (
+        "latest_received_at IS NULL OR NEW.received_at > latest_received_at "
+        "OR (NEW.received_at = latest_received_at AND NEW.id > latest_message_id)"
+    )
+    latest = (
+        "(SELECT m.id, m.received_at FROM email_messages m "
+        "WHERE m.thread_id IN (SELECT t.id FROM email_threads t "
+        "WHERE t.id = email_threads.id OR t.parent_id = email_threads.id) "
+        "ORDER BY m.received_at DESC, m.id DESC LIMIT 1)"
+    )
+    return [
+        "CREATE TRIGGER IF NOT EXISTS email_messages_thread_insert AFTER INSERT ON email_messages "
+        "WHEN NEW.thread_id IS NOT NULL BEGIN "
+        "UPDATE email_threads SET message_count = message_count + 1, "
+        "unread_count = unread_count + (NOT coalesce(NEW.is_read, 0)), "
+        f"latest_message_id = CASE WHEN {newer} THEN NEW.id ELSE latest_message_id END, "
+        f"latest_received_at = CASE WHEN {newer} THEN NEW.received_at ELSE latest_received_at END "
+        f"WHERE id = {_ROOT.format(row='NEW')}; END",
+        "CREATE TRIGGER IF NOT EXISTS email_messages_thread_read AFTER UPDATE OF is_read ON email_messages "
+        "WHEN NEW.thread_id IS NOT NULL AND coalesce(NEW.is_read, 0) != coalesce(OLD.is_read, 0) BEGIN "
+        "UPDATE email_threads SET unread_count = unread_count + CASE WHEN NEW.is_read THEN -1 ELSE 1 END "
+        f"WHERE id = {_ROOT.format(row='NEW')}; END",
+        "CREATE TRIGGER IF NOT EXISTS email_messages_thread_delete AFTER DELETE ON email_messages "
+        "WHEN OLD.thread_id IS NOT NULL BEGIN "
+        "UPDATE email_threads SET message_count = message_count - 1, "
+        "unread_count = unread_count - (NOT coalesce(OLD.is_read, 0)) "
+        f"WHERE id = {_ROOT.format(row='OLD')}; "
+        f"UPDATE email_threads SET (latest_message_id, latest_received_at) = {latest} "
+        f"WHERE id = {_ROOT.format(row='OLD')} AND latest_message_id = OLD.id; END",
+    ]
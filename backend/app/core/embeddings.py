@@ -0,0 +1,130 @@
+"""
+Pluggable text embedders for semantic search.
+
+An embedder turns a batch of texts into L2-normalised float32 vectors of a
+fixed width ``dim``. The one used is picked with ``SEARCH_EMBEDDER``: a
+registered name (``hashing`` is the default) or ``package.module:ClassName``
+for an embedder that lives outside this repo, such as a sentence-embedding
+model, constructed without arguments. Its ``name`` and ``dim`` are stored with
+the vector index, which is rebuilt from the database when they change.
+
+The hashing embedder needs no model, download or network: stemmed words and
+word pairs are hashed into two of ``dim`` signed buckets each and weighted by
+sublinear term frequency, with the most common English words left out. With
+two buckets a word sharing one of them with another word still tells them
+apart, and the signs make the remaining collisions cancel out on average. It is deterministic across processes and machines
+(blake2b, not the salted ``hash()``). It matches shared vocabulary rather than
+meaning: "proposals" finds "proposal", but "invoice" does not find "bill".
+"""
+import hashlib
+import importlib
+import math
+import os
+import re
+from abc import ABC, abstractmethod
+from collections import Counter
+from functools import lru_cache
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+class Embedder(ABC):
+    """Interface every embedder implements"""
+
+    name: str
+    dim: int
+
+    @abstractmethod
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """One L2-normalised float32 row per text, shape ``(len(texts), dim)``; all zeros for an empty text"""
+
+_EMBEDDERS: Dict[str, Callable[[], Embedder]] = {}
+
+def register_embedder(name: str):
+    """Register an embedder factory under ``name``"""
+    def register(factory: Callable[[], Embedder]):
+        _EMBEDDERS[name] = factory
+        return factory
+    return register
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Scale every non-zero row to unit length, in place"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+_WORD = re.compile(r"[^\W_]+")
+_STOPWORDS = frozenset(
+    "a about after all also am an and any are as at be been but by can could did do does for from had has have "
+    "he her hi his how i if in into is it its just let me my no not of on or our out she so some than that the "
+    "their them then there these they this to up us was we were what when which who will with would you your".split()
+)
+
+def _stem(word: str) -> str:
+    # Plural and third-person "s" only; anything more aggressive merges unrelated words
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+@register_embedder("hashing")
+class HashingEmbedder(Embedder):
+    """Offline feature-hashing embedder over words and word pairs"""
+
+    PAIR_WEIGHT = 0.5
+    BUCKETS = 2  # per feature
+
+    def __init__(self, dim: int = None):
+        self.dim = dim or int(os.getenv("SEARCH_DIM", "256"))
+        self.name = f"hashing-v2-{self.dim}"
+        self._bucket = lru_cache(maxsize=1 << 18)(self._hash)
+
+    def _hash(self, feature: str) -> Tuple[Tuple[int, float], ...]:
+        digest = hashlib.blake2b(feature.encode(), digest_size=8 * self.BUCKETS).digest()
+        buckets = []
+        for offset in range(0, len(digest), 8):
+            value = int.from_bytes(digest[offset:offset + 8], "little")
+            buckets.append((value % self.dim, 1.0 if value >> 63 else -1.0))
+        return tuple(buckets)
+
+    def features(self, text: str) -> Counter:
+        """Weighted features of one text: stemmed words, and adjacent word pairs at ``PAIR_WEIGHT``"""
+        words = [_stem(word) for word in _WORD.findall(text.lower()) if word not in _STOPWORDS]
+        features = Counter(words)
+        for first, second in zip(words, words[1:]):
+            features[f"{first} {second}"] += 1
+        return features
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        rows: List[int] = []
+        columns: List[int] = []
+        values: List[float] = []
+        for row, text in enumerate(texts):
+            for feature, count in self.features(text).items():
+                weight = 1.0 + math.log(count)
+                if " " in feature:
+                    weight *= self.PAIR_WEIGHT
+                for bucket, sign in self._bucket(feature):
+                    rows.append(row)
+                    columns.append(bucket)
+                    values.append(sign * weight)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(vectors, (rows, columns), values)
+        return normalize_rows(vectors)
+
+def load_embedder(spec: str) -> Embedder:
+    """Instantiate an embedder from a registered name or a ``module:Class`` path"""
+    if spec in _EMBEDDERS:
+        return _EMBEDDERS[spec]()
+    module_name, _, attribute = spec.partition(":")
+    if not attribute:
+        raise ValueError(f"Unknown embedder {spec!r}; expected one of {sorted(_EMBEDDERS)} or module:Class")
+    return getattr(importlib.import_module(module_name), attribute)()
+
+_embedder = None
+
+def get_embedder() -> Embedder:
+    """The configured embedder, created on first use"""
+    global _embedder
+    if _embedder is None:
+        _embedder = load_embedder(os.getenv("SEARCH_EMBEDDER", "hashing"))
+    return _embedder
@@ -0,0 +1,143 @@
+"""
+In-process change feed.
+
+Committed writes (``app.core.changes``) are numbered with a feed version and
+fanned out to every subscriber's bounded queue. A subscriber that falls
+``QUEUE_SIZE`` events behind never slows the publisher down: its backlog is
+dropped and replaced by a ``reset`` event, after which the client refetches
+whatever it shows. The last ``HISTORY_SIZE`` events are retained so a client
+that reconnects can resume from the last version it saw.
+
+Changes to rows that belong to a user (tables with a ``user_id``, and the
+user's own ``users`` row) reach only that user's subscribers. When the writer
+did not record the owner (``app.core.changes``), every subscriber is told only
+that the table changed, without the id, as after a bulk statement.
+
+Versions start from the boot time in microseconds, so a version handed out by
+an earlier process is always outside the retained range and gets a reset.
+"""
+import asyncio
+import json
+import time
+from collections import deque
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from typing import Any, Collection, Deque, List, Optional, Set
+
+from .changes import UNKNOWN_OWNER, Change, on_commit
+from .database import Base
+from ..models.user import User
+
+QUEUE_SIZE = 256
+HISTORY_SIZE = 4096
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    version: int
+    entity: Optional[str]  # table name; None on reset
+    id: Optional[int]  # None when a bulk statement touched an unknown set of rows
+    op: str  # create, update, delete or reset
+    scoped: bool = False  # only the row's owner may see the id
+    owner: Any = UNKNOWN_OWNER
+    payload: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Serialised once at publish time and shared by every subscriber
+        payload = json.dumps({"version": self.version, "entity": self.entity, "id": self.id, "op": self.op})
+        object.__setattr__(self, "payload", payload)
+
+@lru_cache(maxsize=None)
+def _scoped(table: str) -> bool:
+    """Whether rows of ``table`` belong to a user"""
+    return table == User.__tablename__ or (table in Base.metadata.tables and "user_id" in Base.metadata.tables[table].c)
+
+class Subscription:
+    """One client's bounded view of the feed"""
+
+    def __init__(self, entities: Optional[Collection[str]], owner: Optional[int] = None):
+        self.entities = set(entities) if entities else None
+        self.owner = owner  # user id of the client; None: the local profile
+        self.queue: asyncio.Queue = asyncio.Queue(QUEUE_SIZE)
+
+    def offer(self, event: ChangeEvent):
+        if self.entities is not None and event.entity is not None and event.entity not in self.entities:
+            return
+        if event.scoped and event.id is not None and event.owner != self.owner:
+            if event.owner is not UNKNOWN_OWNER:
+                return
+            event = replace(event, id=None)
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(ChangeEvent(event.version, None, None, "reset"))
+
+    async def next(self, timeout: float) -> Optional[ChangeEvent]:
+        """The next event, or None if nothing arrived within ``timeout`` seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+class ChangeFeed:
+    def __init__(self):
+        self.version = time.time_ns() // 1000
+        # Versions in (_floor, version] are retained in _history
+        self._floor = self.version
+        self._history: Deque[ChangeEvent] = deque()
+        self._subscribers: Set[Subscription] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(
+        self, since: Optional[int] = None, entities: Optional[Collection[str]] = None, owner: Optional[int] = None
+    ) -> Subscription:
+        """Register a subscriber for ``owner``'s changes (None: the local profile), replaying
+        retained events after ``since`` when given"""
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(entities, owner)
+        if since is not None:
+            if self._floor <= since <= self.version:
+                for event in self._history:
+                    if event.version > since:
+                        subscription.offer(event)
+            else:
+                subscription.offer(ChangeEvent(self.version, None, None, "reset"))
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    def publish(self, changes: List[Change]):
+        """Number and fan out committed changes; safe to call from any thread"""
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is not loop:
+                loop.call_soon_threadsafe(self._fan_out, changes)
+                return
+        self._fan_out(changes)
+
+    def _fan_out(self, changes: List[Change]):
+        for change in changes:
+            self.version += 1
+            # A user's own row is theirs
+            owner = change.id if change.table == User.__tablename__ else change.owner
+            event = ChangeEvent(self.version, change.table, change.id, change.op, _scoped(change.table), owner)
+            self._history.append(event)
+            if len(self._history) > HISTORY_SIZE:
+                self._floor = self._history.popleft().version
+            for subscription in self._subscribers:
+                subscription.offer(event)
+
+change_feed = ChangeFeed()
+
+on_commit(change_feed.publish)
@@ -0,0 +1,270 @@
+"""
+Request timing and SQL profiling.
+
+``InstrumentationMiddleware`` times every HTTP request per route template and,
+through cursor events on the app's engines, counts the SQL statements each
+request runs and how long they take. Statements slower than ``SLOW_QUERY_MS``
+are logged and kept in ``recent_slow_queries``; a request that runs the same
+statement ``N_PLUS_ONE_THRESHOLD`` times or more (rows loaded one by one in a
+loop) is logged as a likely N+1. Responses carry a ``Server-Timing`` header
+with the request's time so far and its SQL time, and ``render_metrics()``
+exports the totals in the Prometheus text format.
+
+Sending ``X-Profile: 1`` runs the request under cProfile and replaces the body
+with the functions that took the most cumulative time; the original status
+and content type move to ``X-Profiled-Status`` and ``X-Profiled-Content-Type``.
+Profiled requests run one at a time, and whatever else the event loop does
+meanwhile shows up in the profile too. ``REQUEST_PROFILING=0`` ignores the
+header.
+"""
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict, deque
+from contextvars import ContextVar
+from typing import Deque, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .database import async_engine, async_read_engine, engine
+from .response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+N_PLUS_ONE_THRESHOLD = 10
+PROFILING_ENABLED = os.getenv("REQUEST_PROFILING", "1") != "0"
+PROFILE_LIMIT = 40  # functions listed in a profile
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+class SlowQuery(NamedTuple):
+    path: Optional[str]  # request path, None outside requests
+    statement: str
+    duration_ms: float
+    at: float  # time.time()
+
+recent_slow_queries: Deque[SlowQuery] = deque(maxlen=100)
+
+class RequestStats:
+    """SQL run on behalf of one request"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.statements: Counter = Counter()
+        self.sql_seconds = 0.0
+        self.slow = 0
+
+    @property
+    def statement_count(self) -> int:
+        return sum(self.statements.values())
+
+    def repeated(self) -> Optional[Tuple[str, int]]:
+        """The most repeated statement if it ran often enough to suggest an N+1 pattern"""
+        if not self.statements:
+            return None
+        statement, count = self.statements.most_common(1)[0]
+        return (statement, count) if count >= N_PLUS_ONE_THRESHOLD else None
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.statements[statement] += 1
+        stats.sql_seconds += elapsed
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        path = stats.path if stats is not None else None
+        if stats is not None:
+            stats.slow += 1
+        recent_slow_queries.append(SlowQuery(path, statement, round(elapsed * 1000, 3), time.time()))
+        logger.warning("Slow query (%.1f ms) during %s: %s", elapsed * 1000, path or "background work", statement)
+
+for _engine in {engine, async_engine.sync_engine, async_read_engine.sync_engine}:
+    event.listen(_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(_engine, "after_cursor_execute", _after_cursor_execute)
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total, result = 0, []
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+class RouteMetrics:
+    def __init__(self):
+        self.statuses: Counter = Counter()
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.sql_seconds = 0.0
+        self.slow_queries = 0
+        self.n_plus_one = 0
+
+_routes: Dict[Tuple[str, str], RouteMetrics] = defaultdict(RouteMetrics)
+
+def _route_label(scope: Scope) -> str:
+    # The path template keeps ids out of the labels
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+def _observe(scope: Scope, status: int, elapsed: float, stats: RequestStats):
+    route = _route_label(scope)
+    metrics = _routes[(scope["method"], route)]
+    metrics.statuses[status] += 1
+    metrics.latency.observe(elapsed)
+    metrics.statements.observe(stats.statement_count)
+    metrics.sql_seconds += stats.sql_seconds
+    metrics.slow_queries += stats.slow
+    repeated = stats.repeated()
+    if repeated is not None:
+        metrics.n_plus_one += 1
+        logger.warning("Possible N+1 in %s %s: statement ran %d times: %s", scope["method"], route, repeated[1], repeated[0])
+
+def _server_timing(stats: RequestStats, elapsed: float) -> str:
+    return (
+        f'app;dur={elapsed * 1000:.1f}, '
+        f'db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.statement_count} queries"'
+    )
+
+class InstrumentationMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._profile_lock = asyncio.Lock()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+        elif PROFILING_ENABLED and (b"x-profile", b"1") in scope["headers"]:
+            await self._profiled(scope, receive, send)
+        else:
+            await self._timed(scope, receive, send)
+
+    async def _timed(self, scope: Scope, receive: Receive, send: Send):
+        stats = RequestStats(scope["path"])
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_timed(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append("Server-Timing", _server_timing(stats, time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            _current.reset(token)
+            _observe(scope, status, time.perf_counter() - started, stats)
+
+    async def _profiled(self, scope: Scope, receive: Receive, send: Send):
+        messages: List[Message] = []
+
+        async def capture(message: Message):
+            messages.append(message)
+
+        async with self._profile_lock:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                await self._timed(scope, receive, capture)
+            finally:
+                profiler.disable()
+
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(PROFILE_LIMIT)
+        start = next(message for message in messages if message["type"] == "http.response.start")
+        original = MutableHeaders(scope=start)
+        body = output.getvalue().encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+                (b"x-profiled-status", str(start["status"]).encode()),
+                (b"x-profiled-content-type", original.get("content-type", "").encode()),
+                (b"server-timing", original.get("server-timing", "").encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+def _histogram_lines(name: str, histogram: Histogram, **labels: str) -> List[str]:
+    lines = [f"{name}_bucket{_labels(**labels, le=bound)} {count}" for bound, count in histogram.cumulative()]
+    lines.append(f"{name}_sum{_labels(**labels)} {histogram.sum}")
+    lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+    return lines
+
+def render_metrics() -> str:
+    """Request, SQL and response cache metrics in the Prometheus text exposition format"""
+    sections = {
+        "app_http_requests_total": ("counter", "HTTP requests by route and status", []),
+        "app_http_request_duration_seconds": ("histogram", "HTTP request latency", []),
+        "app_sql_statements_per_request": ("histogram", "SQL statements run by one request", []),
+        "app_sql_duration_seconds_total": ("counter", "Time spent in SQL statements", []),
+        "app_sql_slow_queries_total": ("counter", f"SQL statements slower than {SLOW_QUERY_MS:g} ms", []),
+        "app_sql_n_plus_one_total": ("counter", "Requests repeating one statement like an N+1 loop", []),
+    }
+    for (method, route), metrics in sorted(_routes.items()):
+        for status, count in sorted(metrics.statuses.items()):
+            sections["app_http_requests_total"][2].append(
+                f"app_http_requests_total{_labels(method=method, route=route, status=status)} {count}"
+            )
+        sections["app_http_request_duration_seconds"][2].extend(
+            _histogram_lines("app_http_request_duration_seconds", metrics.latency, method=method, route=route)
+        )
+        sections["app_sql_statements_per_request"][2].extend(
+            _histogram_lines("app_sql_statements_per_request", metrics.statements, method=method, route=route)
+        )
+        for name, value in (
+            ("app_sql_duration_seconds_total", metrics.sql_seconds),
+            ("app_sql_slow_queries_total", metrics.slow_queries),
+            ("app_sql_n_plus_one_total", metrics.n_plus_one),
+        ):
+            sections[name][2].append(f"{name}{_labels(method=method, route=route)} {value}")
+
+    cache = response_cache.stats()
+    for key, kind in (
+        ("hits", "counter"), ("misses", "counter"), ("stale", "counter"), ("evictions", "counter"),
+        ("invalidations", "counter"), ("entries", "gauge"), ("bytes", "gauge"),
+    ):
+        name = f"app_response_cache_{key}" + ("_total" if kind == "counter" else "")
+        sections[name] = (kind, f"Response cache {key}", [f"{name} {cache[key]}"])
+
+    lines = []
+    for name, (kind, description, samples) in sections.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
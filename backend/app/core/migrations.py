@@ -0,0 +1,323 @@
+"""
+Versioned schema bootstrap.
+
+Each migration is applied once, in order, inside its own transaction and
+recorded in the ``schema_version`` table, so restarting the app only costs a
+single version lookup. Migrations must be idempotent: a fresh database gets
+the full current schema from ``create_all`` in migration 1, and later steps
+then find their objects already present.
+
+Run out-of-band with ``python -m app.core.migrations``.
+"""
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import insert, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from .database import IS_SQLITE, Base, engine
+
+Migration = Tuple[int, str, Callable[[Connection], None]]
+
+MIGRATIONS: List[Migration] = []
+
+def migration(version: int, description: str):
+    """Register a migration step"""
+    def register(fn: Callable[[Connection], None]):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+def _load_models():
+    from ..models import task, calendar_event, calendar_event_exception, email_message, user, chat_message, suggestion, push_subscription, scheduled_job
+
+def _create_indexes(conn: Connection, table_name: str, *index_names: str):
+    """Create model-declared indexes that are missing on an existing table"""
+    table = Base.metadata.tables[table_name]
+    for index in table.indexes:
+        if index.name in index_names:
+            index.create(bind=conn, checkfirst=True)
+
+def _add_column(conn: Connection, table_name: str, column_name: str, ddl: str):
+    """ALTER TABLE ... ADD COLUMN unless the column already exists"""
+    existing = {column["name"] for column in inspect(conn).get_columns(table_name)}
+    if column_name not in existing:
+        quoted = conn.dialect.identifier_preparer.quote(column_name)
+        conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {quoted} {ddl}"))
+
+@migration(1, "baseline schema")
+def _baseline(conn: Connection):
+    Base.metadata.create_all(bind=conn)
+
+@migration(2, "hot-path composite indexes")
+def _hot_path_indexes(conn: Connection):
+    _create_indexes(conn, "email_messages", "ix_email_messages_received_at", "ix_email_messages_flags_received_at")
+    _create_indexes(conn, "calendar_events", "ix_calendar_events_start_end")
+    _create_indexes(conn, "tasks", "ix_tasks_completed_due_date")
+
+@migration(3, "keyset pagination indexes")
+def _keyset_indexes(conn: Connection):
+    # Superseded by (received_at, id), which SQLite also scans backwards for DESC pages
+    conn.execute(text("DROP INDEX IF EXISTS ix_email_messages_received_at"))
+    _create_indexes(conn, "email_messages", "ix_email_messages_received_at_id")
+    _create_indexes(conn, "calendar_events", "ix_calendar_events_start_id")
+    _create_indexes(conn, "tasks", "ix_tasks_due_date_id")
+
+@migration(4, "calendar interval index")
+def _calendar_interval_index(conn: Connection):
+    if not IS_SQLITE:
+        # Other backends answer overlap queries from ix_calendar_events_start_end
+        return
+    conn.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS calendar_events_rtree USING rtree(id, start_ts, end_ts)"
+    ))
+    bounds = (
+        "min(CAST(strftime('%s', {row}.start_time) AS REAL), CAST(strftime('%s', {row}.end_time) AS REAL)), "
+        "max(CAST(strftime('%s', {row}.start_time) AS REAL), CAST(strftime('%s', {row}.end_time) AS REAL))"
+    )
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS calendar_events_rtree_insert AFTER INSERT ON calendar_events BEGIN "
+        f"INSERT INTO calendar_events_rtree VALUES (NEW.id, {bounds.format(row='NEW')}); END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS calendar_events_rtree_update "
+        "AFTER UPDATE OF id, start_time, end_time ON calendar_events BEGIN "
+        "DELETE FROM calendar_events_rtree WHERE id = OLD.id; "
+        f"INSERT INTO calendar_events_rtree VALUES (NEW.id, {bounds.format(row='NEW')}); END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS calendar_events_rtree_delete AFTER DELETE ON calendar_events BEGIN "
+        "DELETE FROM calendar_events_rtree WHERE id = OLD.id; END"
+    ))
+    conn.execute(text("DELETE FROM calendar_events_rtree"))
+    conn.execute(text(
+        f"INSERT INTO calendar_events_rtree SELECT e.id, {bounds.format(row='e')} FROM calendar_events e"
+    ))
+
+@migration(5, "email full-text index")
+def _email_fts_index(conn: Connection):
+    if not IS_SQLITE:
+        return
+    conn.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS email_messages_fts USING fts5("
+        "subject, sender, body, content='email_messages', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2')"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS email_messages_fts_insert AFTER INSERT ON email_messages BEGIN "
+        "INSERT INTO email_messages_fts (rowid, subject, sender, body) "
+        "VALUES (NEW.id, NEW.subject, NEW.sender, NEW.body); END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS email_messages_fts_delete AFTER DELETE ON email_messages BEGIN "
+        "INSERT INTO email_messages_fts (email_messages_fts, rowid, subject, sender, body) "
+        "VALUES ('delete', OLD.id, OLD.subject, OLD.sender, OLD.body); END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS email_messages_fts_update "
+        "AFTER UPDATE OF subject, sender, body ON email_messages BEGIN "
+        "INSERT INTO email_messages_fts (email_messages_fts, rowid, subject, sender, body) "
+        "VALUES ('delete', OLD.id, OLD.subject, OLD.sender, OLD.body); "
+        "INSERT INTO email_messages_fts (rowid, subject, sender, body) "
+        "VALUES (NEW.id, NEW.subject, NEW.sender, NEW.body); END"
+    ))
+    conn.execute(text("INSERT INTO email_messages_fts (email_messages_fts) VALUES ('rebuild')"))
+
+@migration(6, "email list preview column")
+def _email_preview(conn: Connection):
+    from ..models.email_message import make_preview
+
+    _add_column(conn, "email_messages", "preview", "VARCHAR(160)")
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            text("SELECT id, body FROM email_messages WHERE id > :last AND preview IS NULL ORDER BY id LIMIT 1000"),
+            {"last": last_id},
+        ).all()
+        if not rows:
+            break
+        conn.execute(
+            text("UPDATE email_messages SET preview = :preview WHERE id = :id"),
+            [{"id": row.id, "preview": make_preview(row.body)} for row in rows],
+        )
+        last_id = rows[-1].id
+
+@migration(7, "chat thread index and summaries")
+def _chat_threads(conn: Connection):
+    from ..models.chat_message import THREAD_TITLE_LENGTH, estimate_tokens
+
+    _add_column(conn, "chat_messages", "token_count", "INTEGER")
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            text("SELECT id, content FROM chat_messages WHERE id > :last AND token_count IS NULL ORDER BY id LIMIT 1000"),
+            {"last": last_id},
+        ).all()
+        if not rows:
+            break
+        conn.execute(
+            text("UPDATE chat_messages SET token_count = :tokens WHERE id = :id"),
+            [{"id": row.id, "tokens": estimate_tokens(row.content)} for row in rows],
+        )
+        last_id = rows[-1].id
+    _create_indexes(conn, "chat_messages", "ix_chat_messages_thread_created_id")
+
+    Base.metadata.tables["chat_threads"].create(bind=conn, checkfirst=True)
+    conn.execute(text(
+        "INSERT INTO chat_threads (thread_id, title, message_count, last_message_at, created_at) "
+        "SELECT g.thread_id, "
+        f"(SELECT substr(m.content, 1, {THREAD_TITLE_LENGTH}) FROM chat_messages m "
+        "WHERE m.thread_id = g.thread_id ORDER BY m.created_at, m.id LIMIT 1), "
+        "count(*), max(g.created_at), min(g.created_at) FROM chat_messages g "
+        "WHERE g.thread_id IS NOT NULL AND g.thread_id NOT IN (SELECT thread_id FROM chat_threads) "
+        "GROUP BY g.thread_id"
+    ))
+
+@migration(8, "suggestion sources")
+def _suggestion_sources(conn: Connection):
+    _add_column(conn, "suggestions", "source_type", "VARCHAR(50)")
+    _add_column(conn, "suggestions", "source_id", "INTEGER")
+    _add_column(conn, "suggestions", "rule", "VARCHAR(50)")
+    _create_indexes(conn, "suggestions", "ux_suggestions_source_rule", "ix_suggestions_dismissed_created_id")
+
+@migration(9, "scheduled jobs and reminders")
+def _scheduled_jobs(conn: Connection):
+    from .reminders import reminder_backfill, reminder_triggers
+
+    Base.metadata.tables["scheduled_jobs"].create(bind=conn, checkfirst=True)
+    if not IS_SQLITE:
+        return
+    # Frozen as shipped: the source tables get their owners only in migration 12
+    for statement in reminder_triggers(owner=False) + reminder_backfill(owner=False):
+        conn.execute(text(statement))
+
+@migration(10, "recurring calendar events")
+def _recurring_events(conn: Connection):
+    _add_column(conn, "calendar_events", "rrule", "TEXT")
+    _add_column(conn, "calendar_events", "recurrence_end", "DATETIME")
+    _create_indexes(conn, "calendar_events", "ix_calendar_events_series")
+    Base.metadata.tables["calendar_event_exceptions"].create(bind=conn, checkfirst=True)
+
+@migration(11, "email conversation threads")
+def _email_threads(conn: Connection):
+    from ..models.email_message import thread_subject
+    from .email_threads import thread_triggers
+
+    _add_column(conn, "email_messages", "message_id", "VARCHAR(255)")
+    _add_column(conn, "email_messages", "in_reply_to", "VARCHAR(255)")
+    _add_column(conn, "email_messages", "references", "TEXT")
+    _add_column(conn, "email_messages", "thread_id", "INTEGER")
+    _create_indexes(conn, "email_messages", "ix_email_messages_thread_received_id")
+    for name in ("email_threads", "email_thread_refs"):
+        Base.metadata.tables[name].create(bind=conn, checkfirst=True)
+
+    # Stored mail has no headers to link it by, so each message starts its own conversation
+    emails, threads = Base.metadata.tables["email_messages"], Base.metadata.tables["email_threads"]
+    now = datetime.utcnow()
+    while True:
+        rows = conn.execute(
+            select(emails.c.id, emails.c.subject, emails.c.is_read, emails.c.received_at)
+            .where(emails.c.thread_id.is_(None))
+            .order_by(emails.c.id)
+            .limit(1000)
+        ).all()
+        if not rows:
+            break
+        ids = conn.execute(
+            insert(threads).returning(threads.c.id, sort_by_parameter_order=True),
+            [
+                {
+                    "subject": thread_subject(row.subject)[:255], "message_count": 1, "unread_count": int(not row.is_read),
+                    "latest_message_id": row.id, "latest_received_at": row.received_at, "created_at": now,
+                }
+                for row in rows
+            ],
+        ).scalars().all()
+        conn.execute(
+            text("UPDATE email_messages SET thread_id = :thread WHERE id = :id"),
+            [{"id": row.id, "thread": thread} for row, thread in zip(rows, ids)],
+        )
+    if IS_SQLITE:
+        for statement in thread_triggers():
+            conn.execute(text(statement))
+
+@migration(12, "per-user rows")
+def _user_scoping(conn: Connection):
+    # Existing rows keep user_id NULL: they belong to the local profile
+    for table_name in ("tasks", "calendar_events", "email_messages", "email_threads"):
+        _add_column(conn, table_name, "user_id", "INTEGER REFERENCES users(id)")
+    # Every list query now filters on the owner first, so the list indexes lead with it
+    for name in (
+        "ix_tasks_due_date_id", "ix_calendar_events_start_id", "ix_email_messages_received_at_id",
+        "ix_email_messages_flags_received_at", "ix_email_threads_latest_id",
+    ):
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    _create_indexes(conn, "tasks", "ix_tasks_user_due_date_id")
+    _create_indexes(conn, "calendar_events", "ix_calendar_events_user_start_id")
+    _create_indexes(conn, "email_messages", "ix_email_messages_user_received_id", "ix_email_messages_user_flags_received")
+    _create_indexes(conn, "email_threads", "ix_email_threads_user_latest_id")
+
+@migration(13, "suggestion owners")
+def _suggestion_owners(conn: Connection):
+    _add_column(conn, "suggestions", "user_id", "INTEGER REFERENCES users(id)")
+    # Generated suggestions belong to the owner of the row they were derived from
+    for source in ("tasks", "calendar_events", "email_messages"):
+        conn.execute(text(
+            f"UPDATE suggestions SET user_id = (SELECT user_id FROM {source} WHERE {source}.id = suggestions.source_id) "
+            f"WHERE source_type = '{source}'"
+        ))
+    conn.execute(text("DROP INDEX IF EXISTS ix_suggestions_dismissed_created_id"))
+    _create_indexes(conn, "suggestions", "ix_suggestions_user_dismissed_created_id")
+
+@migration(14, "notification owners")
+def _notification_owners(conn: Connection):
+    from .reminders import drop_reminder_triggers, reminder_owner_backfill, reminder_triggers
+
+    # Existing subscriptions keep user_id NULL: they were registered by the local profile
+    _add_column(conn, "push_subscriptions", "user_id", "INTEGER REFERENCES users(id)")
+    _add_column(conn, "scheduled_jobs", "user_id", "INTEGER REFERENCES users(id)")
+    _create_indexes(conn, "scheduled_jobs", "ix_scheduled_jobs_user_run_at_id")
+    if not IS_SQLITE:
+        return
+    # The triggers now copy the owner onto the reminders they schedule
+    for statement in drop_reminder_triggers() + reminder_triggers() + reminder_owner_backfill():
+        conn.execute(text(statement))
+
+_schema_current = False
+
+def current_version(conn: Connection) -> int:
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        "version INTEGER PRIMARY KEY, description VARCHAR(255) NOT NULL, applied_at TIMESTAMP NOT NULL)"
+    ))
+    return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+
+def run_migrations(bind: Engine = engine) -> int:
+    """Apply pending migrations and return the resulting schema version"""
+    global _schema_current
+    _load_models()
+    head = MIGRATIONS[-1][0]
+    if _schema_current and bind is engine:
+        return head
+
+    with bind.begin() as conn:
+        version = current_version(conn)
+
+    for step, description, apply in MIGRATIONS:
+        if step <= version:
+            continue
+        with bind.begin() as conn:
+            apply(conn)
+            conn.execute(
+                text("INSERT INTO schema_version (version, description, applied_at) VALUES (:v, :d, :t)"),
+                {"v": step, "d": description, "t": datetime.utcnow()},
+            )
+        version = step
+
+    if bind is engine:
+        _schema_current = True
+    return version
+
+if __name__ == "__main__":
+    print(f"✅ Schema at version {run_migrations()}")
@@ -0,0 +1,85 @@
+"""
+Keyset (cursor) pagination for the list endpoints.
+
+A cursor is an opaque, URL-safe token holding the sort key (a timestamp, or a
+number such as a search rank) and id of the last row on the previous page. The next page is fetched with a row-value comparison
+against that key, which the ``(sort_key, id)`` indexes answer with a seek
+instead of scanning and discarding ``skip`` rows like OFFSET does.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence, Tuple, Union
+
+from fastapi import HTTPException, Query
+from sqlalchemy import Select, and_, or_, tuple_
+from sqlalchemy.orm import InstrumentedAttribute
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+CursorQuery = Query(
+    None,
+    description=(
+        "Opaque keyset cursor. Pass an empty string for the first page, then the value "
+        f"of the {NEXT_CURSOR_HEADER} response header; skip is ignored in this mode."
+    ),
+)
+
+SortValue = Union[datetime, float, None]
+
+def encode_cursor(sort_value: SortValue, row_id: int) -> str:
+    payload = json.dumps([sort_value.isoformat() if isinstance(sort_value, datetime) else sort_value, row_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Optional[Tuple[SortValue, int]]:
+    """Decode a cursor into ``(sort_value, id)``; the empty cursor means the first page"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        if isinstance(sort_value, str):
+            sort_value = datetime.fromisoformat(sort_value)
+        elif sort_value is not None and not isinstance(sort_value, (int, float)):
+            raise TypeError(sort_value)
+        return (sort_value, int(row_id))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset_page(
+    query: Select,
+    sort_column: InstrumentedAttribute,
+    id_column: InstrumentedAttribute,
+    cursor: str,
+    limit: int,
+    descending: bool = False,
+) -> Select:
+    """Order ``query`` by ``(sort_column, id)`` and seek past the cursor position.
+
+    Ascending pages put NULL sort keys first, so a nullable column (``Task.due_date``)
+    pages through its NULL rows by id before moving on to real values.
+    """
+    position = decode_cursor(cursor)
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+        if position is not None:
+            query = query.where(tuple_(sort_column, id_column) < tuple_(*position))
+    else:
+        query = query.order_by(sort_column.asc().nulls_first(), id_column.asc())
+        if position is not None:
+            sort_value, row_id = position
+            if sort_value is None:
+                query = query.where(or_(
+                    and_(sort_column.is_(None), id_column > row_id),
+                    sort_column.is_not(None),
+                ))
+            else:
+                query = query.where(tuple_(sort_column, id_column) > tuple_(sort_value, row_id))
+    return query.limit(limit)
+
+def next_cursor(rows: Sequence[Any], sort_attr: str, limit: int) -> Optional[str]:
+    """Cursor for the page after ``rows``, or None when this was the last page"""
+    if limit <= 0 or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(getattr(last, sort_attr), last.id)
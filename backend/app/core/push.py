@@ -0,0 +1,87 @@
+"""
+Pluggable push notification senders.
+
+The sender used for reminders is picked with ``PUSH_SENDER``: a registered
+name (``local`` is the default) or ``package.module:ClassName`` for a sender
+that lives outside this repo, such as a Web Push client, constructed without
+arguments. A sender raises ``SubscriptionGone`` when the push service reports
+that a subscription no longer exists; the subscription is then deleted.
+
+The local sender delivers nothing: it records each notification in memory and
+logs it, and ``PUSH_SEND_DELAY`` simulates the round trip to a push service,
+so scheduling and delivery can be exercised and measured offline.
+"""
+import asyncio
+import importlib
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Callable, Deque, Dict, NamedTuple, Optional
+
+from ..models.push_subscription import PushSubscription
+
+logger = logging.getLogger(__name__)
+
+class SubscriptionGone(Exception):
+    """The push service no longer accepts messages for this subscription"""
+
+class PushSender(ABC):
+    """Interface every sender implements"""
+
+    @abstractmethod
+    async def send(self, subscription: PushSubscription, payload: Dict[str, Any]):
+        """Deliver ``payload`` to one subscription; raise ``SubscriptionGone`` if it has expired"""
+
+_SENDERS: Dict[str, Callable[[], PushSender]] = {}
+
+def register_sender(name: str):
+    """Register a sender factory under ``name``"""
+    def register(factory: Callable[[], PushSender]):
+        _SENDERS[name] = factory
+        return factory
+    return register
+
+class Delivery(NamedTuple):
+    endpoint: str
+    payload: Dict[str, Any]
+    delivered_at: float  # time.time()
+
+@register_sender("local")
+class LocalSender(PushSender):
+    """Offline stand-in that keeps the most recent deliveries in memory"""
+
+    def __init__(self, delay: Optional[float] = None, history: int = 1000):
+        self.delay = float(os.getenv("PUSH_SEND_DELAY", "0")) if delay is None else delay
+        self.deliveries: Deque[Delivery] = deque(maxlen=history)
+        self.sent = 0
+        # Endpoints to treat as expired, e.g. to exercise subscription cleanup
+        self.gone = set()
+
+    async def send(self, subscription: PushSubscription, payload: Dict[str, Any]):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if subscription.endpoint in self.gone:
+            raise SubscriptionGone(subscription.endpoint)
+        self.sent += 1
+        self.deliveries.append(Delivery(subscription.endpoint, payload, time.time()))
+        logger.info("Push to %s: %s", subscription.endpoint, payload.get("title"))
+
+def load_sender(spec: str) -> PushSender:
+    """Instantiate a sender from a registered name or a ``module:Class`` path"""
+    if spec in _SENDERS:
+        return _SENDERS[spec]()
+    module_name, _, attribute = spec.partition(":")
+    if not attribute:
+        raise ValueError(f"Unknown push sender {spec!r}; expected one of {sorted(_SENDERS)} or module:Class")
+    return getattr(importlib.import_module(module_name), attribute)()
+
+_sender = None
+
+def get_push_sender() -> PushSender:
+    """The configured sender, created on first use"""
+    global _sender
+    if _sender is None:
+        _sender = load_sender(os.getenv("PUSH_SENDER", "local"))
+    return _sender
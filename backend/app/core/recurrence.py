@@ -0,0 +1,297 @@
+"""
+Recurring calendar events.
+
+A series is a single ``calendar_events`` row with an RFC 5545 ``rrule``. Its
+``start_time`` and ``end_time`` are the first occurrence (DTSTART and the
+duration of every occurrence), and ``recurrence_end`` is when the last
+occurrence ends, NULL for rules without COUNT or UNTIL. Occurrences are never
+stored: readers expand only the series intersecting the requested window and
+apply the series' ``calendar_event_exceptions`` on top (cancelled occurrences
+and per-occurrence overrides, keyed by the occurrence's original start).
+
+Expansion is cached per series in fixed ``BUCKET``-long slices of time: a
+window is answered from the buckets it touches, each expanded once and kept in
+an LRU of ``EXPANSION_CACHE_SIZE`` buckets. The key holds everything the
+expansion depends on (rule, first occurrence, bucket), so an edited series
+simply misses, and exceptions are applied after the lookup. Expanding a bucket
+years into a series moves DTSTART forward by whole rule periods first, so the
+cost does not grow with the series' age. Rules recur at most hourly, and one
+window yields at most ``MAX_OCCURRENCES`` per series.
+
+Finding ``recurrence_end`` means walking the rule to its last occurrence, so
+rules are accepted only with COUNT at most ``MAX_SERIES_OCCURRENCES``, UNTIL
+at most ``MAX_SERIES_YEARS`` after DTSTART and, either way, at most
+``MAX_SERIES_OCCURRENCES`` occurrences in all.
+"""
+import os
+from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import islice, takewhile
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from dateutil.rrule import rrule, rrulestr
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+EXPANSION_CACHE_SIZE = int(os.getenv("RECURRENCE_CACHE_SIZE", "65536"))
+MAX_OCCURRENCES = 5000
+MAX_SERIES_OCCURRENCES = 10000
+MAX_SERIES_YEARS = 100
+BUCKET = timedelta(days=30)
+
+Position = Tuple[datetime, int]  # (start_time, id) of a keyset cursor
+
+_EPOCH = datetime(1970, 1, 1)
+
+def _fields(value: str) -> Dict[str, str]:
+    return dict(part.split("=", 1) for part in value.split(";") if "=" in part)
+
+@lru_cache(maxsize=4096)
+def parse_rule(value: str, dtstart: datetime) -> rrule:
+    """The rule ``value`` anchored at ``dtstart``; raises ValueError when it does not parse"""
+    if "\n" in value or "\r" in value:
+        raise ValueError("rrule must be a single RRULE line")
+    # Times are naive UTC, so UNTIL=...Z is read as naive UTC too
+    rule = rrulestr(value, dtstart=dtstart.replace(tzinfo=None), ignoretz=True)
+    if not isinstance(rule, rrule):
+        raise ValueError("rrule must be a single RRULE line")
+    return rule
+
+def normalize_rule(value: str, dtstart: datetime) -> str:
+    """``value`` without an ``RRULE:`` prefix, checked against ``dtstart``"""
+    value = value.strip()
+    if value[:6].upper() == "RRULE:":
+        value = value[6:]
+    value = value.upper()
+    rule = parse_rule(value, dtstart)
+    fields = _fields(value)
+    if fields.get("FREQ") in ("MINUTELY", "SECONDLY"):
+        raise ValueError("events recur at most hourly")
+    if rule._count is not None and rule._count > MAX_SERIES_OCCURRENCES:
+        raise ValueError(f"COUNT must be at most {MAX_SERIES_OCCURRENCES}")
+    if rule._until is not None and rule._until.year - dtstart.year > MAX_SERIES_YEARS:
+        raise ValueError(f"UNTIL must be at most {MAX_SERIES_YEARS} years after the first occurrence")
+    if "COUNT" in fields or "UNTIL" in fields:
+        _last_start(value, dtstart)
+    return value
+
+@lru_cache(maxsize=1024)
+def _last_start(value: str, dtstart: datetime) -> Optional[datetime]:
+    """The start of a bounded rule's last occurrence, walking at most
+    ``MAX_SERIES_OCCURRENCES`` of them; raises ValueError past that"""
+    last = None
+    for count, last in enumerate(islice(parse_rule(value, dtstart), MAX_SERIES_OCCURRENCES + 1), 1):
+        if count > MAX_SERIES_OCCURRENCES:
+            raise ValueError(f"rrule must have at most {MAX_SERIES_OCCURRENCES} occurrences")
+    return last
+
+def recurrence_end(value: Optional[str], start: datetime, end: datetime) -> Optional[datetime]:
+    """When the last occurrence ends: None for single events and never-ending series"""
+    if not value or ("COUNT=" not in value and "UNTIL=" not in value):
+        return None
+    last = _last_start(value, start)
+    return (last if last is not None else start) + (end - start)
+
+_PERIODS = {"HOURLY": timedelta(hours=1), "DAILY": timedelta(days=1), "WEEKLY": timedelta(weeks=1)}
+# dateutil derives the day of monthly and yearly rules from DTSTART unless one of these is given
+_DAY_FIELDS = ("BYMONTHDAY", "BYDAY", "BYYEARDAY", "BYWEEKNO", "BYEASTER")
+
+def _anchor(value: str, dtstart: datetime, after: datetime) -> Tuple[str, datetime]:
+    """A rule and later DTSTART, at or before ``after``, with the same occurrences as
+    ``value`` from DTSTART on, found by moving DTSTART forward by whole rule periods"""
+    fields = _fields(value)
+    freq = fields.get("FREQ")
+    interval = int(fields.get("INTERVAL", "1"))
+    if "COUNT" in fields or after <= dtstart:
+        # COUNT is counted from the first occurrence
+        return value, dtstart
+    if freq in _PERIODS:
+        period = _PERIODS[freq] * interval
+        return value, dtstart + period * ((after - dtstart) // period)
+    if not any(name in fields for name in _DAY_FIELDS):
+        value += f";BYMONTHDAY={dtstart.day}"
+        if freq == "YEARLY" and "BYMONTH" not in fields:
+            value += f";BYMONTH={dtstart.month}"
+    if freq == "MONTHLY":
+        months = (after.year - dtstart.year) * 12 + after.month - dtstart.month
+        years, month = divmod(dtstart.month - 1 + months - months % interval, 12)
+        return value, dtstart.replace(year=dtstart.year + years, month=month + 1, day=1)
+    if freq == "YEARLY":
+        years = after.year - dtstart.year
+        return value, dtstart.replace(year=dtstart.year + years - years % interval, month=1, day=1)
+    return value, dtstart
+
+def _starts_from(value: str, dtstart: datetime, after: datetime) -> Iterator[datetime]:
+    """Occurrence starts from ``after`` on"""
+    if after <= dtstart:
+        return iter(parse_rule(value, dtstart))
+    value, anchor = _anchor(value, dtstart, after)
+    rule = parse_rule(value, dtstart)
+    if anchor != dtstart:
+        rule = rule.replace(dtstart=anchor)
+    return rule.xafter(after, inc=True)
+
+def _bucket(moment: datetime) -> int:
+    return (moment - _EPOCH) // BUCKET
+
+@lru_cache(maxsize=EXPANSION_CACHE_SIZE)
+def _bucket_starts(value: str, dtstart: datetime, bucket: int) -> Tuple[datetime, ...]:
+    start = _EPOCH + bucket * BUCKET
+    end = start + BUCKET
+    return tuple(takewhile(lambda occurrence: occurrence < end, _starts_from(value, dtstart, start)))
+
+def occurrence_starts(
+    value: str,
+    dtstart: datetime,
+    after: Optional[datetime],
+    before: Optional[datetime],
+    limit: int,
+) -> Tuple[datetime, ...]:
+    """Up to ``limit`` occurrence starts in [after, before], either bound optional"""
+    first = dtstart if after is None or after < dtstart else after
+    if before is None:
+        return tuple(islice(_starts_from(value, dtstart, first), limit))
+    found: List[datetime] = []
+    for bucket in range(_bucket(first), _bucket(before) + 1):
+        found.extend(start for start in _bucket_starts(value, dtstart, bucket) if first <= start <= before)
+        if len(found) >= limit:
+            break
+    return tuple(found[:limit])
+
+def expansion_cache_info() -> Dict[str, int]:
+    info = _bucket_starts.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "entries": info.currsize, "max_entries": info.maxsize}
+
+def clear_expansion_cache():
+    _bucket_starts.cache_clear()
+
+def matches(
+    start: datetime, end: datetime, window_start: Optional[datetime], window_end: Optional[datetime], contained: bool,
+) -> bool:
+    """The list endpoint's window predicate: lying within [window_start, window_end],
+    or with ``contained`` False, intersecting [window_start, window_end)"""
+    if contained:
+        return (window_start is None or start >= window_start) and (window_end is None or end <= window_end)
+    return (window_end is None or start < window_end) and (window_start is None or end > window_start)
+
+_OVERRIDES = ("title", "description", "start_time", "end_time", "location")
+
+def expand(
+    series: Iterable[Mapping[str, Any]],
+    exceptions: Iterable[Any],
+    window_start: Optional[datetime],
+    window_end: Optional[datetime],
+    contained: bool = False,
+    after: Optional[Position] = None,
+    limit: int = MAX_OCCURRENCES,
+) -> List[Dict[str, Any]]:
+    """Occurrences of ``series`` rows in the window, sorted by (start_time, id).
+
+    Each occurrence is the series row with its own ``start_time``/``end_time``
+    and the original start as ``recurrence_id``, after applying ``exceptions``
+    (rows with ``event_id``, ``original_start``, ``cancelled`` and override
+    columns). With ``after``, only occurrences past that keyset position are
+    returned; ``limit`` applies per series.
+    """
+    by_series: Dict[int, Dict[datetime, Any]] = {}
+    for exception in exceptions:
+        by_series.setdefault(exception.event_id, {})[exception.original_start] = exception
+
+    occurrences = []
+    for row in series:
+        duration = row["end_time"] - row["start_time"]
+        overrides = by_series.get(row["id"], {})
+        lower = _lower(row, window_start, contained, after)
+        # The limit counts occurrences that are returned. Of the starts expanded from
+        # ``lower``, one may end exactly at window_start and one be the cursor's own
+        # position, and cancelled or moved occurrences do not count either.
+        wanted = limit + 2 + len(overrides)
+        found = []
+        for original in occurrence_starts(row["rrule"], row["start_time"], lower, window_end, wanted):
+            occurrence = _occurrence(row, original, duration, overrides.pop(original, None))
+            if occurrence is not None:
+                found.append(occurrence)
+        # Occurrences moved into the window from outside the expanded range
+        for original, exception in overrides.items():
+            if exception.start_time is not None or exception.end_time is not None:
+                occurrence = _occurrence(row, original, duration, exception)
+                if occurrence is not None:
+                    found.append(occurrence)
+        for occurrence in found:
+            if not matches(occurrence["start_time"], occurrence["end_time"], window_start, window_end, contained):
+                continue
+            if after is not None and (occurrence["start_time"], occurrence["id"]) <= after:
+                continue
+            occurrences.append(occurrence)
+    occurrences.sort(key=lambda occurrence: (occurrence["start_time"], occurrence["id"]))
+    return occurrences
+
+def _lower(row: Mapping[str, Any], window_start: Optional[datetime], contained: bool, after: Optional[Position]):
+    """Earliest start of an occurrence of ``row`` that can be in the window and past ``after``"""
+    lower = window_start
+    if window_start is not None and not contained:
+        lower = window_start - (row["end_time"] - row["start_time"])
+    if after is not None and (lower is None or after[0] > lower):
+        lower = after[0]
+    return lower
+
+def _occurrence(row: Mapping[str, Any], original: datetime, duration: timedelta, exception) -> Optional[Dict[str, Any]]:
+    occurrence = dict(row)
+    occurrence["start_time"] = original
+    occurrence["end_time"] = original + duration
+    occurrence["recurrence_id"] = original
+    if exception is not None:
+        if exception.cancelled:
+            return None
+        for name in _OVERRIDES:
+            value = getattr(exception, name)
+            if value is not None:
+                occurrence[name] = value
+        if exception.start_time is not None and exception.end_time is None:
+            occurrence["end_time"] = exception.start_time + duration
+        occurrence["updated_at"] = max(occurrence["updated_at"], exception.updated_at)
+    return occurrence
+
+async def load_occurrences(
+    db: AsyncSession,
+    columns: List[Any],
+    window_start: Optional[datetime],
+    window_end: Optional[datetime],
+    contained: bool = False,
+    after: Optional[Position] = None,
+    limit: int = MAX_OCCURRENCES,
+    where: Sequence[Any] = (),
+) -> List[Dict[str, Any]]:
+    """``expand`` the series that may have occurrences in the window, selecting ``columns``
+    of them (at least id, start_time, end_time, rrule and updated_at); ``where`` narrows the series"""
+    # The models import this module
+    from ..models.calendar_event import CalendarEvent, series_in_window
+    from ..models.calendar_event_exception import CalendarEventException
+
+    lower = window_start
+    if after is not None and (lower is None or after[0] > lower):
+        lower = after[0]
+    series = (await db.execute(series_in_window(select(*columns).where(*where), lower, window_end))).mappings().all()
+    if not series:
+        return []
+    
+    # Exceptions of occurrences that start, or were moved, close enough to the window
+    query = series_in_window(
+        select(*CalendarEventException.__table__.c)
+        .join(CalendarEvent, CalendarEvent.id == CalendarEventException.event_id)
+        .where(*where),
+        lower,
+        window_end,
+    )
+    earliest = lower
+    if window_start is not None and not contained:
+        earliest = min(_lower(row, window_start, contained, after) for row in series)
+    original, moved = [], [or_(CalendarEventException.start_time.is_not(None), CalendarEventException.end_time.is_not(None))]
+    if earliest is not None:
+        original.append(CalendarEventException.original_start >= earliest)
+        moved.append(func.coalesce(CalendarEventException.end_time, CalendarEventException.start_time) >= earliest)
+    if window_end is not None:
+        original.append(CalendarEventException.original_start <= window_end)
+        moved.append(func.coalesce(CalendarEventException.start_time, CalendarEventException.original_start) <= window_end)
+    exceptions = await db.execute(query.where(or_(and_(*original), and_(*moved))))
+    return expand(series, exceptions, window_start, window_end, contained, after, limit)
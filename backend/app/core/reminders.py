@@ -0,0 +1,170 @@
+"""
+Due-date reminders for tasks and calendar events, sent as push notifications.
+
+SQLite triggers (migration 9) keep one ``reminder`` job per open task with a
+future due date and per event that has not started, due ``TASK_REMINDER_LEAD``
+or ``EVENT_REMINDER_LEAD`` ahead of it (at once when that moment has passed).
+Every write path, bulk statements and other processes included, schedules,
+moves or cancels its reminder in the same transaction, and the scheduler never
+scans the source tables. Other backends get no reminders.
+
+A reminder belongs to the owner of its row (``user_id``) and is sent only to
+that owner's subscriptions. Each batch of due reminders is sent concurrently,
+at most ``SEND_CONCURRENCY`` requests in flight; subscriptions the push
+service reports gone are deleted, and a reminder is retried only when none of
+its owner's subscriptions received it.
+"""
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from datetime import timedelta
+from typing import List, NamedTuple, Set, Tuple
+
+from sqlalchemy import delete, select
+
+from .database import AsyncReadSessionLocal, AsyncSessionLocal
+from .push import SubscriptionGone, get_push_sender
+from .scheduler import Job, job_scheduler
+from ..models.calendar_event import CalendarEvent
+from ..models.push_subscription import PushSubscription
+from ..models.task import Task
+
+logger = logging.getLogger(__name__)
+
+REMINDER = "reminder"
+TASK_REMINDER_LEAD = timedelta(minutes=30)
+EVENT_REMINDER_LEAD = timedelta(minutes=10)
+SEND_CONCURRENCY = 32
+
+# Same text format SQLAlchemy stores DateTime columns in on SQLite
+_SQL_NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now') || '000'"
+
+def _sql_before(column: str, lead: timedelta) -> str:
+    return f"strftime('%Y-%m-%d %H:%M:%f', {column}, '-{int(lead.total_seconds())} seconds') || '000'"
+
+class _Source(NamedTuple):
+    table: str
+    due: str  # column the reminder precedes
+    lead: timedelta
+    url: str
+    columns: str  # columns whose updates reschedule the reminder
+    condition: str  # SQL, {row} is the source row
+    title: str
+    body: str
+
+_SOURCES = (
+    _Source(
+        Task.__tablename__, "due_date", TASK_REMINDER_LEAD, "/tasks", "title, due_date, completed",
+        "NOT {row}.completed",
+        "'Due soon: ' || {row}.title",
+        "'Due at ' || strftime('%H:%M', {row}.due_date) || ' UTC'",
+    ),
+    _Source(
+        CalendarEvent.__tablename__, "start_time", EVENT_REMINDER_LEAD, "/calendar", "title, start_time, location",
+        "1",
+        "'Starting soon: ' || {row}.title",
+        "'Starts at ' || strftime('%H:%M', {row}.start_time) || ' UTC' || coalesce(' in ' || {row}.location, '')",
+    ),
+)
+
+def _schedule_sql(source: _Source, row: str, owner: bool) -> Tuple[str, str]:
+    """INSERT ... SELECT adding the reminder for ``row`` (NEW in triggers, or a table alias) and its WHERE clause
+
+    ``owner`` copies the row's ``user_id`` onto the job; migration 9 runs before
+    the source tables have one, so it installs the statements without.
+    """
+    due = f"{row}.{source.due}"
+    payload = (
+        f"json_object('title', {source.title.format(row=row)}, 'body', {source.body.format(row=row)}, "
+        f"'url', '{source.url}', 'source_type', '{source.table}', 'source_id', {row}.id, 'due_at', {due})"
+    )
+    insert = (
+        f"INSERT OR REPLACE INTO scheduled_jobs (kind, key, run_at, payload, attempts, created_at{', user_id' if owner else ''}) "
+        f"SELECT '{REMINDER}', '{source.table}:' || {row}.id, max({_sql_before(due, source.lead)}, {_SQL_NOW}), "
+        f"{payload}, 0, {_SQL_NOW}{f', {row}.user_id' if owner else ''}"
+    )
+    return insert, f"{due} IS NOT NULL AND {due} > {_SQL_NOW} AND {source.condition.format(row=row)}"
+
+def reminder_triggers(owner: bool = True) -> List[str]:
+    """Trigger DDL keeping reminder jobs in step with their source rows"""
+    statements = []
+    for source in _SOURCES:
+        table = source.table
+        insert, where = _schedule_sql(source, "NEW", owner)
+        columns = f"{source.columns}, user_id" if owner else source.columns
+        cancel = f"DELETE FROM scheduled_jobs WHERE key = '{table}:' || OLD.id;"
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS {table}_reminder_insert AFTER INSERT ON {table} "
+            f"BEGIN {insert} WHERE {where}; END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_reminder_update AFTER UPDATE OF id, {columns} ON {table} "
+            f"BEGIN {cancel} {insert} WHERE {where}; END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_reminder_delete AFTER DELETE ON {table} BEGIN {cancel} END",
+        ]
+    return statements
+
+def drop_reminder_triggers() -> List[str]:
+    """Statements dropping the triggers of ``reminder_triggers``, so a migration can replace them"""
+    return [
+        f"DROP TRIGGER IF EXISTS {source.table}_reminder_{event}"
+        for source in _SOURCES
+        for event in ("insert", "update", "delete")
+    ]
+
+def reminder_owner_backfill() -> List[str]:
+    """Statements copying each pending reminder's owner from its source row"""
+    return [
+        f"UPDATE scheduled_jobs SET user_id = (SELECT user_id FROM {source.table} s "
+        f"WHERE s.id = CAST(substr(scheduled_jobs.key, {len(source.table) + 2}) AS INTEGER)) "
+        f"WHERE kind = '{REMINDER}' AND key LIKE '{source.table}:%'"
+        for source in _SOURCES
+    ]
+
+def reminder_backfill(owner: bool = True) -> List[str]:
+    """Statements scheduling reminders for rows that existed before the triggers"""
+    statements = []
+    for source in _SOURCES:
+        insert, where = _schedule_sql(source, "s", owner)
+        statements.append(f"{insert} FROM {source.table} s WHERE {where}")
+    return statements
+
+@job_scheduler.handler(REMINDER, watch=(Task.__tablename__, CalendarEvent.__tablename__))
+async def deliver_reminders(jobs: List[Job]) -> Set[int]:
+    """Send a batch of due reminders, each to its owner's subscriptions"""
+    owners = {job.user_id for job in jobs}
+    owned = PushSubscription.user_id.in_([owner for owner in owners if owner is not None])
+    if None in owners:
+        owned = owned | PushSubscription.user_id.is_(None)
+    async with AsyncReadSessionLocal() as db:
+        subscriptions = (await db.scalars(select(PushSubscription).where(owned))).all()
+    if not subscriptions:
+        return set()
+    by_owner = defaultdict(list)
+    for subscription in subscriptions:
+        by_owner[subscription.user_id].append(subscription)
+
+    sender = get_push_sender()
+    semaphore = asyncio.Semaphore(SEND_CONCURRENCY)
+    gone: Set[int] = set()
+    failures = Counter()
+
+    async def send(job: Job, subscription: PushSubscription):
+        if subscription.id in gone:
+            return
+        async with semaphore:
+            try:
+                await sender.send(subscription, job.payload)
+            except SubscriptionGone:
+                gone.add(subscription.id)
+            except Exception as exc:
+                logger.warning("Push of %s to subscription %d failed: %s", job.key, subscription.id, exc)
+                failures[job.id] += 1
+
+    await asyncio.gather(*(send(job, subscription) for job in jobs for subscription in by_owner[job.user_id]))
+
+    if gone:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(PushSubscription).where(PushSubscription.id.in_(gone)))
+            await db.commit()
+        logger.info("Removed %d expired push subscriptions", len(gone))
+    live = Counter(subscription.user_id for subscription in subscriptions if subscription.id not in gone)
+    return {job.id for job in jobs if live[job.user_id] and failures[job.id] >= live[job.user_id]}
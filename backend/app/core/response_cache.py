@@ -0,0 +1,199 @@
+"""
+In-memory LRU cache of serialised read responses.
+
+``cached_response(*models)`` wraps a list endpoint so that a repeated request
+(same path, query parameters and user, see ``app.core.auth``) is answered with the stored JSON body and
+headers, without running SQL or validating rows through the response model.
+Entries are stamped with the write versions of the tables they read
+(``app.core.changes``), taken before the handler runs, and are only served
+while the stamp is unchanged; committed writes also evict the entries of their
+tables at once, so the memory goes to live entries. The stamp check covers
+writes that are queued but not committed yet (``bump_versions``). Bodies
+rendered on the fast JSON path (``app.core.serialization``) are stored as is.
+
+The cache holds at most ``RESPONSE_CACHE_MB`` megabytes of bodies, evicting the
+least recently used entries; a single body larger than an eighth of that is
+not cached.
+"""
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from .changes import Change, on_commit, table_versions
+from .serialization import FastJSONResponse, headers_of
+
+CacheKey = Tuple[str, Optional[int], Tuple[Tuple[str, str], ...]]
+
+_LATENCY_SAMPLES = 1024
+
+class _Entry(NamedTuple):
+    tables: Tuple[str, ...]
+    stamp: Tuple[int, ...]
+    body: bytes
+    headers: Dict[str, str]
+
+def _percentile(samples: Deque[float], q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 3)
+
+class ResponseCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_bytes // 8
+        self._entries: "OrderedDict[CacheKey, _Entry]" = OrderedDict()
+        self._by_table: Dict[str, Set[CacheKey]] = {}
+        self._bytes = 0
+        # Commit listeners may run on worker threads
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.stale = self.evictions = self.invalidations = 0
+        self._hit_ms: Deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+        self._miss_ms: Deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+
+    def get(self, key: CacheKey, stamp: Tuple[int, ...]) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.stamp != stamp:
+                self.stale += 1
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: CacheKey, entry: _Entry):
+        size = len(entry.body)
+        if size > self.max_entry_bytes:
+            return
+        with self._lock:
+            # A commit since the stamp was taken already makes the entry stale
+            if entry.stamp != table_versions(*entry.tables):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += size
+            for table in entry.tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: CacheKey):
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.body)
+        for table in entry.tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+
+    def invalidate(self, changes: List[Change]):
+        """``on_commit`` listener dropping the entries of every written table"""
+        with self._lock:
+            for table in {change.table for change in changes}:
+                for key in self._by_table.pop(table, ()):
+                    if key in self._entries:
+                        self._remove(key)
+                        self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+            self._bytes = 0
+
+    def record(self, hit: bool, elapsed_ms: float):
+        (self._hit_ms if hit else self._miss_ms).append(elapsed_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.stale
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "hit_ms_p50": _percentile(self._hit_ms, 0.5),
+            "hit_ms_p99": _percentile(self._hit_ms, 0.99),
+            "miss_ms_p50": _percentile(self._miss_ms, 0.5),
+            "miss_ms_p99": _percentile(self._miss_ms, 0.99),
+        }
+
+response_cache = ResponseCache(int(float(os.getenv("RESPONSE_CACHE_MB", "32")) * 2**20))
+
+on_commit(response_cache.invalidate)
+
+_adapters: Dict[Any, TypeAdapter] = {}
+
+def _render(route, content: Any) -> bytes:
+    """Serialise a handler's return value the way its ``response_model`` would"""
+    adapter = _adapters.get(route.response_model)
+    if adapter is None:
+        adapter = _adapters[route.response_model] = TypeAdapter(route.response_model)
+    return adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+
+def cached_response(*models):
+    """Endpoint decorator serving repeated requests from ``response_cache`` until ``models`` change"""
+    table_names = tuple(model.__tablename__ for model in models)
+
+    def decorate(endpoint):
+        signature = inspect.signature(endpoint)
+        parameters = list(signature.parameters.values())
+        # The wrapper needs the request, and the response whose headers the route's
+        # dependencies and the endpoint set. FastAPI injects each into one parameter
+        # only, so the endpoint's own are shared and the others added.
+        names = {}
+        for kind in (Request, Response):
+            name = next((p.name for p in parameters if p.annotation is kind), None)
+            if name is None:
+                name = f"_cache_{kind.__name__.lower()}"
+                parameters.append(inspect.Parameter(name, inspect.Parameter.KEYWORD_ONLY, annotation=kind))
+            names[kind] = name
+        own = set(signature.parameters)
+
+        @functools.wraps(endpoint)
+        async def wrapper(**kwargs):
+            started = time.perf_counter()
+            request, sub_response = kwargs[names[Request]], kwargs[names[Response]]
+            key = (
+                request.url.path,
+                getattr(request.state, "user_id", None),
+                tuple(sorted(request.query_params.multi_items())),
+            )
+            stamp = table_versions(*table_names)
+            entry = response_cache.get(key, stamp)
+            hit = entry is not None
+            if not hit:
+                content = await endpoint(**{name: value for name, value in kwargs.items() if name in own})
+                if isinstance(content, FastJSONResponse) and content.status_code == 200:
+                    entry = _Entry(table_names, stamp, content.body, headers_of(content))
+                elif isinstance(content, Response):
+                    return content
+                else:
+                    entry = _Entry(table_names, stamp, _render(request.scope["route"], content), headers_of(sub_response))
+                response_cache.put(key, entry)
+            response = Response(
+                entry.body, media_type="application/json", headers={**entry.headers, **headers_of(sub_response)},
+            )
+            response_cache.record(hit, (time.perf_counter() - started) * 1000)
+            return response
+
+        wrapper.__signature__ = signature.replace(parameters=parameters)
+        return wrapper
+
+    return decorate
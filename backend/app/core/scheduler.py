@@ -0,0 +1,183 @@
+"""
+In-process background job scheduler.
+
+Pending jobs are rows of ``scheduled_jobs``; the (run_at, id) index orders
+them like a heap that survives restarts. The scheduler sleeps until the
+earliest ``run_at`` (``IDLE_RECHECK`` at most) and is woken early by commits
+to ``scheduled_jobs`` or to a table whose triggers add jobs (see
+``handler(watch=...)``), so it never polls the source tables. Due jobs are
+claimed in batches of ``BATCH_SIZE``, grouped by kind, handed to that kind's
+handler in one call and deleted once it returns. Delivery is at least once: a
+batch interrupted by a crash runs again after restart. Jobs that fail are
+retried with exponential backoff, and jobs found more than ``MISSED_GRACE``
+late (the app was not running) are dropped.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Collection, Dict, Iterable, List, NamedTuple, Optional, Set
+
+from sqlalchemy import bindparam, delete, func, select, update
+
+from .changes import Change, on_commit
+from .database import AsyncReadSessionLocal, AsyncSessionLocal
+from ..models.scheduled_job import ScheduledJob
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+MAX_ATTEMPTS = 5
+RETRY_DELAY = timedelta(seconds=30)  # doubled after every failed attempt
+MISSED_GRACE = timedelta(hours=1)
+# Upper bound on sleeping, so jobs added by other processes (whose commits this
+# process does not see) are picked up
+IDLE_RECHECK = timedelta(minutes=1)
+
+class Job(NamedTuple):
+    id: int
+    kind: str
+    key: str
+    run_at: datetime
+    payload: Dict[str, Any]
+    attempts: int
+    user_id: Optional[int]
+
+# Handlers receive every due job of their kind and return the ids to retry
+Handler = Callable[[List[Job]], Awaitable[Collection[int]]]
+
+_jobs = ScheduledJob.__table__
+
+_retry_job = (
+    update(_jobs)
+    .where(_jobs.c.id == bindparam("job_id"))
+    .values(run_at=bindparam("retry_at"), attempts=bindparam("next_attempt"))
+)
+
+class JobScheduler:
+    def __init__(self):
+        self._handlers: Dict[str, Handler] = {}
+        self._watched: Set[str] = {ScheduledJob.__tablename__}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.completed = 0  # jobs handled since start, for benchmarks
+
+    def handler(self, kind: str, watch: Iterable[str] = ()):
+        """Register the handler for ``kind``; commits to ``watch`` tables may have scheduled jobs"""
+        def register(fn: Handler):
+            self._handlers[kind] = fn
+            self._watched.update(watch)
+            return fn
+        return register
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = self._loop = None
+
+    def notify(self, changes: List[Change]):
+        """``on_commit`` listener; safe to call from any thread"""
+        loop = self._loop
+        if loop is None or not any(change.table in self._watched for change in changes):
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._wakeup.set()
+        else:
+            loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = datetime.utcnow()
+            next_run_at = None
+            async with AsyncReadSessionLocal() as db:
+                due = (await db.scalars(
+                    select(ScheduledJob)
+                    .where(ScheduledJob.run_at <= now)
+                    .order_by(ScheduledJob.run_at, ScheduledJob.id)
+                    .limit(BATCH_SIZE)
+                )).all()
+                if not due:
+                    next_run_at = await db.scalar(select(func.min(ScheduledJob.run_at)))
+            if due:
+                try:
+                    await self._dispatch(due, now)
+                except Exception:
+                    logger.exception("Running %d scheduled jobs failed", len(due))
+                    await asyncio.sleep(RETRY_DELAY.total_seconds())
+                continue
+
+            timeout = IDLE_RECHECK.total_seconds()
+            if next_run_at is not None:
+                timeout = max(0.0, min(timeout, (next_run_at - datetime.utcnow()).total_seconds()))
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _dispatch(self, rows: List[ScheduledJob], now: datetime):
+        by_kind = defaultdict(list)
+        for row in rows:
+            if row.kind not in self._handlers:
+                logger.error("Dropping job %s: no handler for kind %r", row.key, row.kind)
+            elif now - row.run_at > MISSED_GRACE:
+                logger.info("Dropping job %s, due %s: missed while not running", row.key, row.run_at)
+            else:
+                by_kind[row.kind].append(
+                    Job(row.id, row.kind, row.key, row.run_at, json.loads(row.payload or "{}"), row.attempts, row.user_id)
+                )
+
+        async def run(kind: str, jobs: List[Job]) -> Collection[int]:
+            try:
+                return await self._handlers[kind](jobs)
+            except Exception:
+                logger.exception("Handler for %d %r jobs failed", len(jobs), kind)
+                return [job.id for job in jobs]
+
+        results = await asyncio.gather(*(run(kind, jobs) for kind, jobs in by_kind.items()))
+        failed = set().union(*results)
+        retries, finished = [], []
+        for row in rows:
+            if row.id not in failed:
+                finished.append(row.id)
+            elif row.attempts + 1 < MAX_ATTEMPTS:
+                retries.append({
+                    "job_id": row.id,
+                    "retry_at": now + RETRY_DELAY * 2 ** row.attempts,
+                    "next_attempt": row.attempts + 1,
+                })
+            else:
+                logger.warning("Giving up on job %s after %d attempts", row.key, MAX_ATTEMPTS)
+        retrying = {retry["job_id"] for retry in retries}
+
+        async with AsyncSessionLocal() as db:
+            # Jobs replaced while they ran got new ids and are left alone
+            await db.execute(delete(ScheduledJob).where(ScheduledJob.id.in_(
+                [row.id for row in rows if row.id not in retrying]
+            )))
+            if retries:
+                await db.execute(_retry_job, retries)
+            await db.commit()
+        self.completed += len(finished)
+
+job_scheduler = JobScheduler()
+
+on_commit(job_scheduler.notify)
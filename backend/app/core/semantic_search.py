@@ -0,0 +1,258 @@
+"""
+Semantic search over tasks, emails and chat messages.
+
+Every row of the indexed tables is embedded (``app.core.embeddings``) into a
+vector stored in a memory-mapped ``VectorStore`` (``app.core.vector_index``),
+under ``SEARCH_INDEX_DIR``, by default next to the SQLite database file. A
+query is embedded the same way and answered with its nearest vectors, across
+all tables or some of them.
+
+The index follows the database like the suggestion engine does: committed
+writes (``app.core.changes``) mark the rows they touched and a background task
+re-embeds just those, in batches, off the event loop. Statements that touched
+an unknown set of rows make it reconcile the table instead, comparing the ids
+stored with the ids in the table, as does startup. Each row's text checksum is
+stored with its vector, so writes that leave the text alone (read flags,
+completion) cost a lookup and no embedding. Search results trail writes by
+the few milliseconds this takes.
+"""
+import asyncio
+import logging
+import os
+import tempfile
+import zlib
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Set
+
+import numpy as np
+from sqlalchemy import select
+
+from .changes import Change, on_commit
+from .database import IS_SQLITE, AsyncReadSessionLocal, engine
+from .embeddings import Embedder, get_embedder
+from .vector_index import Hit, VectorStore
+from ..models.chat_message import ChatMessage, thread_title
+from ..models.email_message import EmailMessage, make_preview
+from ..models.task import Task
+
+logger = logging.getLogger(__name__)
+
+# Rows read, embedded and stored per step
+BATCH_SIZE = 500
+
+class Source(NamedTuple):
+    """An indexed table"""
+    kind: int  # stored with its vectors; never reuse one
+    type: str  # name in the API
+    model: Any
+    columns: tuple  # read to build the text
+    text: Callable[[Any], str]  # titles are repeated so they weigh more than bodies
+    describe: Callable[[Any], Dict[str, Any]]  # title, snippet and timestamp of a hit
+
+SOURCES = (
+    Source(
+        1, "task", Task, (Task.title, Task.description),
+        lambda row: f"{row.title}\n{row.title}\n{row.description or ''}",
+        lambda task: {
+            "title": task.title, "snippet": make_preview(task.description) if task.description else None,
+            "timestamp": task.created_at,
+        },
+    ),
+    Source(
+        2, "email", EmailMessage, (EmailMessage.subject, EmailMessage.sender, EmailMessage.body),
+        lambda row: f"{row.subject}\n{row.subject}\n{row.sender}\n{row.body}",
+        lambda email: {"title": email.subject, "snippet": email.preview, "timestamp": email.received_at},
+    ),
+    Source(
+        3, "chat", ChatMessage, (ChatMessage.content,),
+        lambda row: row.content,
+        lambda message: {
+            "title": thread_title(message.content), "snippet": make_preview(message.content),
+            "timestamp": message.created_at,
+        },
+    ),
+)
+
+def _default_index_dir() -> str:
+    database = engine.url.database if IS_SQLITE else None
+    if database and database != ":memory:":
+        return database + ".vectors"
+    return tempfile.mkdtemp(prefix="vectors_")
+
+class SemanticIndex:
+    """Keeps a vector store in step with the source tables and answers queries from it"""
+
+    def __init__(self, sources: Sequence[Source], path: str = None, embedder: Embedder = None):
+        self._sources = {source.model.__tablename__: source for source in sources}
+        self._types = {source.type: source for source in sources}
+        self._kinds = {source.kind: source for source in sources}
+        self._path = path or os.getenv("SEARCH_INDEX_DIR")
+        self._embedder = embedder
+        self._store: Optional[VectorStore] = None
+        self._dirty: Dict[str, Set[int]] = defaultdict(set)
+        self._reconcile: Set[str] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._train = True
+        self.indexed = 0  # rows embedded since start, for benchmarks
+
+    @property
+    def types(self) -> List[str]:
+        return list(self._types)
+
+    @property
+    def embedder(self) -> Embedder:
+        if self._embedder is None:
+            self._embedder = get_embedder()
+        return self._embedder
+
+    @property
+    def store(self) -> VectorStore:
+        """The vector store, opened on first use"""
+        if self._store is None:
+            self._store = VectorStore(self._path or _default_index_dir(), self.embedder.dim, self.embedder.name)
+        return self._store
+
+    def source(self, kind: int) -> Source:
+        return self._kinds[kind]
+
+    def start(self):
+        """Start the background task; reconciles every table first"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        self.reconcile()
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = self._loop = None
+        if self._store is not None:
+            await asyncio.to_thread(self._store.flush)
+
+    def reconcile(self, *tables: str):
+        """Bring the index up to date with every row of ``tables`` (all of them by default)"""
+        self._reconcile.update(tables or self._sources)
+        self._idle.clear()
+        self._wakeup.set()
+
+    async def settle(self):
+        """Wait until every write committed so far is searchable"""
+        if self._task is not None:
+            await self._idle.wait()
+
+    def notify(self, changes: List[Change]):
+        """``on_commit`` listener; safe to call from any thread"""
+        loop = self._loop
+        if loop is None:
+            # Not running: the reconcile on start picks these writes up
+            return
+        changes = [change for change in changes if change.table in self._sources]
+        if not changes:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._mark(changes)
+        else:
+            loop.call_soon_threadsafe(self._mark, changes)
+
+    def _mark(self, changes: List[Change]):
+        for change in changes:
+            if change.id is None:
+                self._reconcile.add(change.table)
+            else:
+                self._dirty[change.table].add(change.id)
+        self._idle.clear()
+        self._wakeup.set()
+
+    async def _run(self):
+        # Loading the row map of a large store takes a moment; keep it off the loop
+        await asyncio.to_thread(lambda: self.store)
+        while True:
+            self._wakeup.clear()
+            if self._dirty or self._reconcile:
+                dirty, self._dirty = self._dirty, defaultdict(set)
+                reconcile, self._reconcile = self._reconcile, set()
+                for table, source in self._sources.items():
+                    ids = dirty.get(table, set())
+                    if table in reconcile:
+                        ids |= await self._reconcile_ids(source)
+                    if ids:
+                        await self._refresh(source, ids)
+                continue
+
+            if self._train and self.store.needs_training():
+                try:
+                    await asyncio.to_thread(self.store.train)
+                except Exception:
+                    logger.exception("Training the search index partition failed; searching exhaustively")
+                    self._train = False
+                continue
+
+            await asyncio.to_thread(self.store.flush)
+            self._idle.set()
+            await self._wakeup.wait()
+
+    async def _reconcile_ids(self, source: Source) -> Set[int]:
+        """Rows missing from the index and indexed rows gone from the table"""
+        async with AsyncReadSessionLocal() as db:
+            ids = np.fromiter(await db.scalars(select(source.model.id)), dtype=np.int64)
+        return set(np.setxor1d(ids, self.store.ids(source.kind)).tolist())
+
+    async def _refresh(self, source: Source, ids: Set[int]):
+        pending = sorted(ids)
+        for offset in range(0, len(pending), BATCH_SIZE):
+            batch = pending[offset:offset + BATCH_SIZE]
+            try:
+                async with AsyncReadSessionLocal() as db:
+                    rows = (await db.execute(
+                        select(source.model.id, *source.columns).where(source.model.id.in_(batch))
+                    )).all()
+                texts = {row.id: source.text(row) for row in rows}
+                self.indexed += await asyncio.to_thread(self._store_batch, source, batch, texts)
+            except Exception:
+                logger.exception("Indexing %d %s rows for search failed", len(batch), source.model.__tablename__)
+
+    def _store_batch(self, source: Source, batch: List[int], texts: Dict[int, str]) -> int:
+        checksums = {row_id: zlib.crc32(text.encode()) for row_id, text in texts.items()}
+        stored = self.store.checksums(source.kind, list(checksums))
+        changed = [row_id for row_id, checksum in checksums.items() if stored.get(row_id) != checksum]
+        if changed:
+            vectors = self.embedder.embed([texts[row_id] for row_id in changed])
+            self.store.upsert(source.kind, changed, [checksums[row_id] for row_id in changed], vectors)
+        self.store.remove(source.kind, [row_id for row_id in batch if row_id not in texts])
+        return len(changed)
+
+    async def search(self, query: str, types: Sequence[str] = None, limit: int = 20, exact: bool = False) -> List[Hit]:
+        """Indexed rows most similar to ``query``, best first; only rows sharing some of its terms match"""
+        vector = self.embedder.embed([query])
+        if not vector.any():
+            return []
+        kinds = [self._types[name].kind for name in types] if types else None
+        hits = (await asyncio.to_thread(self.store.search, vector, limit, kinds, exact))[0]
+        return [hit for hit in hits if hit.score > 0]
+
+    def stats(self) -> Dict[str, Any]:
+        store = self.store
+        return {
+            "embedder": store.fingerprint,
+            "dimensions": store.dim,
+            "vectors": len(store),
+            "partitions": store.partitions,
+            "pending": sum(map(len, self._dirty.values())) + len(self._reconcile),
+        }
+
+semantic_index = SemanticIndex(SOURCES)
+
+on_commit(semantic_index.notify)
@@ -0,0 +1,58 @@
+"""
+Fast JSON path for list endpoints.
+
+List handlers select exactly the columns of their response model with a Core
+``select`` and return ``rows_response(rows, response)``: the rows are encoded
+straight to JSON bytes, skipping the ORM identity map and per-row Pydantic
+validation. Routes keep ``response_model`` for the OpenAPI schema; FastAPI
+does not validate a ``Response`` returned by the endpoint, so the selected
+columns are what the client gets. orjson is used when it is installed,
+otherwise the standard library encoder.
+"""
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Type
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy.engine import Row
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+# Set per response by the framework rather than copied from the endpoint's response
+_FRAMEWORK_HEADERS = {"content-length", "content-type"}
+
+def response_columns(model: Type, schema: Type[BaseModel]) -> List[Any]:
+    """Columns of ``model`` named by the fields of ``schema``, in field order"""
+    return [getattr(model, name) for name in schema.model_fields]
+
+def _default(value: Any) -> str:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON, with datetimes in ISO format as FastAPI writes them"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def headers_of(response: Response) -> Dict[str, str]:
+    """Headers the endpoint or its dependencies set on ``response``"""
+    return {name: value for name, value in response.headers.items() if name not in _FRAMEWORK_HEADERS}
+
+def records_response(records: List[Dict[str, Any]], response: Response) -> FastJSONResponse:
+    """Encode dicts of column values as a JSON array, keeping the headers set on the injected ``response``"""
+    return FastJSONResponse(records, headers=headers_of(response))
+
+def rows_response(rows: Iterable[Row], response: Response) -> FastJSONResponse:
+    """Encode Core result rows as a JSON array, keeping the headers set on the injected ``response``"""
+    return records_response([row._asdict() for row in rows], response)
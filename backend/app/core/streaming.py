@@ -0,0 +1,130 @@
+"""
+Streaming NDJSON/CSV export and batched NDJSON import.
+
+Exports read through a server-side cursor (``yield_per``) and write one chunk
+per partition, so memory stays flat however large the table is. Imports parse
+the request body line by line and commit every ``IMPORT_BATCH_SIZE`` rows.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Type
+
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.engine import Connection
+
+from .database import AsyncReadSessionLocal, AsyncSessionLocal
+
+EXPORT_BATCH_SIZE = 1000
+IMPORT_BATCH_SIZE = 1000
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialise {type(value).__name__}")
+
+def _csv_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+async def _export_chunks(model, fields: List[str], fmt: str, criteria: Sequence[Any]) -> AsyncIterator[str]:
+    columns = [model.__table__.c[name] for name in fields]
+    query = select(*columns).where(*criteria).order_by(model.__table__.c.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    
+    async with AsyncReadSessionLocal() as db:
+        result = await db.stream(query)
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(fields)
+            async for rows in result.partitions():
+                writer.writerows([_csv_value(value) for value in row] for row in rows)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+        else:
+            async for rows in result.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(fields, row)), default=_json_default) + "\n"
+                    for row in rows
+                )
+
+def export_response(model, schema: Type[BaseModel], fmt: str, name: str, *criteria) -> StreamingResponse:
+    """Stream every row of ``model`` matching ``criteria``, shaped like ``schema``, as NDJSON or CSV"""
+    fields = list(schema.model_fields)
+    return StreamingResponse(
+        _export_chunks(model, fields, fmt, criteria),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
+
+async def _request_lines(request: Request) -> AsyncIterator[bytes]:
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+async def import_ndjson(
+    request: Request,
+    model,
+    schema: Type[BaseModel],
+    prepare: Optional[Callable[[Connection, List[Dict[str, Any]]], None]] = None,
+    values: Optional[Dict[str, Any]] = None,
+) -> int:
+    """Insert NDJSON rows validated by ``schema``; returns the number imported.
+
+    Each batch commits on its own, so a bad line stops the import with the
+    rows before it already stored; the error reports how many that was.
+    ``values`` are set on every row, such as its owner. ``prepare`` may fill
+    in derived values for a whole batch in its transaction before the insert.
+    """
+    imported = 0
+    batch = []
+    
+    async with AsyncSessionLocal() as db:
+        async def flush():
+            nonlocal imported
+            if prepare is not None:
+                await db.run_sync(lambda session: prepare(session.connection(), batch))
+            await db.execute(insert(model), batch)
+            await db.commit()
+            imported += len(batch)
+            batch.clear()
+        
+        line_number = 0
+        async for line in _request_lines(request):
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                batch.append({**schema.model_validate_json(line).dict(), **(values or {})})
+            except ValidationError as e:
+                if batch:
+                    await flush()
+                # The context holds the validator's exception object, which is not JSON
+                errors = e.errors(include_url=False, include_context=False)
+                raise HTTPException(
+                    status_code=422,
+                    detail={"line": line_number, "imported": imported, "errors": errors},
+                )
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await flush()
+        if batch:
+            await flush()
+    return imported
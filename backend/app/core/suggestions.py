@@ -0,0 +1,473 @@
+"""
+Incremental suggestion engine.
+
+Rules derive suggestions from single rows of the tasks, email and calendar
+tables: an email that mentions a meeting time proposes a calendar event, an
+overdue high-priority task proposes a new due date, an upcoming event that
+overlaps others proposes resolving the conflict. Generated suggestions are
+keyed by (source table, source id, rule), so evaluating a row replaces exactly
+the suggestions it produced earlier, and a dismissed suggestion stays dismissed
+for as long as the rule still holds. A suggestion belongs to the owner of its
+source row, and rules relating rows to each other only relate rows of one owner.
+
+Committed writes (``app.core.changes``) mark the rows they touched, and the
+engine's background task re-evaluates only those. Statements that touched an
+unknown set of rows (bulk updates, imports) make it reconcile that table
+instead: every row a rule could match plus every row holding a suggestion.
+Because "overdue" and "upcoming" depend on the clock, each evaluation may also
+ask to be repeated at a given time (a due date, a meeting start), kept in an
+in-memory heap; on startup every table is reconciled once to rebuild it.
+"""
+import asyncio
+from abc import ABC, abstractmethod
+import heapq
+import json
+import logging
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import AbstractSet, Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .changes import Change, on_commit
+from .database import AsyncReadSessionLocal, AsyncSessionLocal
+from .write_behind import flag_writer
+from ..models.calendar_event import CalendarEvent, overlap_candidates
+from ..models.email_message import EmailMessage
+from ..models.suggestion import Suggestion
+from ..models.task import Task
+
+logger = logging.getLogger(__name__)
+
+# Rows evaluated and written per transaction
+BATCH_SIZE = 500
+
+# Meetings further out than this from the email's arrival are not proposed, which
+# also bounds the emails a reconcile has to look at
+MEETING_HORIZON = timedelta(days=30)
+MEETING_LENGTH = timedelta(hours=1)
+
+@dataclass(frozen=True)
+class Proposal:
+    rule: str
+    title: str
+    description: Optional[str]
+    action_type: str
+    action_data: Dict[str, Any]
+
+class Evaluation(NamedTuple):
+    proposals: List[Proposal]
+    recheck_at: Optional[datetime] = None  # evaluate the row again at this time
+    related: AbstractSet[int] = frozenset()  # rows of the same table whose suggestions depend on this one
+    owner: Optional[int] = None  # user_id of the row, given to its suggestions
+
+_NOTHING = Evaluation([])
+
+def _truncate(text: str, length: int = 255) -> str:
+    return text if len(text) <= length else text[:length - 1].rstrip() + "…"
+
+_MEETING_WORDS = re.compile(
+    r"\b(meet|meeting|call|sync|catch[- ]up|appointment|interview|lunch|coffee|demo|stand-?up)\b", re.I
+)
+_TIME = re.compile(
+    r"\b(?P<h12>1[0-2]|0?[1-9])(?:[:.](?P<m12>[0-5]\d))?\s*(?P<ampm>[ap])\.?m\b\.?"
+    r"|\b(?P<h24>[01]?\d|2[0-3]):(?P<m24>[0-5]\d)\b"
+    r"|\b(?P<noon>noon|midday)\b",
+    re.I,
+)
+_WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+_MONTHS = ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec")
+_MONTH = r"(?P<month{n}>jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?"
+_DAY = re.compile(
+    r"\b(?P<iso>\d{4}-\d{2}-\d{2})\b"
+    r"|\b(?P<relative>today|tonight|tomorrow)\b"
+    rf"|\b(?P<weekday>{'|'.join(_WEEKDAYS)})\b"
+    rf"|\b{_MONTH.format(n=1)}\s+(?P<day1>[0-3]?\d)(?:st|nd|rd|th)?\b"
+    rf"|\b(?P<day2>[0-3]?\d)(?:st|nd|rd|th)?\s+(?:of\s+)?{_MONTH.format(n=2)}",
+    re.I,
+)
+
+def _meeting_day(match: re.Match, received: date) -> Optional[date]:
+    if match["iso"]:
+        try:
+            return date.fromisoformat(match["iso"])
+        except ValueError:
+            return None
+    if match["relative"]:
+        return received + timedelta(days=1 if match["relative"].lower() == "tomorrow" else 0)
+    if match["weekday"]:
+        ahead = (_WEEKDAYS.index(match["weekday"].lower()) - received.weekday() - 1) % 7 + 1
+        return received + timedelta(days=ahead)
+    month = _MONTHS.index((match["month1"] or match["month2"]).lower()[:3]) + 1
+    day = int(match["day1"] or match["day2"])
+    for year in (received.year, received.year + 1):
+        try:
+            candidate = date(year, month, day)
+        except ValueError:
+            return None
+        if candidate >= received:
+            return candidate
+    return None
+
+def find_meeting_time(text: str, received_at: datetime) -> Optional[datetime]:
+    """Start of a meeting mentioned in ``text``, resolved against the time it was received.
+
+    A heuristic for English: a meeting word plus a clock time, optionally with a
+    date, weekday, "today" or "tomorrow"; the first of each in the text is used.
+    Times are taken to be in the same (UTC) clock as ``received_at``.
+    """
+    if not _MEETING_WORDS.search(text):
+        return None
+    clock = _TIME.search(text)
+    if clock is None:
+        return None
+    if clock["noon"]:
+        hour, minute = 12, 0
+    elif clock["h24"]:
+        hour, minute = int(clock["h24"]), int(clock["m24"])
+    else:
+        hour, minute = int(clock["h12"]) % 12, int(clock["m12"] or 0)
+        if clock["ampm"].lower() == "p":
+            hour += 12
+
+    day_match = _DAY.search(text)
+    day = _meeting_day(day_match, received_at.date()) if day_match else received_at.date()
+    if day is None:
+        return None
+    start = datetime.combine(day, time(hour, minute))
+    if day_match is None and start <= received_at:
+        # "call at 9am" sent in the afternoon means tomorrow morning
+        start += timedelta(days=1)
+    if not received_at < start <= received_at + MEETING_HORIZON:
+        return None
+    return start
+
+class Rule(ABC):
+    """Derives suggestions from rows of one table"""
+    table: str
+
+    @abstractmethod
+    async def candidates(self, db: AsyncSession, now: datetime) -> Iterable[int]:
+        """Ids of every row that could currently produce a suggestion"""
+
+    @abstractmethod
+    async def evaluate(self, db: AsyncSession, ids: List[int], now: datetime) -> Dict[int, Evaluation]:
+        """Evaluate the rows with ``ids``; rows that no longer exist produce nothing"""
+
+class OverdueTaskRule(Rule):
+    table = Task.__tablename__
+    name = "overdue_task"
+
+    def _open_high_priority(self):
+        return (Task.completed.is_(False), Task.priority == "high", Task.due_date.is_not(None))
+
+    async def candidates(self, db: AsyncSession, now: datetime) -> Iterable[int]:
+        return (await db.scalars(select(Task.id).where(*self._open_high_priority()))).all()
+
+    async def evaluate(self, db: AsyncSession, ids: List[int], now: datetime) -> Dict[int, Evaluation]:
+        evaluations = {}
+        rows = await db.execute(
+            select(Task.id, Task.title, Task.due_date, Task.user_id).where(Task.id.in_(ids), *self._open_high_priority())
+        )
+        for task_id, title, due, owner in rows:
+            if due > now:
+                evaluations[task_id] = Evaluation([], recheck_at=due)
+                continue
+            # Same time of day, on the first day that is not already past
+            new_due = due + timedelta(days=(now - due).days + 1)
+            evaluations[task_id] = Evaluation([Proposal(
+                self.name,
+                _truncate(f"Reschedule overdue task: {title}"),
+                f"This high-priority task was due {due:%a %d %b %H:%M}.",
+                "task",
+                {"task_id": task_id, "due_date": new_due.isoformat()},
+            )], owner=owner)
+        return evaluations
+
+class MeetingEmailRule(Rule):
+    table = EmailMessage.__tablename__
+    name = "meeting_email"
+
+    async def candidates(self, db: AsyncSession, now: datetime) -> Iterable[int]:
+        recent = EmailMessage.received_at >= now - MEETING_HORIZON
+        return (await db.scalars(select(EmailMessage.id).where(recent))).all()
+
+    async def evaluate(self, db: AsyncSession, ids: List[int], now: datetime) -> Dict[int, Evaluation]:
+        evaluations = {}
+        rows = await db.execute(
+            select(
+                EmailMessage.id, EmailMessage.subject, EmailMessage.sender, EmailMessage.body,
+                EmailMessage.received_at, EmailMessage.user_id,
+            )
+            .where(EmailMessage.id.in_(ids), EmailMessage.received_at >= now - MEETING_HORIZON)
+        )
+        for email_id, subject, sender, body, received_at, owner in rows:
+            start = find_meeting_time(f"{subject}\n{body}", received_at)
+            if start is None or start <= now:
+                continue
+            evaluations[email_id] = Evaluation([Proposal(
+                self.name,
+                _truncate(f"Add to calendar: {subject}"),
+                f"{sender} mentioned a meeting on {start:%a %d %b at %H:%M}.",
+                "calendar",
+                {
+                    "email_id": email_id,
+                    "title": subject,
+                    "start_time": start.isoformat(),
+                    "end_time": (start + MEETING_LENGTH).isoformat(),
+                },
+            )], recheck_at=start, owner=owner)
+        return evaluations
+
+class CalendarConflictRule(Rule):
+    table = CalendarEvent.__tablename__
+    name = "calendar_conflict"
+
+    async def candidates(self, db: AsyncSession, now: datetime) -> Iterable[int]:
+        return (await db.scalars(select(CalendarEvent.id).where(CalendarEvent.end_time > now))).all()
+
+    async def evaluate(self, db: AsyncSession, ids: List[int], now: datetime) -> Dict[int, Evaluation]:
+        # An event's conflicts change when it moves, so the events it used to
+        # overlap and the ones it overlaps now are re-evaluated along with it
+        previous = defaultdict(set)
+        existing = await db.execute(
+            select(Suggestion.source_id, Suggestion.action_data).where(
+                Suggestion.source_type == self.table, Suggestion.rule == self.name, Suggestion.source_id.in_(ids)
+            )
+        )
+        for event_id, action_data in existing:
+            previous[event_id].update(json.loads(action_data or "{}").get("conflicts_with", ()))
+
+        overlaps = defaultdict(list)
+        for event_id, start, end, other_id, other_start, other_end in await db.execute(overlap_candidates(ids)):
+            if other_start < end and other_end > start and other_end > now:
+                overlaps[event_id].append((other_id, other_end))
+
+        evaluations = {}
+        events = await db.execute(
+            select(CalendarEvent.id, CalendarEvent.title, CalendarEvent.end_time, CalendarEvent.user_id)
+            .where(CalendarEvent.id.in_(ids))
+        )
+        for event_id, title, end, owner in events:
+            if end <= now:
+                evaluations[event_id] = Evaluation([], related=previous[event_id])
+                continue
+            others = sorted(other_id for other_id, _ in overlaps[event_id])
+            proposals = []
+            if others:
+                proposals.append(Proposal(
+                    self.name,
+                    _truncate(f"Resolve calendar conflict: {title}"),
+                    f"Overlaps {len(others)} other event{'s' if len(others) > 1 else ''}.",
+                    "calendar",
+                    {"event_id": event_id, "conflicts_with": others},
+                ))
+            # The conflict set next changes when this event or one it overlaps ends
+            recheck_at = min([end, *(other_end for _, other_end in overlaps[event_id])])
+            evaluations[event_id] = Evaluation(proposals, recheck_at, related=previous[event_id] | set(others), owner=owner)
+        for event_id in set(ids) - evaluations.keys():
+            evaluations[event_id] = Evaluation([], related=previous[event_id])
+        return evaluations
+
+_VALUE_COLUMNS = ("title", "description", "action_type", "action_data", "user_id")
+
+def _wanted(evaluations: Dict[int, Evaluation]) -> Dict[Tuple[int, str], tuple]:
+    """Stored column values, in ``_VALUE_COLUMNS`` order, of every proposal keyed by (source id, rule)"""
+    return {
+        (row_id, proposal.rule): (
+            proposal.title,
+            proposal.description,
+            proposal.action_type,
+            json.dumps(proposal.action_data, sort_keys=True),
+            evaluation.owner,
+        )
+        for row_id, evaluation in evaluations.items()
+        for proposal in evaluation.proposals
+    }
+
+def _stored(table: str, evaluations: Dict[int, Evaluation]):
+    return select(
+        Suggestion.source_id, Suggestion.rule, *(getattr(Suggestion, column) for column in _VALUE_COLUMNS)
+    ).where(Suggestion.source_type == table, Suggestion.source_id.in_(list(evaluations)))
+
+class SuggestionEngine:
+    def __init__(self, rules: Iterable[Rule]):
+        self._rules = {rule.table: rule for rule in rules}
+        self._dirty: Dict[str, Set[int]] = defaultdict(set)
+        self._reconcile: Set[str] = set()
+        # (when, table, id); an entry is stale unless _recheck still maps the row to it
+        self._timers: List[Tuple[datetime, str, int]] = []
+        self._recheck: Dict[Tuple[str, int], datetime] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._idle: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.evaluated = 0  # rows evaluated since start, for benchmarks
+
+    def start(self):
+        """Start the background task; reconciles every table first"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        self.reconcile()
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = self._loop = None
+
+    def reconcile(self, *tables: str):
+        """Re-evaluate every row of ``tables`` (all of them by default) that could hold a suggestion"""
+        self._reconcile.update(tables or self._rules)
+        self._idle.clear()
+        self._wakeup.set()
+
+    async def settle(self):
+        """Wait until every write committed so far has been evaluated"""
+        if self._task is not None:
+            await self._idle.wait()
+
+    def notify(self, changes: List[Change]):
+        """``on_commit`` listener; safe to call from any thread"""
+        loop = self._loop
+        if loop is None:
+            # Not running: the reconcile on start picks these writes up
+            return
+        changes = [change for change in changes if change.table in self._rules]
+        if not changes:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._mark(changes)
+        else:
+            loop.call_soon_threadsafe(self._mark, changes)
+
+    def _mark(self, changes: List[Change]):
+        for change in changes:
+            if change.id is None:
+                self._reconcile.add(change.table)
+            else:
+                self._dirty[change.table].add(change.id)
+        self._idle.clear()
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = datetime.utcnow()
+            while self._timers and self._timers[0][0] <= now:
+                when, table, row_id = heapq.heappop(self._timers)
+                if self._recheck.get((table, row_id)) == when:
+                    del self._recheck[(table, row_id)]
+                    self._dirty[table].add(row_id)
+
+            if self._dirty or self._reconcile:
+                dirty, self._dirty = self._dirty, defaultdict(set)
+                reconcile, self._reconcile = self._reconcile, set()
+                for table, rule in self._rules.items():
+                    ids = dirty.get(table, set())
+                    if table in reconcile:
+                        ids |= await self._reconcile_ids(rule, now)
+                    if ids:
+                        await self._refresh(rule, ids, now)
+                continue
+
+            self._idle.set()
+            timeout = (self._timers[0][0] - now).total_seconds() if self._timers else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _reconcile_ids(self, rule: Rule, now: datetime) -> Set[int]:
+        async with AsyncReadSessionLocal() as db:
+            ids = set(await rule.candidates(db, now))
+            ids.update(await db.scalars(
+                select(Suggestion.source_id).where(Suggestion.source_type == rule.table)
+            ))
+        return ids
+
+    async def _refresh(self, rule: Rule, ids: Set[int], now: datetime):
+        pending = sorted(ids)
+        done: Set[int] = set()
+        while pending:
+            batch, pending = pending[:BATCH_SIZE], pending[BATCH_SIZE:]
+            try:
+                async with AsyncReadSessionLocal() as db:
+                    evaluations = await rule.evaluate(db, batch, now)
+                    evaluations.update((row_id, _NOTHING) for row_id in batch if row_id not in evaluations)
+                    related = {
+                        row_id
+                        for evaluation in evaluations.values()
+                        for row_id in evaluation.related
+                        if row_id not in ids and row_id not in done
+                    }
+                    if related:
+                        # Affected neighbours are evaluated once, without following their neighbours
+                        neighbours = await rule.evaluate(db, sorted(related), now)
+                        evaluations.update((row_id, neighbours.get(row_id, _NOTHING)) for row_id in related)
+                    wanted = _wanted(evaluations)
+                    existing = await db.execute(_stored(rule.table, evaluations))
+                    changed = {(row[0], row[1]): tuple(row[2:]) for row in existing} != wanted
+                if changed:
+                    await self._apply(rule.table, evaluations, wanted)
+            except Exception:
+                logger.exception("Evaluating %d %s rows for suggestions failed", len(batch), rule.table)
+                continue
+            done.update(evaluations)
+            self.evaluated += len(evaluations)
+            for row_id, evaluation in evaluations.items():
+                self._schedule(rule.table, row_id, evaluation.recheck_at)
+
+    def _schedule(self, table: str, row_id: int, when: Optional[datetime]):
+        if when is None:
+            self._recheck.pop((table, row_id), None)
+        elif self._recheck.get((table, row_id)) != when:
+            self._recheck[(table, row_id)] = when
+            heapq.heappush(self._timers, (when, table, row_id))
+
+    async def _apply(self, table: str, evaluations: Dict[int, Evaluation], wanted: Dict[Tuple[int, str], tuple]):
+        """Make the stored suggestions of the evaluated rows match ``wanted``"""
+        # Queued dismissals must land before the rows they target can be deleted
+        await flag_writer.flush()
+        async with AsyncSessionLocal() as db:
+            # Diffed again on the writer connection, which no other write can interleave with
+            existing = await db.scalars(
+                select(Suggestion).where(Suggestion.source_type == table, Suggestion.source_id.in_(list(evaluations)))
+            )
+            current = {(suggestion.source_id, suggestion.rule): suggestion for suggestion in existing}
+            created = []
+            for (row_id, rule), values in wanted.items():
+                values = dict(zip(_VALUE_COLUMNS, values))
+                suggestion = current.pop((row_id, rule), None)
+                if suggestion is None:
+                    created.append({**values, "source_type": table, "source_id": row_id, "rule": rule})
+                    continue
+                # Kept current even while dismissed; dismissal lasts as long as the rule holds
+                for key, value in values.items():
+                    if getattr(suggestion, key) != value:
+                        setattr(suggestion, key, value)
+            if created:
+                # One multi-row INSERT rather than a flush that inserts row by row
+                await db.execute(insert(Suggestion), created)
+            for suggestion in current.values():
+                await db.delete(suggestion)
+            await db.commit()
+
+suggestion_engine = SuggestionEngine([OverdueTaskRule(), MeetingEmailRule(), CalendarConflictRule()])
+
+on_commit(suggestion_engine.notify)
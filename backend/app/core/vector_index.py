@@ -0,0 +1,394 @@
+"""
+Memory-mapped float32 vector store with exact and IVF top-k search.
+
+Vectors live in ``vectors.<n>.f32``, a row-major float32 matrix mapped with
+``numpy.memmap``, next to ``rows.<n>.bin`` holding each row's (kind, id, text
+checksum), ``lists.<n>.i32`` holding its IVF partition, and ``index.json``
+with the generation ``n`` in use, the row count and the embedder the vectors
+came from. A changed row is overwritten in place and a deleted one is zeroed
+and reused by the next insert, so a write touches a few pages however large
+the store is. Files grow by doubling and are extended in place, so existing
+rows never move. Only the pages a search reads need to be in memory; the OS
+page cache keeps the hot ones and evicts the rest.
+
+Search scores live rows by dot product, which is cosine similarity for the
+normalised vectors embedders return, in blocks of ``SEARCH_BLOCK_ROWS`` rows,
+keeping a running top-k per query with ``argpartition``. Below
+``SEARCH_IVF_MIN_VECTORS`` rows (0 disables IVF) every row is scored, for a
+whole batch of queries per pass over the vectors. From there on an inverted-file partition is trained:
+spherical k-means centroids over a sample, and every row assigned to its
+nearest centroid. Training writes a new generation of the files with the
+rows grouped by partition and deleted rows dropped, so a query scores the
+contiguous ranges of its ``SEARCH_IVF_PROBES`` nearest partitions, plus the
+rows written since, which are assigned as they are written but kept aside.
+The partition is retrained once the store has doubled or a quarter of it is
+kept aside. Approximate search trades some recall for speed; pass
+``exact=True`` to scan everything.
+"""
+import json
+import logging
+import os
+import re
+import threading
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .embeddings import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+ROW_DTYPE = np.dtype([("kind", "i1"), ("id", "<i8"), ("checksum", "<u4")])
+FREE = -1  # kind of a deleted row, reused by the next insert
+
+INITIAL_CAPACITY = 4096
+# Rows per matrix product, bounding the temporary score matrix
+BLOCK_ROWS = int(os.getenv("SEARCH_BLOCK_ROWS", "65536"))
+IVF_MIN_VECTORS = int(os.getenv("SEARCH_IVF_MIN_VECTORS", "200000"))
+IVF_PROBES = int(os.getenv("SEARCH_IVF_PROBES", "64"))
+IVF_SAMPLE_PER_LIST = 64
+IVF_ITERATIONS = 10
+
+_HEADER = "index.json"
+_VECTORS = "vectors.{}.f32"
+_ROWS = "rows.{}.bin"
+_LISTS = "lists.{}.i32"
+_CENTROIDS = "centroids.{}.npy"
+_OFFSETS = "offsets.{}.npy"  # start of each partition's rows, then the end of the last
+_DATA_FILE = re.compile(r"(vectors|rows|lists|centroids|offsets)\.(\d+)\.(f32|bin|i32|npy)")
+
+class Hit(NamedTuple):
+    kind: int
+    id: int
+    score: float
+
+def _map(path: str, dtype: np.dtype, shape: Tuple[int, ...]) -> np.memmap:
+    """Map ``path`` read-write, extending it with zeros to hold ``shape``"""
+    size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    with open(path, "a+b") as f:
+        if os.fstat(f.fileno()).st_size < size:
+            f.truncate(size)
+    return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+def nearest_centroids(vectors: np.ndarray, centroids: np.ndarray, block: int = 16384) -> np.ndarray:
+    """Index of the most similar centroid for every row of ``vectors``"""
+    result = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), block):
+        result[start:start + block] = np.argmax(vectors[start:start + block] @ centroids.T, axis=1)
+    return result
+
+class VectorStore:
+    """Vectors of (kind, id) rows under ``path``, tagged with the ``fingerprint`` of the embedder that made them.
+
+    Safe to search from any number of threads while one writer updates it.
+    """
+
+    def __init__(self, path: str, dim: int, fingerprint: str):
+        self.path = path
+        self.dim = dim
+        self.fingerprint = fingerprint
+        self._lock = threading.Lock()
+        self.generation = 0
+        os.makedirs(path, exist_ok=True)
+
+        header = self._read_header()
+        if header is None or header.get("fingerprint") != fingerprint or header.get("dim") != dim:
+            if header is not None:
+                logger.info("Vector index in %s was built by %s; rebuilding", path, header.get("fingerprint"))
+            header = {"generation": 0, "count": 0, "capacity": INITIAL_CAPACITY, "clustered": 0, "trained_rows": 0}
+            self._remove_files(keep=None)
+        else:
+            # Left behind by a retrain while searches still had them mapped
+            self._remove_files(keep=header["generation"])
+        self.generation = header["generation"]
+        self.count = header["count"]  # rows in use, live or free
+        self.trained_rows = header["trained_rows"]  # live rows when the partition was trained
+        self._open(header["capacity"])
+        self._load_rows()
+        self._load_partition(header["clustered"])
+
+    def _file(self, name: str, generation: int = None) -> str:
+        return os.path.join(self.path, name.format(self.generation if generation is None else generation))
+
+    def _read_header(self) -> Optional[dict]:
+        try:
+            with open(self._file(_HEADER)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _remove_files(self, keep: Optional[int]):
+        for name in os.listdir(self.path):
+            match = _DATA_FILE.fullmatch(name)
+            if (match and int(match[2]) != keep) or (keep is None and name == _HEADER):
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError:
+                    # Still mapped elsewhere on platforms that forbid that; removed on a later open
+                    pass
+
+    def _open(self, capacity: int):
+        self.capacity = capacity
+        self.vectors = _map(self._file(_VECTORS), np.float32, (capacity, self.dim))
+        self.rows = _map(self._file(_ROWS), ROW_DTYPE, (capacity,))
+        self.lists = _map(self._file(_LISTS), np.int32, (capacity,))
+
+    def _load_rows(self):
+        meta = self.rows[:self.count]
+        live = np.flatnonzero(meta["kind"] != FREE)
+        self._row_of = dict(zip(zip(meta["kind"][live].tolist(), meta["id"][live].tolist()), live.tolist()))
+        self._free = np.flatnonzero(meta["kind"] == FREE).tolist()
+
+    def _load_partition(self, clustered: int):
+        self.clustered = clustered  # rows stored grouped by partition, from the start of the files
+        self._moved = set()  # grouped rows whose vector changed partition since
+        if not self.trained_rows:
+            self.centroids = self._offsets = None
+            return
+        self.centroids = np.load(self._file(_CENTROIDS))
+        self._offsets = np.load(self._file(_OFFSETS))
+        lists = self.lists[:clustered]
+        moved = (lists != self._home(np.arange(clustered))) & (lists >= 0)
+        self._moved.update(np.flatnonzero(moved).tolist())
+
+    def _home(self, rows: np.ndarray) -> np.ndarray:
+        """Partition whose range holds each of ``rows``, which must be grouped ones"""
+        return np.searchsorted(self._offsets, rows, side="right") - 1
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    @property
+    def partitions(self) -> int:
+        return 0 if self.centroids is None else len(self.centroids)
+
+    def ids(self, kind: int) -> np.ndarray:
+        """Ids of every stored row of ``kind``"""
+        with self._lock:
+            meta = self.rows[:self.count]
+            return np.asarray(meta["id"][meta["kind"] == kind])
+
+    def checksums(self, kind: int, ids: Sequence[int]) -> dict:
+        """Checksum stored with each of ``ids`` that is in the store"""
+        with self._lock:
+            found = [(row_id, self._row_of[(kind, row_id)]) for row_id in ids if (kind, row_id) in self._row_of]
+            checksums = self.rows["checksum"][[row for _, row in found]].tolist() if found else []
+        return {row_id: checksum for (row_id, _), checksum in zip(found, checksums)}
+
+    def upsert(self, kind: int, ids: Sequence[int], checksums: Sequence[int], vectors: np.ndarray):
+        """Store ``vectors`` for ``ids``, replacing the vectors they had"""
+        if not len(ids):
+            return
+        with self._lock:
+            rows = np.empty(len(ids), dtype=np.int64)
+            for i, row_id in enumerate(ids):
+                row = self._row_of.get((kind, row_id))
+                if row is None:
+                    row = self._free.pop() if self._free else self._append()
+                    self._row_of[(kind, row_id)] = row
+                rows[i] = row
+            self.vectors[rows] = vectors
+            self.rows["kind"][rows] = kind
+            self.rows["id"][rows] = ids
+            self.rows["checksum"][rows] = checksums
+            if self.centroids is None:
+                self.lists[rows] = -1
+                return
+            assigned = nearest_centroids(vectors, self.centroids)
+            self.lists[rows] = assigned
+            grouped = rows < self.clustered
+            home = self._home(rows[grouped])
+            for row, moved in zip(rows[grouped].tolist(), (assigned[grouped] != home).tolist()):
+                if moved:
+                    self._moved.add(row)
+                else:
+                    self._moved.discard(row)
+
+    def _append(self) -> int:
+        if self.count == self.capacity:
+            # Searches still holding the old maps keep reading them; the file only grows
+            for array in (self.vectors, self.rows, self.lists):
+                array.flush()
+            self._open(self.capacity * 2)
+        self.count += 1
+        return self.count - 1
+
+    def remove(self, kind: int, ids: Sequence[int]):
+        """Drop ``ids`` from the store; unknown ids are ignored"""
+        with self._lock:
+            rows = [self._row_of.pop((kind, row_id)) for row_id in ids if (kind, row_id) in self._row_of]
+            if not rows:
+                return
+            self.vectors[rows] = 0
+            self.rows[rows] = (FREE, 0, 0)
+            self.lists[rows] = -1
+            self._moved.difference_update(rows)
+            self._free.extend(rows)
+
+    def clear(self):
+        """Forget every row; the files keep their size and are overwritten as rows come back"""
+        with self._lock:
+            self.count = self.trained_rows = 0
+            self._load_rows()
+            self._load_partition(0)
+        self.flush()
+
+    def flush(self):
+        """Write dirty pages and the header to disk"""
+        with self._lock:
+            for array in (self.vectors, self.rows, self.lists):
+                array.flush()
+            header = {
+                "fingerprint": self.fingerprint, "dim": self.dim, "generation": self.generation,
+                "count": self.count, "capacity": self.capacity,
+                "clustered": self.clustered, "trained_rows": self.trained_rows,
+            }
+            with open(self._file(_HEADER + ".tmp"), "w") as f:
+                json.dump(header, f)
+            os.replace(self._file(_HEADER + ".tmp"), self._file(_HEADER))
+
+    def needs_training(self) -> bool:
+        """Whether the IVF partition is missing, or stale because the store doubled or much of it is kept aside"""
+        if IVF_MIN_VECTORS <= 0 or len(self) < IVF_MIN_VECTORS:
+            return False
+        if self.centroids is None:
+            return True
+        aside = self.count - self.clustered + len(self._moved)
+        return len(self) >= 2 * self.trained_rows or aside > self.clustered // 4
+
+    def train(self, partitions: int = None, seed: int = 0):
+        """(Re)build the IVF partition, by default with about sqrt(rows) partitions.
+
+        Takes seconds on large stores and runs without the lock, so it must be
+        called by the writer, with no write in progress. Searches carry on
+        against the previous generation meanwhile.
+        """
+        count, vectors, meta = self.count, self.vectors, self.rows
+        kinds = np.array(meta["kind"][:count])
+        live = np.flatnonzero(kinds != FREE)
+        if not len(live):
+            return
+        partitions = min(partitions or int(np.clip(np.sqrt(len(live)), 16, 4096)), len(live))
+        rng = np.random.default_rng(seed)
+        sample = np.sort(rng.choice(live, min(len(live), partitions * IVF_SAMPLE_PER_LIST), replace=False))
+        data = np.asarray(vectors[sample])
+        centroids = data[rng.choice(len(data), partitions, replace=False)].copy()
+        for _ in range(IVF_ITERATIONS):
+            assignment = nearest_centroids(data, centroids)
+            counts = np.bincount(assignment, minlength=partitions)
+            filled = counts > 0
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+            sums = np.add.reduceat(data[np.argsort(assignment, kind="stable")], starts, axis=0)
+            # Empty partitions keep their centroid
+            centroids[filled] = normalize_rows(sums)
+
+        lists = np.empty(len(live), dtype=np.int32)
+        for start in range(0, len(live), BLOCK_ROWS):
+            lists[start:start + BLOCK_ROWS] = nearest_centroids(vectors[live[start:start + BLOCK_ROWS]], centroids)
+        order = np.argsort(lists, kind="stable")
+        lists, live = lists[order], live[order]
+
+        # The next generation: live rows only, grouped by partition
+        generation = self.generation + 1
+        capacity = self.capacity
+        new_vectors = _map(self._file(_VECTORS, generation), np.float32, (capacity, self.dim))
+        new_rows = _map(self._file(_ROWS, generation), ROW_DTYPE, (capacity,))
+        new_lists = _map(self._file(_LISTS, generation), np.int32, (capacity,))
+        for start in range(0, len(live), BLOCK_ROWS):
+            chunk = live[start:start + BLOCK_ROWS]
+            new_vectors[start:start + len(chunk)] = vectors[chunk]
+            new_rows[start:start + len(chunk)] = meta[chunk]
+        new_lists[:len(live)] = lists
+        for array in (new_vectors, new_rows, new_lists):
+            array.flush()
+        np.save(self._file(_CENTROIDS, generation), centroids)
+        np.save(self._file(_OFFSETS, generation), np.searchsorted(lists, np.arange(partitions + 1)).astype(np.int64))
+
+        with self._lock:
+            self.generation, self.count, self.trained_rows = generation, len(live), len(live)
+            self._open(capacity)
+            self._load_rows()
+            self._load_partition(len(live))
+        self.flush()
+        self._remove_files(keep=generation)
+        logger.info("Trained %d IVF partitions over %d vectors", partitions, len(live))
+
+    def _blocks(self, queries: np.ndarray, allowed: np.ndarray, probes: Optional[int], snapshot: tuple):
+        """(rows, vectors, mask of rows to score) in blocks: all rows, or those of the nearest partitions"""
+        count, clustered, vectors, meta, lists, centroids, offsets, moved = snapshot
+        if probes is None:
+            for start in range(0, count, BLOCK_ROWS):
+                end = min(start + BLOCK_ROWS, count)
+                yield np.arange(start, end), vectors[start:end], allowed[meta["kind"][start:end].view(np.uint8)]
+            return
+
+        nearest = np.argpartition(-(queries @ centroids.T), probes - 1, axis=1)[:, :probes]
+        selected = np.unique(nearest)
+        for partition, start, end in zip(selected.tolist(), offsets[selected].tolist(), offsets[selected + 1].tolist()):
+            # Scored in place; rows deleted or moved to another partition since training are masked out
+            mask = (lists[start:end] == partition) & allowed[meta["kind"][start:end].view(np.uint8)]
+            yield np.arange(start, end), vectors[start:end], mask
+        probed = np.zeros(len(centroids) + 1, dtype=bool)  # lists of -1 read the last, unset entry
+        probed[selected] = True
+        aside = np.concatenate((moved, np.arange(clustered, count)))
+        aside = np.sort(aside[probed[lists[aside]] & allowed[meta["kind"][aside].view(np.uint8)]])
+        for start in range(0, len(aside), BLOCK_ROWS):
+            rows = aside[start:start + BLOCK_ROWS]
+            yield rows, vectors[rows], np.ones(len(rows), dtype=bool)
+
+    @staticmethod
+    def _top_k(queries: np.ndarray, k: int, blocks) -> Tuple[np.ndarray, np.ndarray]:
+        """Running top-k scores and rows per query over ``blocks``"""
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        best_rows = np.full((len(queries), k), -1, dtype=np.int64)
+        for rows, block, mask in blocks:
+            scores = queries @ block.T
+            scores[:, ~mask] = -np.inf
+            if scores.shape[1] > k:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores, block_rows = np.take_along_axis(scores, top, axis=1), rows[top]
+            else:
+                block_rows = np.broadcast_to(rows, scores.shape)
+            scores = np.concatenate((best_scores, scores), axis=1)
+            block_rows = np.concatenate((best_rows, block_rows), axis=1)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores, best_rows = np.take_along_axis(scores, top, axis=1), np.take_along_axis(block_rows, top, axis=1)
+        return best_scores, best_rows
+
+    def search(
+        self, queries: np.ndarray, k: int, kinds: Sequence[int] = None, exact: bool = False, probes: int = None,
+    ) -> List[List[Hit]]:
+        """Top ``k`` rows by similarity for each query, best first, optionally limited to ``kinds``"""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        with self._lock:
+            meta = self.rows
+            if self.centroids is None or exact:
+                probes = None
+                moved = None
+            else:
+                probes = min(probes or IVF_PROBES, len(self.centroids))
+                moved = np.fromiter(self._moved, dtype=np.int64, count=len(self._moved))
+            snapshot = (
+                self.count, self.clustered, self.vectors, meta, self.lists, self.centroids, self._offsets, moved,
+            )
+        allowed = np.zeros(256, dtype=bool)
+        allowed[list(kinds) if kinds is not None else slice(0, 128)] = True  # FREE reads as 255
+
+        if probes is None:
+            best_scores, best_rows = self._top_k(queries, k, self._blocks(queries, allowed, None, snapshot))
+        else:
+            # Each query probes its own partitions; a batch's union would cover most of the store
+            best = [self._top_k(query[None], k, self._blocks(query[None], allowed, probes, snapshot)) for query in queries]
+            best_scores, best_rows = np.concatenate([scores for scores, _ in best]), np.concatenate([rows for _, rows in best])
+
+        order = np.argsort(-best_scores, axis=1)
+        best_scores, best_rows = np.take_along_axis(best_scores, order, axis=1), np.take_along_axis(best_rows, order, axis=1)
+        results = []
+        for scores, rows in zip(best_scores, best_rows):
+            found = np.isfinite(scores)
+            hits = meta[rows[found]]
+            results.append([
+                Hit(kind, row_id, score)
+                for kind, row_id, score in zip(hits["kind"].tolist(), hits["id"].tolist(), scores[found].tolist())
+            ])
+        return results
@@ -0,0 +1,125 @@
+"""
+Write-behind coalescing for single-row flag changes.
+
+Read/important/completed toggles are acknowledged as soon as they are queued
+and written ``FLUSH_DELAY`` seconds later, together with every other flag
+change queued meanwhile, in one transaction (one fsync on SQLite). Repeated
+changes to the same row merge into a single UPDATE.
+
+Reads stay consistent: ``get_async_db`` and ``get_async_read_db`` flush anything
+pending before they hand out a session, and the table versions behind ETags and cached counts
+are bumped at queue time.
+"""
+import asyncio
+import logging
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, FrozenSet, Optional, Tuple, Type, TypeVar
+
+from sqlalchemy import null, select, update
+
+from .changes import bump_versions
+from .database import AsyncReadSessionLocal, AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+FLUSH_DELAY = 0.005
+
+Row = TypeVar("Row")
+
+Key = Tuple[type, int]
+
+class FlagWriter:
+    def __init__(self, delay: float = FLUSH_DELAY):
+        self.delay = delay
+        self._pending: Dict[Key, Dict[str, Any]] = {}
+        # Values taken by a flush that has not committed yet; still part of the overlay
+        self._inflight: Dict[Key, Dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+        # Bumped after each committed flush, whose values then leave the overlay;
+        # the rows written by recent flushes are remembered to tell stale reads apart
+        self._generation = 0
+        self._recent: Deque[Tuple[int, FrozenSet[Key]]] = deque(maxlen=64)
+
+    async def load(self, model: Type[Row], row_id: int) -> Optional[Row]:
+        """Fetch a row with its queued flag values applied, or None if it does not exist.
+
+        The returned row is current until the caller next awaits, so a toggle
+        computed from it and passed straight to ``set`` never loses an update.
+        """
+        while True:
+            generation = self._generation
+            async with AsyncReadSessionLocal() as db:
+                row = await db.get(model, row_id)
+                if row is None:
+                    return None
+                db.expunge(row)
+            if not self._flushed_since(generation, (model, row_id)):
+                break
+        for values in (self._inflight.get((model, row_id)), self._pending.get((model, row_id))):
+            for key, value in (values or {}).items():
+                setattr(row, key, value)
+        return row
+
+    def _flushed_since(self, generation: int, key: Key) -> bool:
+        """Whether a flush committed after ``generation`` wrote ``key``; such a read may be stale"""
+        if generation == self._generation:
+            return False
+        if not self._recent or self._recent[0][0] > generation + 1:
+            return True
+        return any(flushed > generation and key in keys for flushed, keys in self._recent)
+
+    def set(self, row, **values):
+        """Queue ``values`` for ``row`` (as returned by ``load``) and apply them to it"""
+        model = type(row)
+        self._pending.setdefault((model, row.id), {}).update(values)
+        for key, value in values.items():
+            setattr(row, key, value)
+        bump_versions(model.__tablename__)
+        self._schedule()
+
+    def _schedule(self):
+        if self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.delay)
+        self._timer = None
+        await self.flush()
+
+    async def flush(self):
+        """Write every queued change in one transaction; returns once they are committed"""
+        if not self._pending and not self._lock.locked():
+            return
+        async with self._lock:
+            if not self._pending:
+                return
+            self._inflight, self._pending = self._pending, {}
+            by_model = defaultdict(list)
+            for (model, row_id), values in self._inflight.items():
+                by_model[model].append({"id": row_id, **values})
+            try:
+                async with AsyncSessionLocal() as db:
+                    for model, params in by_model.items():
+                        # Rows deleted since they were queued are skipped: the bulk UPDATE
+                        # raises StaleDataError on a missing row, and would on every retry
+                        ids = [row["id"] for row in params]
+                        # Their owners go along for the change feed, which tells only them
+                        owner = getattr(model, "user_id", null())
+                        existing = dict((await db.execute(select(model.id, owner).where(model.id.in_(ids)))).all())
+                        params = [row for row in params if row["id"] in existing]
+                        if params:
+                            # ORM bulk UPDATE by primary key, one executemany per model
+                            await db.execute(update(model).execution_options(change_owners=existing), params)
+                    await db.commit()
+                self._generation += 1
+                self._recent.append((self._generation, frozenset(self._inflight)))
+            except Exception:
+                logger.exception("Flushing %d queued flag changes failed; retrying", len(self._inflight))
+                for key, values in self._inflight.items():
+                    self._pending[key] = {**values, **self._pending.get(key, {})}
+                self._schedule()
+            finally:
+                self._inflight = {}
+
+flag_writer = FlagWriter()
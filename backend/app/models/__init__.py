@@ -1,17 +1,24 @@
 from .user import User
 from .task import Task
 from .calendar_event import CalendarEvent
-from .email_message import EmailMessage
-from .chat_message import ChatMessage
+from .calendar_event_exception import CalendarEventException
+from .email_message import EmailMessage, EmailThread, EmailThreadRef
+from .chat_message import ChatMessage, ChatThread
 from .suggestion import Suggestion
 from .push_subscription import PushSubscription
+from .scheduled_job import ScheduledJob
 
 __all__ = [
     "User",
     "Task", 
     "CalendarEvent",
+    "CalendarEventException",
     "EmailMessage",
+    "EmailThread",
+    "EmailThreadRef",
     "ChatMessage",
+    "ChatThread",
     "Suggestion",
-    "PushSubscription"
+    "PushSubscription",
+    "ScheduledJob"
 ]
\ No newline at end of file
@@ -0,0 +1,20 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+# Upper bound per request keeps a single bulk transaction (and its lock hold) short
+MAX_BULK_ITEMS = 5000
+
+class BulkIds(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=MAX_BULK_ITEMS)
+
+class BulkCreateResponse(BaseModel):
+    ids: List[int]
+
+class BulkUpdateResponse(BaseModel):
+    updated: int
+
+class BulkDeleteResponse(BaseModel):
+    deleted: int
+
+class ImportResponse(BaseModel):
+    imported: int
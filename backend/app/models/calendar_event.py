@@ -1,10 +1,17 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index, Select, or_, select, text
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql import column, table
 from datetime import datetime
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, model_validator
+from typing import List, Optional
 
-Base = declarative_base()
+from ..core.database import IS_SQLITE, Base
+from ..core.recurrence import normalize_rule, recurrence_end
+
+def _recurrence_end_default(context) -> Optional[datetime]:
+    # Computed at insert time for ORM, Core and bulk inserts alike; updates set it explicitly
+    params = context.get_current_parameters()
+    return recurrence_end(params.get("rrule"), params["start_time"], params["end_time"])
 
 class CalendarEvent(Base):
     __tablename__ = "calendar_events"
@@ -16,8 +23,90 @@ class CalendarEvent(Base):
     end_time = Column(DateTime, nullable=False)
     location = Column(String(255), nullable=True)
     attendees = Column(Text, nullable=True)  # JSON string
+    # RFC 5545 RRULE; a series' start/end_time are its first occurrence (app.core.recurrence)
+    rrule = Column(Text, nullable=True)
+    recurrence_end = Column(DateTime, nullable=True, default=_recurrence_end_default)  # NULL: single or endless
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # NULL: the local profile (app.core.auth)
+
+    __table_args__ = (
+        Index("ix_calendar_events_start_end", "start_time", "end_time"),
+        Index("ix_calendar_events_user_start_id", "user_id", "start_time", "id"),
+        Index("ix_calendar_events_series", "start_time", sqlite_where=text("rrule IS NOT NULL")),
+    )
+
+# SQLite R*Tree over (start, end) as epoch seconds, maintained by triggers (migration 4).
+# Its 32-bit float bounds are rounded outwards, so it yields a superset of candidates
+# that is then narrowed by the exact predicate on calendar_events.
+calendar_event_intervals = table(
+    "calendar_events_rtree",
+    column("id"),
+    column("start_ts"),
+    column("end_ts"),
+)
+
+_EPOCH = datetime(1970, 1, 1)
+
+def overlapping(query: Select, start: Optional[datetime], end: Optional[datetime]) -> Select:
+    """Restrict ``query`` to events intersecting the half-open window [start, end)"""
+    if start is None and end is None:
+        return query
+    if IS_SQLITE:
+        # Seek candidates through the R*Tree, then apply the exact predicate below
+        query = query.join(calendar_event_intervals, calendar_event_intervals.c.id == CalendarEvent.id)
+        if end is not None:
+            query = query.where(calendar_event_intervals.c.start_ts <= (end - _EPOCH).total_seconds())
+        if start is not None:
+            query = query.where(calendar_event_intervals.c.end_ts >= (start - _EPOCH).total_seconds())
+    if end is not None:
+        query = query.where(CalendarEvent.start_time < end)
+    if start is not None:
+        query = query.where(CalendarEvent.end_time > start)
+    return query
+
+# What expanding a series needs, for readers of occurrence times only
+SERIES_TIME_COLUMNS = [CalendarEvent.id, CalendarEvent.start_time, CalendarEvent.end_time, CalendarEvent.rrule, CalendarEvent.updated_at]
+
+def series_in_window(query: Select, start: Optional[datetime], end: Optional[datetime]) -> Select:
+    """Restrict ``query`` to recurring series that may have occurrences in [start, end];
+    single events are the rows with ``rrule`` NULL"""
+    query = query.where(CalendarEvent.rrule.is_not(None))
+    if end is not None:
+        query = query.where(CalendarEvent.start_time <= end)
+    if start is not None:
+        query = query.where(or_(CalendarEvent.recurrence_end.is_(None), CalendarEvent.recurrence_end >= start))
+    return query
+
+def overlap_candidates(ids: List[int]) -> Select:
+    """Rows of (id, start, end, other id, other start, other end) pairing each event in ``ids``
+    with other events of the same owner that may intersect it.
+
+    On SQLite the pairs come from R*Tree probes alone and include a few near
+    misses, so callers check the exact predicate on the returned times.
+    """
+    event = aliased(CalendarEvent)
+    query = select(
+        event.id, event.start_time, event.end_time, CalendarEvent.id, CalendarEvent.start_time, CalendarEvent.end_time
+    ).select_from(event)
+    if IS_SQLITE:
+        # Comparing times here would make SQLite scan ix_calendar_events_start_end
+        # instead of probing the R*Tree once per event
+        bounds = calendar_event_intervals.alias()
+        others = calendar_event_intervals.alias()
+        query = (
+            query.join(bounds, bounds.c.id == event.id)
+            .join(others, (others.c.start_ts <= bounds.c.end_ts) & (others.c.end_ts >= bounds.c.start_ts))
+            .join(CalendarEvent, CalendarEvent.id == others.c.id)
+        )
+    else:
+        query = query.join(
+            CalendarEvent,
+            (CalendarEvent.start_time < event.end_time) & (CalendarEvent.end_time > event.start_time),
+        )
+    # user_id + 0 on both sides keeps ix_calendar_events_user_start_id from displacing the R*Tree probes
+    same_owner = (CalendarEvent.user_id + 0).is_not_distinct_from(event.user_id + 0)
+    return query.where(event.id.in_(ids), CalendarEvent.id != event.id, same_owner)
 
 class CalendarEventCreate(BaseModel):
     title: str
@@ -26,6 +115,14 @@ class CalendarEventCreate(BaseModel):
     end_time: datetime
     location: Optional[str] = None
     attendees: Optional[str] = None
+    rrule: Optional[str] = None  # e.g. FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20251231T000000Z
+    
+    @model_validator(mode="after")
+    def _check_rrule(self):
+        # Assigning marks the field as set, so only touch a value the client sent
+        if self.rrule is not None:
+            self.rrule = normalize_rule(self.rrule, self.start_time) if self.rrule.strip() else None
+        return self
 
 class CalendarEventResponse(BaseModel):
     id: int
@@ -35,8 +132,22 @@ class CalendarEventResponse(BaseModel):
     end_time: datetime
     location: Optional[str]
     attendees: Optional[str]
+    rrule: Optional[str]
     created_at: datetime
     updated_at: datetime
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class CalendarOccurrence(CalendarEventResponse):
+    """A single event, or one occurrence of a series with its original start as ``recurrence_id``"""
+    recurrence_id: Optional[datetime] = None
+
+class BusyBlock(BaseModel):
+    start: datetime
+    end: datetime
+
+class FreeBusyResponse(BaseModel):
+    start: datetime
+    end: datetime
+    busy: List[BusyBlock]
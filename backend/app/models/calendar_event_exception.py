@@ -0,0 +1,50 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Index
+from datetime import datetime
+from pydantic import BaseModel
+from typing import Optional
+
+from ..core.database import Base
+
+class CalendarEventException(Base):
+    """Cancellation or override of one occurrence of a recurring event"""
+    __tablename__ = "calendar_event_exceptions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(Integer, ForeignKey("calendar_events.id", ondelete="CASCADE"), nullable=False)
+    original_start = Column(DateTime, nullable=False)  # the occurrence's start per the series' rule
+    cancelled = Column(Boolean, nullable=False, default=False)
+    # Overrides; NULL keeps the series' value
+    title = Column(String(255), nullable=True)
+    description = Column(Text, nullable=True)
+    start_time = Column(DateTime, nullable=True)
+    end_time = Column(DateTime, nullable=True)
+    location = Column(String(255), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ux_calendar_event_exceptions_event_start", "event_id", "original_start", unique=True),
+    )
+
+class CalendarOccurrenceUpdate(BaseModel):
+    title: Optional[str] = None
+    description: Optional[str] = None
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    location: Optional[str] = None
+    cancelled: bool = False
+
+class CalendarEventExceptionResponse(BaseModel):
+    id: int
+    event_id: int
+    original_start: datetime
+    cancelled: bool
+    title: Optional[str]
+    description: Optional[str]
+    start_time: Optional[datetime]
+    end_time: Optional[datetime]
+    location: Optional[str]
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
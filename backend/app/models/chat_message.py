@@ -1,10 +1,26 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Index
 from datetime import datetime
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 
-Base = declarative_base()
+from ..core.database import Base
+
+THREAD_TITLE_LENGTH = 120
+
+def estimate_tokens(text: str) -> int:
+    """Rough model token count (about four characters per token) used for context budgets"""
+    return max(1, (len(text) + 3) // 4)
+
+def thread_title(content: str) -> str:
+    """Single-line title for a thread, taken from its first message"""
+    text = " ".join(content.split())
+    if len(text) <= THREAD_TITLE_LENGTH:
+        return text
+    return text[:THREAD_TITLE_LENGTH - 1].rstrip() + "…"
+
+def _token_count_default(context) -> int:
+    # Computed once at insert time, so budget queries never read message content
+    return estimate_tokens(context.get_current_parameters()["content"])
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
@@ -14,8 +30,28 @@ class ChatMessage(Base):
     role = Column(String(50), nullable=False)  # user, assistant, system
     thread_id = Column(String(255), nullable=True)
     is_ai_response = Column(Boolean, default=False)
+    token_count = Column(Integer, nullable=True, default=_token_count_default)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_chat_messages_thread_created_id", "thread_id", "created_at", "id"),
+    )
+
+class ChatThread(Base):
+    """Per-thread summary kept in step with chat_messages by the chat router"""
+    __tablename__ = "chat_threads"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    thread_id = Column(String(255), nullable=False, unique=True)
+    title = Column(String(THREAD_TITLE_LENGTH), nullable=True)
+    message_count = Column(Integer, nullable=False, default=0)
+    last_message_at = Column(DateTime, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_chat_threads_last_message_id", "last_message_at", "id"),
+    )
+
 class ChatMessageCreate(BaseModel):
     content: str
     role: str
@@ -31,4 +67,23 @@ class ChatMessageResponse(BaseModel):
     created_at: datetime
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ChatThreadResponse(BaseModel):
+    thread_id: str
+    title: Optional[str]
+    message_count: int
+    last_message_at: datetime
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class ChatContextResponse(BaseModel):
+    messages: List[ChatMessageResponse]  # oldest first, ready to send to a model
+    token_count: int
+    truncated: bool  # older messages exist that did not fit the budget
+
+class ChatCompletionRequest(BaseModel):
+    max_tokens: int = Field(256, ge=1, le=4096)  # reply length cap
+    context_tokens: int = Field(4000, ge=1)  # prompt budget, spent on the most recent messages
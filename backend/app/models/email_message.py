@@ -1,10 +1,38 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Index, text
+from sqlalchemy.sql import column, table
 from datetime import datetime
 from pydantic import BaseModel
 from typing import Optional
+import re
 
-Base = declarative_base()
+from ..core.database import Base
+
+PREVIEW_LENGTH = 160
+
+_REPLY_PREFIX = re.compile(r"^(\s*(re|fwd?|aw|sv)(\[\d+\])?\s*:)+\s*", re.IGNORECASE)
+
+def make_preview(body: str) -> str:
+    """Single-line, truncated body excerpt for inbox lists"""
+    text = " ".join(body.split())
+    if len(text) <= PREVIEW_LENGTH:
+        return text
+    return text[:PREVIEW_LENGTH - 1].rstrip() + "…"
+
+def _preview_default(context) -> str:
+    # Computed once at insert time for ORM, Core and bulk inserts alike
+    return make_preview(context.get_current_parameters()["body"])
+
+def thread_subject(subject: str) -> str:
+    """Subject without its Re:/Fwd: prefixes, as shown for the whole conversation"""
+    return _REPLY_PREFIX.sub("", subject) or subject
+
+def _thread_default(context) -> int:
+    # Rows inserted without a thread are threaded one by one at insert time, so
+    # every write path gets one; bulk paths thread whole batches beforehand
+    from ..core.email_threads import assign_threads
+    row = dict(context.get_current_parameters())
+    assign_threads(context.connection, [row])
+    return row["thread_id"]
 
 class EmailMessage(Base):
     __tablename__ = "email_messages"
@@ -14,10 +42,62 @@ class EmailMessage(Base):
     sender = Column(String(255), nullable=False)
     recipient = Column(String(255), nullable=False)
     body = Column(Text, nullable=False)
+    preview = Column(String(PREVIEW_LENGTH), nullable=True, default=_preview_default)
     is_read = Column(Boolean, default=False)
     is_important = Column(Boolean, default=False)
     received_at = Column(DateTime, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # RFC 5322 Message-ID, In-Reply-To and References headers, as received
+    message_id = Column(String(255), nullable=True)
+    in_reply_to = Column(String(255), nullable=True)
+    references = Column(Text, nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # NULL: the local profile (app.core.auth)
+    thread_id = Column(Integer, nullable=True, default=_thread_default)
+
+    __table_args__ = (
+        Index("ix_email_messages_user_received_id", "user_id", "received_at", "id"),
+        Index("ix_email_messages_user_flags_received", user_id, is_read, is_important, received_at.desc()),
+        Index("ix_email_messages_thread_received_id", "thread_id", "received_at", "id"),
+    )
+
+class EmailThread(Base):
+    """A conversation; its counts and latest message are kept by triggers (app.core.email_threads)"""
+    __tablename__ = "email_threads"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    # Set once the thread is merged into another; always points at a root thread
+    parent_id = Column(Integer, nullable=True)
+    subject = Column(String(255), nullable=False)
+    message_count = Column(Integer, nullable=False, default=0)
+    unread_count = Column(Integer, nullable=False, default=0)
+    latest_message_id = Column(Integer, nullable=True)
+    latest_received_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # owner of its messages
+
+    __table_args__ = (
+        Index("ix_email_threads_user_latest_id", "user_id", "latest_received_at", "id", sqlite_where=text("parent_id IS NULL")),
+        Index("ix_email_threads_parent", "parent_id", sqlite_where=text("parent_id IS NOT NULL")),
+    )
+
+class EmailThreadRef(Base):
+    """A Message-ID seen on a message or in its references, and the thread it was put in"""
+    __tablename__ = "email_thread_refs"
+    
+    message_id = Column(String(255), primary_key=True)
+    thread_id = Column(Integer, nullable=False)
+
+# SQLite FTS5 external-content index over subject, sender and body, kept in sync
+# with email_messages by triggers (migration 5); rowid is the email id and rank
+# the hidden FTS5 ranking column.
+email_message_search = table(
+    "email_messages_fts",
+    column("rowid"),
+    column("rank"),
+    column("subject"),
+    column("sender"),
+    column("body"),
+)
 
 class EmailMessageCreate(BaseModel):
     subject: str
@@ -26,6 +106,9 @@ class EmailMessageCreate(BaseModel):
     body: str
     is_important: bool = False
     received_at: datetime
+    message_id: Optional[str] = None
+    in_reply_to: Optional[str] = None
+    references: Optional[str] = None
 
 class EmailMessageResponse(BaseModel):
     id: int
@@ -37,6 +120,44 @@ class EmailMessageResponse(BaseModel):
     is_important: bool
     received_at: datetime
     created_at: datetime
+    message_id: Optional[str]
+    in_reply_to: Optional[str]
+    references: Optional[str]
+    thread_id: Optional[int]
+    
+    class Config:
+        from_attributes = True
+
+class EmailMessageSummary(BaseModel):
+    id: int
+    subject: str
+    sender: str
+    preview: Optional[str]
+    is_read: bool
+    is_important: bool
+    received_at: datetime
+    thread_id: Optional[int]
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class EmailConversation(BaseModel):
+    """One row of the conversation list, with its newest message"""
+    thread_id: int
+    subject: str
+    message_count: int
+    unread_count: int
+    latest_message_id: int
+    latest_sender: str
+    latest_preview: Optional[str]
+    latest_received_at: datetime
+
+class EmailSearchHit(BaseModel):
+    id: int
+    subject: str
+    sender: str
+    received_at: datetime
+    is_read: bool
+    is_important: bool
+    snippet: str
+    rank: float
@@ -1,9 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
 from datetime import datetime
 from pydantic import BaseModel
 
-Base = declarative_base()
+from ..core.database import Base
 
 class PushSubscription(Base):
     __tablename__ = "push_subscriptions"
@@ -12,6 +11,8 @@ class PushSubscription(Base):
     endpoint = Column(Text, nullable=False)
     keys = Column(Text, nullable=False)  # JSON string
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Receives the reminders of this user's rows; NULL: the local profile (app.core.auth)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
 
 class PushSubscriptionCreate(BaseModel):
     endpoint: str
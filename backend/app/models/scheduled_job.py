@@ -0,0 +1,36 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index
+from datetime import datetime
+from pydantic import BaseModel
+from typing import Optional
+
+from ..core.database import Base
+
+class ScheduledJob(Base):
+    """Pending background job; the (run_at, id) index is the scheduler's queue"""
+    __tablename__ = "scheduled_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False)  # reminder, ...
+    key = Column(String(255), nullable=False, unique=True)  # e.g. tasks:12; one pending job per key
+    run_at = Column(DateTime, nullable=False)
+    payload = Column(Text, nullable=True)  # JSON string
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # Owner of the row the job is about; NULL: the local profile (app.core.auth)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+    __table_args__ = (
+        Index("ix_scheduled_jobs_run_at_id", "run_at", "id"),
+        Index("ix_scheduled_jobs_user_run_at_id", "user_id", "run_at", "id"),
+    )
+
+class ScheduledJobResponse(BaseModel):
+    id: int
+    kind: str
+    key: str
+    run_at: datetime
+    payload: Optional[str]
+    attempts: int
+    
+    class Config:
+        from_attributes = True
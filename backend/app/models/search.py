@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+class SearchHit(BaseModel):
+    type: str  # task, email or chat
+    id: int
+    score: float  # cosine similarity to the query, 0 to 1
+    title: str
+    snippet: Optional[str]
+    timestamp: datetime  # created, or received for emails
+
+class SearchIndexStatus(BaseModel):
+    embedder: str
+    dimensions: int
+    vectors: int
+    partitions: int  # IVF partitions; 0 while every query scans the whole index
+    pending: int  # rows and tables waiting to be indexed
@@ -1,10 +1,9 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Index
 from datetime import datetime
 from pydantic import BaseModel
 from typing import Optional
 
-Base = declarative_base()
+from ..core.database import Base
 
 class Suggestion(Base):
     __tablename__ = "suggestions"
@@ -15,7 +14,19 @@ class Suggestion(Base):
     action_type = Column(String(100), nullable=False)  # task, calendar, email, etc.
     action_data = Column(Text, nullable=True)  # JSON string
     is_dismissed = Column(Boolean, default=False)
+    # Row a generated suggestion was derived from and the rule that produced it;
+    # NULL for suggestions created through the API
+    source_type = Column(String(50), nullable=True)  # table name
+    source_id = Column(Integer, nullable=True)
+    rule = Column(String(50), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Owner of the source row, or of the caller that created it; NULL: the local profile (app.core.auth)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+    __table_args__ = (
+        Index("ux_suggestions_source_rule", "source_type", "source_id", "rule", unique=True),
+        Index("ix_suggestions_user_dismissed_created_id", "user_id", "is_dismissed", "created_at", "id"),
+    )
 
 class SuggestionCreate(BaseModel):
     title: str
@@ -30,6 +41,9 @@ class SuggestionResponse(BaseModel):
     action_type: str
     action_data: Optional[str]
     is_dismissed: bool
+    source_type: Optional[str]
+    source_id: Optional[int]
+    rule: Optional[str]
     created_at: datetime
     
     class Config:
@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from datetime import date, datetime
+
+class DashboardSummary(BaseModel):
+    unread_emails: int
+    important_emails: int
+    open_tasks: int
+    overdue_tasks: int
+    todays_events: int
+    date: date
+    computed_at: datetime
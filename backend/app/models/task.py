@@ -1,10 +1,10 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Index
 from datetime import datetime
 from pydantic import BaseModel
 from typing import Optional
 
-Base = declarative_base()
+from ..core.database import Base
+from .bulk import BulkIds
 
 class Task(Base):
     __tablename__ = "tasks"
@@ -17,6 +17,12 @@ class Task(Base):
     due_date = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # NULL: the local profile (app.core.auth)
+
+    __table_args__ = (
+        Index("ix_tasks_completed_due_date", "completed", "due_date"),
+        Index("ix_tasks_user_due_date_id", "user_id", "due_date", "id"),
+    )
 
 class TaskCreate(BaseModel):
     title: str
@@ -35,4 +41,7 @@ class TaskResponse(BaseModel):
     updated_at: datetime
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class TaskBulkCompletion(BulkIds):
+    completed: bool = True
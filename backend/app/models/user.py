@@ -1,10 +1,12 @@
 from sqlalchemy import Column, Integer, String, DateTime, Boolean
-from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, field_validator
 from typing import Optional
 
-Base = declarative_base()
+from ..core.database import Base
+
+# bcrypt only reads this many bytes of a password
+MAX_PASSWORD_BYTES = 72
 
 class User(Base):
     __tablename__ = "users"
@@ -21,6 +23,13 @@ class UserCreate(BaseModel):
     email: EmailStr
     full_name: str
     password: str
+    
+    @field_validator("password")
+    @classmethod
+    def _check_password(cls, password: str) -> str:
+        if len(password.encode()) > MAX_PASSWORD_BYTES:
+            raise ValueError(f"must be at most {MAX_PASSWORD_BYTES} bytes long")
+        return password
 
 class UserResponse(BaseModel):
     id: int
@@ -31,4 +40,13 @@ class UserResponse(BaseModel):
     updated_at: datetime
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class LoginRequest(BaseModel):
+    email: str
+    password: str
+
+class Token(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+    expires_in: int  # seconds
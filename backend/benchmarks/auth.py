@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Authentication benchmark: per-request token overhead and off-loop password hashing.
+
+Generates --rows local-profile tasks and registers --users accounts owning
+--rows-per-user tasks each, then measures a task detail request and a keyset
+task list page without a token, with a token whose verification is cached,
+and with the cache disabled so every request decodes the token and loads the
+user row (response cache disabled). Then sends --logins concurrent logins
+(bcrypt at the default cost) and records how late a 5 ms timer fires on the
+event loop meanwhile, with hashing on its thread pool and on the loop itself.
+
+    python -m benchmarks.auth --rows 100000 --users 10 --requests 500
+"""
+import argparse
+import asyncio
+import atexit
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+_db_dir = tempfile.mkdtemp(prefix="bench_")
+atexit.register(shutil.rmtree, _db_dir, ignore_errors=True)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+os.environ.setdefault("SLOW_QUERY_MS", "10000")
+os.environ.setdefault("AUTH_SECRET_KEY", "benchmark")
+
+import httpx
+
+from app.core import auth
+from app.core.auth import token_cache
+from app.core.database import create_tables
+from app.core.response_cache import response_cache
+from app.core.semantic_search import semantic_index
+from seed_data import generate_dataset
+
+PASSWORD = "correct horse battery staple"
+
+def summary(latencies):
+    ordered = sorted(latencies)
+    return f"{statistics.median(ordered):8.3f} ms p50, {ordered[int(len(ordered) * 0.95)]:8.3f} ms p95"
+
+async def timed(client, url, count, headers=None):
+    latencies = []
+    for i in range(count):
+        started = time.perf_counter()
+        response = await client.get(url(i) if callable(url) else url, headers=headers)
+        latencies.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+    return latencies
+
+async def loop_lag(stop: asyncio.Event):
+    """How late a 5 ms sleep wakes up, sampled until ``stop`` is set"""
+    lags = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.005)
+        lags.append((time.perf_counter() - started) * 1000 - 5)
+    return lags
+
+async def run(args):
+    from main import app
+    response_cache.max_entry_bytes = 0
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            started = time.perf_counter()
+            headers = []
+            for n in range(args.users):
+                email = f"user{n}@bench.example"
+                response = await client.post("/api/auth/register", json={"email": email, "full_name": f"User {n}", "password": PASSWORD})
+                response.raise_for_status()
+                token = (await client.post("/api/auth/login", json={"email": email, "password": PASSWORD})).json()["access_token"]
+                headers.append({"Authorization": f"Bearer {token}"})
+                for offset in range(0, args.rows_per_user, 5000):
+                    tasks = [{"title": f"User {n} task {i}"} for i in range(offset, min(args.rows_per_user, offset + 5000))]
+                    (await client.post("/api/tasks/bulk", json=tasks, headers=headers[-1])).raise_for_status()
+            print(f"registered {args.users} users with {args.rows_per_user:,} tasks each in {time.perf_counter() - started:.1f} s")
+            # Let the search indexer catch up, so it does not compete with the requests measured
+            await semantic_index.settle()
+
+            user = headers[0]
+            own = (await client.get("/api/tasks/?limit=1&cursor=", headers=user)).json()[0]["id"]
+            local = (await client.get("/api/tasks/?limit=1&cursor=")).json()[0]["id"]
+            size = token_cache.max_entries
+            for name, url in {"detail": "/api/tasks/{}", "list page": "/api/tasks/?limit=50&cursor="}.items():
+                await timed(client, url.format(local), args.requests // 10)
+                anonymous = await timed(client, url.format(local), args.requests)
+                cached = await timed(client, url.format(own), args.requests, user)
+                token_cache.max_entries = 0
+                token_cache.clear()
+                uncached = await timed(client, url.format(own), args.requests, user)
+                token_cache.max_entries = size
+                base = statistics.median(anonymous)
+                print(f"  {name:<9} no token:        {summary(anonymous)}")
+                print(f"  {name:<9} token, cached:   {summary(cached)} (+{statistics.median(cached) - base:.3f} ms)")
+                print(f"  {name:<9} token, uncached: {summary(uncached)} (+{statistics.median(uncached) - base:.3f} ms)")
+
+            token = user["Authorization"].split()[1]
+            for label, entries in (("cached", size), ("uncached", 0)):
+                token_cache.max_entries = entries
+                token_cache.clear()
+                await auth.verify_token(token)
+                started = time.perf_counter()
+                for _ in range(args.requests * 10):
+                    await auth.verify_token(token)
+                print(f"  verify_token, {label:<8}  {(time.perf_counter() - started) * 1e6 / (args.requests * 10):8.1f} us")
+            token_cache.max_entries = size
+
+            # Concurrent logins, hashing on the pool and then on the event loop
+            verify_password = auth.verify_password
+            async def on_loop(password, hashed):
+                return auth._check(password, hashed)
+            for label, verify in (("thread pool", verify_password), ("event loop", on_loop)):
+                auth.verify_password = verify
+                stop = asyncio.Event()
+                sampler = asyncio.create_task(loop_lag(stop))
+                await asyncio.sleep(0.05)
+                started = time.perf_counter()
+                responses = await asyncio.gather(*(
+                    client.post("/api/auth/login", json={"email": f"user{i % args.users}@bench.example", "password": PASSWORD})
+                    for i in range(args.logins)
+                ))
+                elapsed = time.perf_counter() - started
+                stop.set()
+                lags = await sampler
+                assert all(response.status_code == 200 for response in responses)
+                print(
+                    f"  {args.logins} logins, bcrypt on {label:<11} {elapsed * 1000 / args.logins:7.1f} ms each, "
+                    f"loop lag {statistics.median(lags):7.2f} ms p50, {max(lags):7.1f} ms max"
+                )
+            auth.verify_password = verify_password
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000, help="tasks of the local profile")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--rows-per-user", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--logins", type=int, default=8, help="concurrent logins")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    create_tables()
+    generate_dataset({"tasks": args.rows}, seed=args.seed, log=lambda message: None)
+    print(f"{args.rows:,} local-profile tasks, bcrypt cost {auth.BCRYPT_ROUNDS}")
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Bulk ingestion benchmark: one POST per email vs POST /api/email/bulk.
+
+    python -m benchmarks.bulk_insert --rows 5000 --batch-size 500
+"""
+import argparse
+import asyncio
+import atexit
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_db_dir = tempfile.mkdtemp(prefix="bench_")
+atexit.register(shutil.rmtree, _db_dir, ignore_errors=True)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+import httpx
+
+from app.core.database import create_tables
+
+def make_emails(count):
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            "subject": f"Ingested message {i}",
+            "sender": f"sender{i % 50}@example.com",
+            "recipient": "you@example.com",
+            "body": "Synthetic body for ingestion benchmarking. " * 8,
+            "received_at": (start + timedelta(minutes=i)).isoformat(),
+        }
+        for i in range(count)
+    ]
+
+async def run(rows, batch_size):
+    from main import app
+    emails = make_emails(rows)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        for email in emails:
+            (await client.post("/api/email/", json=email)).raise_for_status()
+        single = rows / (time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            response = await client.post("/api/email/bulk", json=emails[offset:offset + batch_size])
+            response.raise_for_status()
+        bulk = rows / (time.perf_counter() - started)
+
+    print(f"   single POST: {single:10,.0f} rows/s")
+    print(f"     bulk POST: {bulk:10,.0f} rows/s  (batch {batch_size}, {bulk / single:.1f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    create_tables()
+    print(f"📨 Ingesting {args.rows:,} emails each way")
+    asyncio.run(run(args.rows, args.batch_size))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Calendar range benchmark: B-tree overlap predicate vs the R*Tree interval index.
+
+Generates --rows events spread over several years and times "all events
+intersecting [a, b)" windows of one day and one week, plus the free/busy
+projection that only reads start/end times. Both sides filter on the owner,
+as the API does.
+
+    python -m benchmarks.calendar_range --rows 200000
+"""
+import argparse
+import atexit
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_db_dir = tempfile.mkdtemp(prefix="bench_")
+atexit.register(shutil.rmtree, _db_dir, ignore_errors=True)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+from sqlalchemy import insert, select
+
+from app.core.auth import owned_by
+from app.core.database import SessionLocal, create_tables, engine
+from app.models.calendar_event import CalendarEvent, overlapping
+
+START = datetime(2022, 1, 1)
+YEARS = 5
+
+def generate_events(rows: int, batch_size: int = 10_000):
+    rng = random.Random(7)
+    span = YEARS * 365 * 24 * 60
+    with engine.begin() as conn:
+        for offset in range(0, rows, batch_size):
+            batch = []
+            for i in range(offset, min(rows, offset + batch_size)):
+                start = START + timedelta(minutes=rng.randrange(span))
+                # Mostly short meetings with a tail of multi-day events
+                length = rng.choice((30, 60, 90)) if rng.random() < 0.97 else rng.randrange(1440, 14 * 1440)
+                batch.append({"title": f"Event {i}", "start_time": start, "end_time": start + timedelta(minutes=length)})
+            conn.execute(insert(CalendarEvent), batch)
+
+def btree_overlap(start, end):
+    return select(CalendarEvent.id).where(owned_by(CalendarEvent, None), CalendarEvent.start_time < end, CalendarEvent.end_time > start)
+
+def rtree_overlap(start, end):
+    return overlapping(select(CalendarEvent.id), start, end).where(owned_by(CalendarEvent, None, indexed=False))
+
+def time_windows(db, build, windows):
+    started = time.perf_counter()
+    found = 0
+    for start, end in windows:
+        found += len(db.execute(build(start, end)).all())
+    return (time.perf_counter() - started) / len(windows), found
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--windows", type=int, default=200)
+    args = parser.parse_args()
+
+    create_tables()
+    print(f"🌱 Generating {args.rows:,} events over {YEARS} years...")
+    generate_events(args.rows)
+
+    rng = random.Random(11)
+    db = SessionLocal()
+    try:
+        for label, width in (("1 day", timedelta(days=1)), ("1 week", timedelta(days=7))):
+            windows = []
+            for _ in range(args.windows):
+                start = START + timedelta(days=rng.randrange(YEARS * 365 - 7))
+                windows.append((start, start + width))
+            btree_time, btree_found = time_windows(db, btree_overlap, windows)
+            rtree_time, rtree_found = time_windows(db, rtree_overlap, windows)
+            assert btree_found == rtree_found
+            print(f"{label:>7}: btree {btree_time * 1000:7.2f} ms  rtree {rtree_time * 1000:7.2f} ms  "
+                  f"({btree_found / len(windows):.1f} events/window)")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
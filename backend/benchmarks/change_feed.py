@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Change feed load test: many concurrent SSE subscribers receiving writes.
+
+Opens N /api/events/ streams as raw ASGI calls (httpx's ASGI transport would
+buffer the never-ending responses), then creates tasks one by one and reports
+how long each change took to reach every subscriber and the CPU spent per
+write, compared with one round of polling the task list per subscriber.
+
+    python -m benchmarks.change_feed --subscribers 500 --writes 200
+"""
+import argparse
+import asyncio
+import atexit
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+_db_dir = tempfile.mkdtemp(prefix="bench_")
+atexit.register(shutil.rmtree, _db_dir, ignore_errors=True)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+import httpx
+
+from app.core.database import create_tables
+
+class Subscriber:
+    def __init__(self):
+        self.closed = asyncio.Event()
+        self.received = {}
+        self.ready = asyncio.Event()
+
+    async def run(self, app):
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": "/api/events/", "raw_path": b"/api/events/",
+            "query_string": b"entity=tasks", "root_path": "", "headers": [],
+            "server": ("bench", 80), "client": ("bench", 1),
+        }
+        requested = False
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await self.closed.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] != "http.response.body":
+                return
+            body = message.get("body", b"")
+            if body.startswith(b"retry:"):
+                self.ready.set()
+            for line in body.split(b"\n"):
+                if line.startswith(b"id: "):
+                    self.received[int(line[4:])] = time.perf_counter()
+
+        await app(scope, receive, send)
+
+async def run(subscriber_count, writes):
+    from main import app
+    from app.core.feed import change_feed
+
+    subscribers = [Subscriber() for _ in range(subscriber_count)]
+    streams = [asyncio.create_task(subscriber.run(app)) for subscriber in subscribers]
+    await asyncio.gather(*(subscriber.ready.wait() for subscriber in subscribers))
+    print(f"  {change_feed.subscriber_count} subscribers connected")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        latencies, cpu = [], []
+        for n in range(writes):
+            cpu_started, started = time.process_time(), time.perf_counter()
+            await client.post("/api/tasks/", json={"title": f"Task {n}"})
+            version = change_feed.version
+            while not all(version in subscriber.received for subscriber in subscribers):
+                await asyncio.sleep(0)
+            cpu.append(time.process_time() - cpu_started)
+            latencies.extend(subscriber.received[version] - started for subscriber in subscribers)
+
+        poll_started = time.process_time()
+        for _ in range(subscriber_count):
+            await client.get("/api/tasks/", params={"limit": 100})
+        poll_cpu = time.process_time() - poll_started
+
+    for subscriber in subscribers:
+        subscriber.closed.set()
+    await asyncio.gather(*streams)
+
+    latencies.sort()
+    print(f"  write to delivery: p50 {statistics.median(latencies) * 1000:7.2f} ms  "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:7.2f} ms  max {latencies[-1] * 1000:7.2f} ms")
+    print(f"  CPU per write incl. fan-out: {statistics.mean(cpu) * 1000:7.2f} ms")
+    print(f"  CPU for one poll round by every subscriber: {poll_cpu * 1000:7.2f} ms")
+    print(f"  subscribers left after disconnect: {change_feed.subscriber_count}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--subscribers", type=int, default=500)
+    parser.add_argument("--writes", type=int, default=200)
+    args = parser.parse_args()
+
+    create_tables()
+    asyncio.run(run(args.subscribers, args.writes))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Chat completion benchmark: time-to-first-token and tokens/s of streamed replies.
+
+Runs POST /api/chat/{thread_id}/complete against the offline stub backend at
+increasing concurrency, each stream on its own thread with --history earlier
+messages, and reports client-observed time-to-first-token and per-stream
+tokens/s. --delay sets the stub's simulated per-token latency; 0 measures the
+endpoint's own overhead. Also checks that every finished stream saved exactly
+one assistant message and that a client disconnecting mid-stream saves none.
+
+    python -m benchmarks.chat_completion --concurrency 1 8 32 --delay 0.005
+"""
+import argparse
+import asyncio
+import atexit
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_db_dir = tempfile.mkdtemp(prefix="bench_")
+atexit.register(shutil.rmtree, _db_dir, ignore_errors=True)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+from sqlalchemy import func, insert, select
+
+from app.core.completion import StubBackend, get_completion_backend
+from app.core.database import create_tables, engine
+from app.models.chat_message import ChatMessage, ChatThread
+
+def create_threads(count, history):
+    start = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(ChatThread), [
+            {"thread_id": f"bench-{t}", "title": f"Thread {t}", "message_count": history,
+             "last_message_at": start + timedelta(minutes=history), "created_at": start}
+            for t in range(count)
+        ])
+        for t in range(count):
+            conn.execute(insert(ChatMessage), [
+                {"thread_id": f"bench-{t}", "role": "user" if i % 2 == 0 else "assistant",
+                 "content": f"Message {i} of thread {t}: " + "context words " * 20,
+                 "is_ai_response": i % 2 == 1, "created_at": start + timedelta(minutes=i)}
+                for i in range(history)
+            ])
+
+def assistant_replies():
+    with engine.connect() as conn:
+        return conn.execute(
+            select(func.count()).select_from(ChatMessage).where(ChatMessage.created_at > datetime(2025, 1, 1))
+        ).scalar()
+
+async def complete(app, thread_id, max_tokens, disconnect_after=None):
+    """Stream one completion; returns (time to first token, total time, token count, done received)"""
+    path = f"/api/chat/{thread_id}/complete"
+    body = json.dumps({"max_tokens": max_tokens}).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "server": ("bench", 80), "client": ("bench", 1),
+    }
+
+    finished = asyncio.Event()
+    requested = False
+    tokens = 0
+    first_token = None
+    done = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal tokens, first_token, done
+        if message["type"] != "http.response.body":
+            return
+        chunk = message.get("body", b"")
+        if chunk.startswith(b"event: token"):
+            tokens += 1
+            if first_token is None:
+                first_token = time.perf_counter()
+            if disconnect_after is not None and tokens >= disconnect_after:
+                finished.set()
+        elif chunk.startswith(b"event: done"):
+            done = True
+        if not message.get("more_body", False):
+            finished.set()
+
+    started = time.perf_counter()
+    await app(scope, receive, send)
+    elapsed = time.perf_counter() - started
+    return (first_token or started) - started, elapsed, tokens, done
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+async def run(levels, delay, max_tokens):
+    from main import app
+    app.dependency_overrides[get_completion_backend] = lambda: StubBackend(token_delay=delay)
+    offset = 0
+    for concurrency in levels:
+        before = assistant_replies()
+        results = await asyncio.gather(*(
+            complete(app, f"bench-{offset + n}", max_tokens) for n in range(concurrency)
+        ))
+        offset += concurrency
+        assert all(done for *_, done in results)
+        assert assistant_replies() - before == concurrency, "each finished stream saves exactly one reply"
+
+        ttft = [first * 1000 for first, *_ in results]
+        rates = [tokens / (elapsed - first) for first, elapsed, tokens, _ in results if elapsed > first]
+        print(
+            f"concurrency {concurrency:>3}: TTFT p50 {statistics.median(ttft):7.2f} ms  "
+            f"p95 {percentile(ttft, 0.95):7.2f} ms  tokens/s per stream {statistics.median(rates):9,.0f}  "
+            f"aggregate {sum(tokens for *_, tokens, _ in results) / max(e for _, e, *_ in results):9,.0f}"
+        )
+
+    before = assistant_replies()
+    *_, tokens, done = await complete(app, f"bench-{offset}", max_tokens, disconnect_after=3)
+    await asyncio.sleep(0.05)
+    assert not done and assistant_replies() == before, "a disconnected stream saves nothing"
+    print(f"disconnect after {tokens} tokens: no reply saved")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--delay", type=float, default=0.005, help="Simulated seconds per token")
+    parser.add_argument("--history", type=int, default=500, help="Earlier messages per thread")
+    parser.add_argument("--max-tokens", type=int, default=96)
+    args = parser.parse_args()
+
+    create_tables()
+    create_threads(sum(args.concurrency) + 1, args.history)
+    asyncio.run(run(args.concurrency, args.delay, args.max_tokens))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Chat history benchmark: paging and context retrieval on very long threads.
+
+Builds one thread with --messages messages (plus many short threads) and
+measures thread listing, the newest history page, a deep page reached by
+offset vs by cursor, and "last messages within a token budget" against the
+naive approach of loading the whole thread and trimming it in Python.
+
+    python -m benchmarks.chat_history --messages 100000
+"""
+import argparse
+import asyncio
+import atexit
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_db_dir = tempfile.mkdtemp(prefix="bench_")
+atexit.register(shutil.rmtree, _db_dir, ignore_errors=True)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+from sqlalchemy import insert, select
+import httpx
+
+from app.core.database import AsyncReadSessionLocal, create_tables, engine
+from app.core.pagination import encode_cursor
+from app.models.chat_message import ChatMessage, ChatThread, thread_title
+
+WORDS = "the meeting moved to thursday please review budget draft and send notes before lunch".split()
+
+def generate(messages, other_threads, batch_size=10_000):
+    rng = random.Random(11)
+    start = datetime(2024, 1, 1)
+    threads = ["long"] + [f"short-{n}" for n in range(other_threads)]
+    with engine.begin() as conn:
+        for offset in range(0, messages, batch_size):
+            conn.execute(insert(ChatMessage), [
+                {
+                    "content": " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 120))),
+                    "role": "user" if i % 2 == 0 else "assistant",
+                    "thread_id": "long",
+                    "is_ai_response": i % 2 == 1,
+                    "created_at": start + timedelta(seconds=i),
+                }
+                for i in range(offset, min(messages, offset + batch_size))
+            ])
+        conn.execute(insert(ChatMessage), [
+            {"content": "Short thread message", "role": "user", "thread_id": thread, "created_at": start + timedelta(seconds=n)}
+            for n, thread in enumerate(threads[1:] * 20)
+        ])
+        conn.execute(insert(ChatThread), [
+            {
+                "thread_id": thread,
+                "title": thread_title(f"Thread {thread}"),
+                "message_count": messages if thread == "long" else 20,
+                "last_message_at": start + timedelta(seconds=messages if thread == "long" else n),
+                "created_at": start,
+            }
+            for n, thread in enumerate(threads)
+        ])
+
+async def timed(repeat, request):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = await request()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000, response
+
+async def load_whole_thread(max_tokens):
+    async with AsyncReadSessionLocal() as db:
+        messages = (await db.scalars(
+            select(ChatMessage).where(ChatMessage.thread_id == "long").order_by(ChatMessage.created_at)
+        )).all()
+    kept, total = [], 0
+    for message in reversed(messages):
+        if total + message.token_count > max_tokens:
+            break
+        kept.append(message)
+        total += message.token_count
+    return kept
+
+async def run(messages, repeat):
+    from main import app
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        deep = messages - 100
+        threads_ms, _ = await timed(repeat, lambda: client.get("/api/chat/threads", params={"limit": 50}))
+        newest_ms, _ = await timed(repeat, lambda: client.get("/api/chat/threads/long/messages", params={"limit": 50}))
+        offset_ms, _ = await timed(repeat, lambda: client.get(
+            "/api/chat/threads/long/messages", params={"limit": 50, "skip": deep},
+        ))
+
+        # Walk to the same depth once to get a cursor, then time fetching that page
+        async with AsyncReadSessionLocal() as db:
+            row = (await db.execute(
+                select(ChatMessage.created_at, ChatMessage.id)
+                .where(ChatMessage.thread_id == "long")
+                .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+                .offset(deep - 1).limit(1)
+            )).one()
+        cursor = encode_cursor(row.created_at, row.id)
+        cursor_ms, _ = await timed(repeat, lambda: client.get(
+            "/api/chat/threads/long/messages", params={"limit": 50, "cursor": cursor},
+        ))
+
+        context_ms, response = await timed(repeat, lambda: client.get(
+            "/api/chat/threads/long/context", params={"max_tokens": 4000},
+        ))
+        context = response.json()
+        naive_ms, _ = await timed(max(1, repeat // 10), lambda: load_whole_thread(4000))
+
+    print(f"  list threads:                  {threads_ms:9.2f} ms")
+    print(f"  newest history page:           {newest_ms:9.2f} ms")
+    print(f"  page at depth {deep:,} by offset: {offset_ms:9.2f} ms")
+    print(f"  page at depth {deep:,} by cursor: {cursor_ms:9.2f} ms")
+    print(f"  context within 4000 tokens:    {context_ms:9.2f} ms  "
+          f"({len(context['messages'])} messages, {context['token_count']} tokens)")
+    print(f"  load whole thread and trim:    {naive_ms:9.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--threads", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    create_tables()
+    print(f"🌱 Generating a {args.messages:,}-message thread and {args.threads:,} short threads...")
+    generate(args.messages, args.threads)
+    asyncio.run(run(args.messages, args.repeat))
+
+if __name__ == "__main__":
+    main()
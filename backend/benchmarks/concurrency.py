@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark: p99 latency under a mixed read/write load.
+
+Drives the app in-process through httpx's ASGI transport, so every request
+shares one event loop exactly like a single uvicorn worker. The "blocking"
+mode mounts the old handler shape (sync Session calls inside ``async def``)
+for comparison with the async session path the routers now use.
+
+    python -m benchmarks.concurrency --clients 12 --requests 200
+"""
+import argparse
+import atexit
+import asyncio
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+_db_dir = tempfile.mkdtemp(prefix="bench_")
+atexit.register(shutil.rmtree, _db_dir, ignore_errors=True)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+import httpx
+
+from app.core.database import SQLALCHEMY_DATABASE_URL, create_tables
+from app.models.task import Task, TaskCreate, TaskResponse
+
+def build_blocking_app(pool_size: int) -> FastAPI:
+    """Baseline app reproducing the previous sync-session-in-async-handler pattern"""
+    app = FastAPI()
+    blocking_engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        pool_size=pool_size,
+        connect_args={"check_same_thread": False},
+    )
+    BlockingSession = sessionmaker(autocommit=False, autoflush=False, bind=blocking_engine)
+
+    def get_db():
+        db = BlockingSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @app.get("/health")
+    async def health_check():
+        return {"status": "healthy"}
+
+    @app.get("/api/tasks/", response_model=list[TaskResponse])
+    async def get_tasks(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+        return db.query(Task).offset(skip).limit(limit).all()
+
+    @app.post("/api/tasks/", response_model=TaskResponse)
+    async def create_task(task: TaskCreate, db: Session = Depends(get_db)):
+        db_task = Task(**task.dict())
+        db.add(db_task)
+        db.commit()
+        db.refresh(db_task)
+        return db_task
+
+    return app
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def run_client(client, n_requests, write_every, reads, writes):
+    for i in range(n_requests):
+        started = time.perf_counter()
+        if i % write_every == 0:
+            await client.post("/api/tasks/", json={
+                "title": f"bench task {i}",
+                "priority": "medium",
+                "due_date": datetime.utcnow().isoformat(),
+            })
+            writes.append(time.perf_counter() - started)
+        else:
+            await client.get("/api/tasks/", params={"limit": 50})
+            reads.append(time.perf_counter() - started)
+
+async def run_probe(client, done, probes):
+    """Hit a DB-free endpoint while the load runs; its latency is pure event-loop stall"""
+    while not done.is_set():
+        started = time.perf_counter()
+        await client.get("/health")
+        probes.append(time.perf_counter() - started)
+        await asyncio.sleep(0.005)
+
+async def run_mode(app, clients, n_requests, write_every):
+    reads, writes, probes = [], [], []
+    done = asyncio.Event()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        probe = asyncio.create_task(run_probe(client, done, probes))
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            run_client(client, n_requests, write_every, reads, writes)
+            for _ in range(clients)
+        ))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe
+    return reads, writes, probes, elapsed
+
+def report(name, reads, writes, probes, elapsed):
+    total = len(reads) + len(writes)
+    print(f"{name:>9}: {total / elapsed:8.1f} req/s  "
+          f"read p99 {percentile(reads, 99) * 1000:7.2f} ms  "
+          f"write p99 {percentile(writes, 99) * 1000:7.2f} ms  "
+          f"/health p50 {statistics.median(probes) * 1000:6.2f} ms  "
+          f"/health p99 {percentile(probes, 99) * 1000:7.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=12)
+    parser.add_argument("--requests", type=int, default=200, help="requests per client")
+    parser.add_argument("--write-every", type=int, default=5, help="one write per N requests")
+    args = parser.parse_args()
+
+    create_tables()
+
+    from main import app as async_app
+
+    print(f"🏁 {args.clients} clients x {args.requests} requests, 1 write per {args.write_every}")
+    for name, app in (("blocking", build_blocking_app(args.clients)), ("async", async_app)):
+        results = asyncio.run(run_mode(app, args.clients, args.requests, args.write_every))
+        report(name, *results)
+
+if __name__ == "__main__":
+    main()
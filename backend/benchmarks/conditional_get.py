@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Polling benchmark: unconditional GETs vs If-None-Match revalidation.
+
+Simulates the desktop client polling the three list endpoints while writes
+are rare, and reports bytes received and process CPU time per poll with and
+without replaying the last ETag.
+
+    python -m benchmarks.conditional_get --rows 2000 --polls 300
+"""
+import argparse
+import asyncio
+import atexit
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_db_dir = tempfile.mkdtemp(prefix="bench_")
+atexit.register(shutil.rmtree, _db_dir, ignore_errors=True)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+from sqlalchemy import insert
+import httpx
+
+from app.core.database import create_tables, engine
+from app.models.calendar_event import CalendarEvent
+from app.models.email_message import EmailMessage
+from app.models.task import Task
+
+PATHS = ["/api/tasks/", "/api/email/", "/api/calendar/"]
+
+def generate(rows):
+    start = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(Task), [{"title": f"Task {i}", "description": "Details " * 10} for i in range(rows)])
+        conn.execute(insert(EmailMessage), [
+            {
+                "subject": f"Subject {i}", "sender": "sender@example.com", "recipient": "you@example.com",
+                "body": "Body text " * 50, "received_at": start + timedelta(minutes=i),
+            }
+            for i in range(rows)
+        ])
+        conn.execute(insert(CalendarEvent), [
+            {"title": f"Event {i}", "start_time": start + timedelta(hours=i), "end_time": start + timedelta(hours=i + 1)}
+            for i in range(rows)
+        ])
+
+async def poll(client, polls, write_every, conditional):
+    etags = {}
+    received = 0
+    started = time.process_time()
+    for n in range(polls):
+        if write_every and n % write_every == 0:
+            await client.patch("/api/tasks/1/toggle")
+        for path in PATHS:
+            headers = {"If-None-Match": etags[path]} if conditional and path in etags else {}
+            response = await client.get(path, params={"limit": 100}, headers=headers)
+            received += len(response.content)
+            if response.status_code == 200:
+                etags[path] = response.headers["etag"]
+    return received / polls, (time.process_time() - started) / polls
+
+async def run(polls, write_every):
+    from main import app
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        full_bytes, full_cpu = await poll(client, polls, write_every, conditional=False)
+        cond_bytes, cond_cpu = await poll(client, polls, write_every, conditional=True)
+    print(f"  unconditional: {full_bytes / 1024:9.1f} KiB/poll  {full_cpu * 1000:7.2f} ms CPU/poll")
+    print(f"  If-None-Match: {cond_bytes / 1024:9.1f} KiB/poll  {cond_cpu * 1000:7.2f} ms CPU/poll  "
+          f"({full_bytes / max(cond_bytes, 1):.0f}x fewer bytes, {full_cpu / cond_cpu:.1f}x less CPU)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--polls", type=int, default=300)
+    parser.add_argument("--write-every", type=int, default=50, help="toggle a task every N polls (0 = never)")
+    args = parser.parse_args()
+
+    create_tables()
+    print(f"🌱 Generating {args.rows:,} rows per table...")
+    generate(args.rows)
+    asyncio.run(run(args.polls, args.write_every))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Inbox projection benchmark: full /api/email/ pages vs /api/email/summary.
+
+Measures response bytes and end-to-end request time for 100-row pages over
+messages with realistic (several KB) bodies.
+
+    python -m benchmarks.email_projection --rows 5000 --body-kb 4
+"""
+import argparse
+import asyncio
+import atexit
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_db_dir = tempfile.mkdtemp(prefix="bench_")
+atexit.register(shutil.rmtree, _db_dir, ignore_errors=True)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+from sqlalchemy import insert
+import httpx
+
+from app.core.database import create_tables, engine
+from app.models.email_message import EmailMessage
+
+WORDS = "meeting budget review proposal deadline update launch customer report draft team".split()
+
+def generate_emails(rows, body_kb, batch_size=2000):
+    rng = random.Random(9)
+    start = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        for offset in range(0, rows, batch_size):
+            conn.execute(insert(EmailMessage), [
+                {
+                    "subject": f"{rng.choice(WORDS).title()} {i}",
+                    "sender": f"sender{i % 100}@example.com",
+                    "recipient": "you@example.com",
+                    "body": " ".join(rng.choice(WORDS) for _ in range(body_kb * 150)),
+                    "is_read": rng.random() < 0.5,
+                    "received_at": start + timedelta(minutes=i),
+                }
+                for i in range(offset, min(rows, offset + batch_size))
+            ])
+
+async def measure(client, path, repeat):
+    samples, size = [], 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = await client.get(path, params={"limit": 100})
+        samples.append(time.perf_counter() - started)
+        size = len(response.content)
+    return statistics.median(samples), size
+
+async def run(repeat):
+    from main import app
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        full_time, full_size = await measure(client, "/api/email/", repeat)
+        summary_time, summary_size = await measure(client, "/api/email/summary", repeat)
+    print(f"      full list: {full_size / 1024:9.1f} KiB  {full_time * 1000:7.2f} ms")
+    print(f"   summary list: {summary_size / 1024:9.1f} KiB  {summary_time * 1000:7.2f} ms  "
+          f"({full_size / summary_size:.0f}x fewer bytes, {full_time / summary_time:.1f}x faster)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--body-kb", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    create_tables()
+    print(f"🌱 Generating {args.rows:,} emails with ~{args.body_kb} KiB bodies...")
+    generate_emails(args.rows, args.body_kb)
+    asyncio.run(run(args.repeat))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Export benchmark: streaming NDJSON memory and throughput as the table grows.
+
+Streams GET /api/tasks/export for increasing table sizes and reports rows/s
+and peak Python heap allocation (tracemalloc) while the response is consumed,
+which should stay flat regardless of row count. The app is called as a raw
+ASGI callable that discards each body chunk, because httpx's ASGI transport
+buffers whole responses and would dominate the measurement.
+
+    python -m benchmarks.export_stream --rows 10000 100000 500000
+"""
+import argparse
+import asyncio
+import atexit
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+_db_dir = tempfile.mkdtemp(prefix="bench_")
+atexit.register(shutil.rmtree, _db_dir, ignore_errors=True)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+from sqlalchemy import func, insert, select
+
+from app.core.database import create_tables, engine
+from app.models.task import Task
+
+def grow_tasks(target, batch_size=10_000):
+    with engine.begin() as conn:
+        current = conn.execute(select(func.count()).select_from(Task)).scalar()
+        start = datetime(2024, 1, 1)
+        for offset in range(current, target, batch_size):
+            conn.execute(insert(Task), [
+                {"title": f"Task {i}", "description": "Exported row " * 5, "due_date": start + timedelta(hours=i)}
+                for i in range(offset, min(target, offset + batch_size))
+            ])
+
+async def stream_export(app):
+    lines = 0
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/api/tasks/export", "raw_path": b"/api/tasks/export",
+        "query_string": b"", "root_path": "", "headers": [], "server": ("bench", 80), "client": ("bench", 1),
+    }
+
+    finished = asyncio.Event()
+    requested = False
+
+    async def receive():
+        # Hand over the empty request body once, then block like a live client
+        # until the response is done; StreamingResponse polls this for disconnects
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal lines
+        if message["type"] == "http.response.body":
+            lines += message.get("body", b"").count(b"\n")
+            if not message.get("more_body", False):
+                finished.set()
+
+    await app(scope, receive, send)
+    return lines
+
+async def run(sizes):
+    from main import app
+    for size in sizes:
+        grow_tasks(size)
+        tracemalloc.start()
+        started = time.perf_counter()
+        lines = await stream_export(app)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert lines == size
+        print(f"{size:>10,} rows: {size / elapsed:10,.0f} rows/s  peak heap {peak / 2**20:7.2f} MiB")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 300_000])
+    args = parser.parse_args()
+
+    create_tables()
+    asyncio.run(run(sorted(args.rows)))
+
+if __name__ == "__main__":
+    main()
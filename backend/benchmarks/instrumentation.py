@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Instrumentation benchmark: cost of request timing and SQL profiling.
+
+Runs the same list requests with the instrumentation middleware and cursor
+events installed and with both removed (response cache disabled, so every
+request runs its SQL), and reports latency per request, then the cost of a
+request profiled with ``X-Profile: 1`` and of rendering ``/metrics``.
+
+    python -m benchmarks.instrumentation --rows 5000 --requests 1000
+"""
+import argparse
+import asyncio
+import atexit
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+_db_dir = tempfile.mkdtemp(prefix="bench_")
+atexit.register(shutil.rmtree, _db_dir, ignore_errors=True)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+from sqlalchemy import event
+import httpx
+
+from app.core import instrumentation
+from app.core.database import async_engine, async_read_engine, create_tables, engine
+from app.core.response_cache import response_cache
+from benchmarks.response_cache import QUERIES, generate
+
+ENGINES = {engine, async_engine.sync_engine, async_read_engine.sync_engine}
+LISTENERS = (
+    ("before_cursor_execute", instrumentation._before_cursor_execute),
+    ("after_cursor_execute", instrumentation._after_cursor_execute),
+)
+
+def instrument(app, middleware, enabled):
+    app.user_middleware = [m for m in app.user_middleware if m.cls is not instrumentation.InstrumentationMiddleware]
+    if enabled:
+        app.user_middleware.insert(0, middleware)
+    app.middleware_stack = app.build_middleware_stack()
+    for target in ENGINES:
+        for name, listener in LISTENERS:
+            if enabled and not event.contains(target, name, listener):
+                event.listen(target, name, listener)
+            elif not enabled and event.contains(target, name, listener):
+                event.remove(target, name, listener)
+
+async def timed(client, requests, headers=None):
+    latencies = []
+    for n in range(requests):
+        path, params = QUERIES[n % len(QUERIES)]
+        started = time.perf_counter()
+        (await client.get(path, params=params, headers=headers)).raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+def summary(latencies):
+    return f"{statistics.median(latencies):6.2f} ms p50, {statistics.mean(latencies):6.2f} ms mean"
+
+async def run(requests):
+    from main import app
+    response_cache.max_entry_bytes = 0
+    middleware = next(m for m in app.user_middleware if m.cls is instrumentation.InstrumentationMiddleware)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await timed(client, len(QUERIES))
+        results = {}
+        for _ in range(10):  # interleaved, so drift affects both alike
+            for enabled in (False, True):
+                instrument(app, middleware, enabled)
+                results.setdefault(enabled, []).extend(await timed(client, requests // 10))
+        off, on = statistics.median(results[False]), statistics.median(results[True])
+        print(f"  uninstrumented: {summary(results[False])}")
+        print(f"    instrumented: {summary(results[True])}  ({(on - off) * 1000:+.0f} µs per request)")
+        print(f"        profiled: {summary(await timed(client, 50, headers={'X-Profile': '1'}))}")
+        started = time.perf_counter()
+        body = (await client.get("/metrics")).text
+        print(f"  /metrics: {(time.perf_counter() - started) * 1000:.2f} ms, {len(body.splitlines())} lines")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+
+    create_tables()
+    print(f"🌱 Generating {args.rows:,} rows per table...")
+    generate(args.rows)
+    asyncio.run(run(args.requests))
+
+if __name__ == "__main__":
+    main()
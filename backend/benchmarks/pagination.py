@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Pagination benchmark: OFFSET vs keyset cursors on a large generated mailbox.
+
+Builds an email_messages table of --rows messages, then times fetching a
+single page at increasing depths with OFFSET and with a keyset cursor
+positioned at the same depth.
+
+    python -m benchmarks.pagination --rows 500000
+"""
+import argparse
+import atexit
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_db_dir = tempfile.mkdtemp(prefix="bench_")
+atexit.register(shutil.rmtree, _db_dir, ignore_errors=True)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+from sqlalchemy import insert, select
+
+from app.core.database import SessionLocal, create_tables, engine
+from app.core.pagination import encode_cursor, keyset_page
+from app.models.email_message import EmailMessage
+
+def generate_emails(rows: int, batch_size: int = 10_000):
+    rng = random.Random(42)
+    start = datetime(2020, 1, 1)
+    with engine.begin() as conn:
+        for offset in range(0, rows, batch_size):
+            conn.execute(insert(EmailMessage), [
+                {
+                    "subject": f"Message {i}",
+                    "sender": f"sender{i % 500}@example.com",
+                    "recipient": "you@example.com",
+                    "body": "Lorem ipsum dolor sit amet " * 4,
+                    "is_read": rng.random() < 0.7,
+                    "is_important": rng.random() < 0.1,
+                    "received_at": start + timedelta(seconds=rng.randrange(0, 5 * 365 * 86400)),
+                }
+                for i in range(offset, min(rows, offset + batch_size))
+            ])
+
+def time_query(db, query, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        db.scalars(query).all()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    create_tables()
+    print(f"🌱 Generating {args.rows:,} emails...")
+    generate_emails(args.rows)
+
+    db = SessionLocal()
+    try:
+        base = select(EmailMessage)
+        ordered = base.order_by(EmailMessage.received_at.desc(), EmailMessage.id.desc())
+        print(f"{'depth':>10} {'offset ms':>10} {'keyset ms':>10}")
+        depths = sorted({d for d in (0, 1_000, 10_000, 100_000, args.rows // 2, args.rows - args.limit) if 0 <= d < args.rows})
+        for depth in depths:
+            offset_time = time_query(db, ordered.offset(depth).limit(args.limit))
+            if depth == 0:
+                cursor = ""
+            else:
+                anchor = db.execute(
+                    select(EmailMessage.received_at, EmailMessage.id)
+                    .order_by(EmailMessage.received_at.desc(), EmailMessage.id.desc())
+                    .offset(depth - 1).limit(1)
+                ).one()
+                cursor = encode_cursor(anchor.received_at, anchor.id)
+            keyset_query = keyset_page(base, EmailMessage.received_at, EmailMessage.id, cursor, args.limit, descending=True)
+            keyset_time = time_query(db, keyset_query)
+            print(f"{depth:>10,} {offset_time * 1000:>10.2f} {keyset_time * 1000:>10.2f}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Recurrence benchmark: recurring series versus materialised occurrences.
+
+Creates --series recurring events (weekly, weekday, fortnightly and monthly
+rules, some endless) over --years, with a few cancelled and moved
+occurrences, and queries random week and month windows in the last --recent
+months of that range through the list endpoint (response cache disabled).
+The same calendar is measured twice: stored as one row per occurrence, and
+stored as series rows expanded per request, with the expansion cache cold
+and warm.
+
+    python -m benchmarks.recurrence --series 2000 --years 3 --requests 300
+"""
+import argparse
+import asyncio
+import atexit
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_db_dir = tempfile.mkdtemp(prefix="bench_")
+atexit.register(shutil.rmtree, _db_dir, ignore_errors=True)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+os.environ.setdefault("SLOW_QUERY_MS", "10000")
+
+from sqlalchemy import delete, func, insert, select
+import httpx
+
+from app.core.database import SessionLocal, create_tables, engine
+from app.core.recurrence import clear_expansion_cache, expand, expansion_cache_info, parse_rule
+from app.core.response_cache import response_cache
+from app.models.calendar_event import CalendarEvent
+from app.models.calendar_event_exception import CalendarEventException
+
+START = datetime(2024, 1, 1)
+RULES = [
+    "FREQ=WEEKLY;BYDAY=MO",
+    "FREQ=WEEKLY;BYDAY=TU,TH",
+    "FREQ=DAILY;BYDAY=MO,TU,WE,TH,FR",
+    "FREQ=WEEKLY;INTERVAL=2;BYDAY=WE",
+    "FREQ=MONTHLY;BYDAY=1FR",
+]
+
+def make_series(rng, count, years):
+    series = []
+    for i in range(count):
+        start = START + timedelta(days=rng.randrange(60), hours=rng.randint(8, 17))
+        rule = rng.choice(RULES)
+        if rng.random() < 0.7:
+            until = start + timedelta(days=rng.randint(180, 365 * years))
+            rule += f";UNTIL={until:%Y%m%dT%H%M%S}Z"
+        series.append({
+            "title": f"Series {i}", "start_time": start, "end_time": start + timedelta(minutes=rng.choice((15, 30, 60))),
+            "location": "Conference Room A", "rrule": rule,
+        })
+    return series
+
+def occurrences_of(row, years):
+    return list(parse_rule(row["rrule"], row["start_time"]).between(
+        START, START + timedelta(days=365 * years), inc=True,
+    ))
+
+def store_materialised(series, years):
+    rows = []
+    for row in series:
+        duration = row["end_time"] - row["start_time"]
+        for start in occurrences_of(row, years):
+            rows.append({**row, "rrule": None, "start_time": start, "end_time": start + duration})
+    with engine.begin() as conn:
+        conn.execute(delete(CalendarEvent))
+        for offset in range(0, len(rows), 10_000):
+            conn.execute(insert(CalendarEvent), rows[offset:offset + 10_000])
+    return len(rows)
+
+def store_series(rng, series, years):
+    with SessionLocal() as db:
+        db.execute(delete(CalendarEvent))
+        ids = db.scalars(insert(CalendarEvent).returning(CalendarEvent.id, sort_by_parameter_order=True), series).all()
+        exceptions = []
+        for event_id, row in zip(ids, series):
+            for start in rng.sample(occurrences_of(row, years)[:50], 2):
+                moved = rng.random() < 0.3
+                exceptions.append({
+                    "event_id": event_id, "original_start": start, "cancelled": not moved,
+                    "start_time": start + timedelta(hours=2) if moved else None,
+                    "end_time": start + timedelta(hours=3) if moved else None,
+                })
+        db.execute(insert(CalendarEventException), exceptions)
+        db.commit()
+    return len(exceptions)
+
+def windows(rng, count, days, years, recent):
+    first = START + timedelta(days=365 * years - 30 * recent)
+    result = []
+    for _ in range(count):
+        start = (first + timedelta(days=rng.randrange(30 * recent - days))).date()
+        result.append({"start_date": str(start), "end_date": str(start + timedelta(days=days)), "limit": 500})
+    return result
+
+async def timed(client, queries):
+    latencies, returned = [], 0
+    for params in queries:
+        started = time.perf_counter()
+        response = await client.get("/api/calendar/", params=params)
+        latencies.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+        returned += len(response.json())
+    return latencies, returned / len(queries)
+
+def summary(latencies):
+    ordered = sorted(latencies)
+    return f"{statistics.median(ordered):7.2f} ms p50, {ordered[int(len(ordered) * 0.95)]:7.2f} ms p95"
+
+def table_rows():
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(CalendarEvent)).scalar()
+
+async def run(args):
+    from main import app
+    rng = random.Random(0)
+    response_cache.max_entry_bytes = 0
+    series = make_series(rng, args.series, args.years)
+    queries = {days: windows(rng, args.requests, days, args.years, args.recent) for days in (7, 31)}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        materialised = store_materialised(series, args.years)
+        print(f"materialised: {materialised:,} rows")
+        for days, window in queries.items():
+            latencies, returned = await timed(client, window)
+            print(f"  {days:>2}-day windows: {summary(latencies)}  ({returned:.0f} events per page)")
+
+        exceptions = store_series(rng, series, args.years)
+        print(f"recurring: {table_rows():,} rows + {exceptions:,} exceptions")
+        for days, window in queries.items():
+            clear_expansion_cache()
+            cold, returned = await timed(client, window)
+            warm, _ = await timed(client, window)
+            print(f"  {days:>2}-day windows: cold {summary(cold)} | warm {summary(warm)}  ({returned:.0f} events per page)")
+        print(f"  expansion cache: {expansion_cache_info()}")
+
+        # Expansion alone, for one far-out month of every series
+        rows = [{**row, "id": i, "updated_at": START} for i, row in enumerate(series)]
+        window_start = START + timedelta(days=365 * args.years - 31)
+        clear_expansion_cache()
+        started = time.perf_counter()
+        found = expand(rows, [], window_start, window_start + timedelta(days=31))
+        print(f"  expand(): {len(found):,} occurrences of {len(rows):,} series in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--series", type=int, default=2000)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--recent", type=int, default=6, help="months at the end of the range that are queried")
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    create_tables()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
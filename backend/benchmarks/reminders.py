@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Reminder benchmark: scheduling accuracy and delivery throughput.
+
+Inserts --pending tasks due over the next month, which the triggers turn into
+as many pending reminders, then schedules --accuracy reminders spread over the
+next few seconds and reports how late each was delivered. Finally a burst of
+--burst reminders falls due at once for --subscriptions subscriptions (one of
+them expired) through the local sender with a simulated --send-delay, and the
+delivery rate is reported.
+
+    python -m benchmarks.reminders --pending 100000 --accuracy 500 --burst 5000
+"""
+import argparse
+import asyncio
+import atexit
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_db_dir = tempfile.mkdtemp(prefix="bench_")
+atexit.register(shutil.rmtree, _db_dir, ignore_errors=True)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+from sqlalchemy import func, insert, select
+
+from app.core import push
+from app.core.database import SessionLocal, create_tables, engine
+from app.core.reminders import TASK_REMINDER_LEAD
+from app.core.scheduler import job_scheduler
+from app.models.push_subscription import PushSubscription
+from app.models.scheduled_job import ScheduledJob
+from app.models.task import Task
+
+def add_tasks(due_dates, batch_size=10_000):
+    # Through a session, whose commit wakes the scheduler like an API write
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        for offset in range(0, len(due_dates), batch_size):
+            db.execute(insert(Task), [
+                {"title": f"Task {offset + i}", "due_date": due}
+                for i, due in enumerate(due_dates[offset:offset + batch_size])
+            ])
+        db.commit()
+    return time.perf_counter() - started
+
+def pending_jobs():
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(ScheduledJob)).scalar()
+
+async def until(predicate, timeout):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+
+def lateness_ms(deliveries):
+    """Delivery time minus the reminder's scheduled time, per delivery"""
+    return [
+        (delivery.delivered_at - (
+            datetime.fromisoformat(delivery.payload["due_at"]) - TASK_REMINDER_LEAD - datetime(1970, 1, 1)
+        ).total_seconds()) * 1000
+        for delivery in deliveries
+    ]
+
+def percentile(values, q):
+    return sorted(values)[min(len(values) - 1, int(len(values) * q))]
+
+async def run(args):
+    rng = random.Random(0)
+    now = datetime.utcnow()
+    elapsed = add_tasks([now + timedelta(days=2, minutes=rng.randint(0, 60 * 24 * 30)) for _ in range(args.pending)])
+    print(f"{args.pending:,} tasks inserted in {elapsed:.2f} s ({args.pending / elapsed:,.0f}/s), {pending_jobs():,} pending reminders")
+
+    with engine.begin() as conn:
+        conn.execute(insert(PushSubscription), [{"endpoint": "https://push.example/0", "keys": "{}"}])
+    sender = push._sender = push.LocalSender(delay=0, history=args.accuracy + args.burst * args.subscriptions)
+    job_scheduler.start()
+
+    start = datetime.utcnow() + TASK_REMINDER_LEAD + timedelta(seconds=1)
+    add_tasks([start + timedelta(seconds=rng.uniform(0, args.window)) for _ in range(args.accuracy)])
+    await until(lambda: sender.sent >= args.accuracy, args.window + 30)
+    late = lateness_ms(sender.deliveries)
+    print(
+        f"accuracy: {len(late):,} reminders over {args.window:.0f} s, late by "
+        f"{statistics.median(late):.1f} ms p50, {percentile(late, 0.99):.1f} ms p99, {max(late):.1f} ms max"
+    )
+
+    with engine.begin() as conn:
+        conn.execute(insert(PushSubscription), [
+            {"endpoint": f"https://push.example/{i}", "keys": "{}"} for i in range(1, args.subscriptions)
+        ])
+    sender.gone.add(f"https://push.example/{args.subscriptions - 1}")
+    sender.delay = args.send_delay
+    sent_before, completed_before = sender.sent, job_scheduler.completed
+    started = time.perf_counter()
+    add_tasks([datetime.utcnow() + timedelta(minutes=5)] * args.burst)
+    await until(lambda: job_scheduler.completed - completed_before >= args.burst, 600)
+    elapsed = time.perf_counter() - started
+    with engine.connect() as conn:
+        subscriptions = conn.execute(select(func.count()).select_from(PushSubscription)).scalar()
+    print(
+        f"burst: {args.burst:,} reminders x {args.subscriptions} subscriptions in {elapsed:.2f} s "
+        f"({args.burst / elapsed:,.0f} reminders/s, {(sender.sent - sent_before) / elapsed:,.0f} pushes/s "
+        f"at {args.send_delay * 1000:.0f} ms each) | {subscriptions} subscriptions left, {pending_jobs():,} pending"
+    )
+    await job_scheduler.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pending", type=int, default=100_000)
+    parser.add_argument("--accuracy", type=int, default=500)
+    parser.add_argument("--window", type=float, default=5.0)
+    parser.add_argument("--burst", type=int, default=5_000)
+    parser.add_argument("--subscriptions", type=int, default=4)
+    parser.add_argument("--send-delay", type=float, default=0.005)
+    args = parser.parse_args()
+
+    create_tables()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Response cache benchmark: repeated list queries with and without the cache.
+
+A client re-requests the same task, calendar and unread-email pages
+while a task is toggled every --write-every requests, once with the response
+cache disabled and once enabled, and reports latency per request and the
+cache's hit rate.
+
+    python -m benchmarks.response_cache --rows 5000 --requests 3000
+"""
+import argparse
+import asyncio
+import atexit
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_db_dir = tempfile.mkdtemp(prefix="bench_")
+atexit.register(shutil.rmtree, _db_dir, ignore_errors=True)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+from sqlalchemy import insert
+import httpx
+
+from app.core.database import create_tables, engine
+from app.core.response_cache import response_cache
+from app.models.calendar_event import CalendarEvent
+from app.models.email_message import EmailMessage
+from app.models.task import Task
+
+QUERIES = [
+    ("/api/tasks/", {"limit": 100}),
+    ("/api/tasks/", {"limit": 50, "cursor": ""}),
+    ("/api/calendar/", {"start_date": "2024-01-10", "end_date": "2024-02-10", "limit": 100}),
+    ("/api/email/", {"is_read": "false", "limit": 100}),
+    ("/api/email/summary", {"is_read": "false", "limit": 100}),
+]
+
+def generate(rows):
+    start = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(Task), [
+            {"title": f"Task {i}", "description": "Details " * 10, "due_date": start + timedelta(hours=i)}
+            for i in range(rows)
+        ])
+        conn.execute(insert(EmailMessage), [
+            {
+                "subject": f"Subject {i}", "sender": "sender@example.com", "recipient": "you@example.com",
+                "body": "Body text " * 50, "received_at": start + timedelta(minutes=i), "is_read": i % 3 == 0,
+            }
+            for i in range(rows)
+        ])
+        conn.execute(insert(CalendarEvent), [
+            {"title": f"Event {i}", "start_time": start + timedelta(hours=i), "end_time": start + timedelta(hours=i + 1)}
+            for i in range(rows)
+        ])
+
+async def workload(client, requests, write_every):
+    latencies = []
+    for n in range(requests):
+        if write_every and n % write_every == 0:
+            (await client.patch("/api/tasks/1/toggle")).raise_for_status()
+        path, params = QUERIES[n % len(QUERIES)]
+        started = time.perf_counter()
+        (await client.get(path, params=params)).raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+async def run(requests, write_every):
+    from main import app
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await workload(client, len(QUERIES), 0)  # warm up connections and adapters
+        max_bytes = response_cache.max_bytes
+        for label, enabled in (("no cache", False), ("cache", True)):
+            response_cache.clear()
+            response_cache.max_bytes = response_cache.max_entry_bytes = max_bytes if enabled else 0
+            response_cache.hits = response_cache.misses = response_cache.stale = 0
+            started = time.process_time()
+            latencies = await workload(client, requests, write_every)
+            cpu = (time.process_time() - started) / requests
+            stats = response_cache.stats()
+            hit_rate = f"hit rate {stats['hit_rate']:.1%}, {stats['bytes'] / 1024:.0f} KiB cached" if enabled else ""
+            print(
+                f"  {label:>8}: {statistics.median(latencies):6.2f} ms p50, "
+                f"{sorted(latencies)[int(len(latencies) * 0.99)]:6.2f} ms p99, {cpu * 1000:6.2f} ms CPU/request  {hit_rate}"
+            )
+        response_cache.max_bytes = max_bytes
+        response_cache.max_entry_bytes = max_bytes // 8
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--write-every", type=int, default=50, help="toggle a task every N requests (0 = never)")
+    args = parser.parse_args()
+
+    create_tables()
+    print(f"🌱 Generating {args.rows:,} rows per table...")
+    generate(args.rows)
+    asyncio.run(run(args.requests, args.write_every))
+
+if __name__ == "__main__":
+    main()
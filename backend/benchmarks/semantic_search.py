@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Semantic search benchmark: exact and IVF top-k over a memory-mapped vector store.
+
+Embeds --vectors synthetic documents (generated emails, each with a few words
+from a Zipf-distributed vocabulary of --vocabulary made-up words so that
+documents are not near-duplicates) into a store of its own, then measures
+single and batched query latency scanning every vector and probing the
+nearest IVF partitions, with recall@10 against the exact results (a hit
+counts if it scores at least the exact 10th best, so ties are not misses),
+and the cost of incremental updates. Then runs the app over --rows tasks and
+emails: indexing on startup, /api/search latency and the delay from a
+committed write to its row being searchable.
+
+    python -m benchmarks.semantic_search --vectors 1000000 --queries 200
+"""
+import argparse
+import asyncio
+import atexit
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+_db_dir = tempfile.mkdtemp(prefix="bench_")
+atexit.register(shutil.rmtree, _db_dir, ignore_errors=True)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+os.environ.setdefault("SLOW_QUERY_MS", "10000")
+
+import httpx
+import numpy as np
+
+from app.core import vector_index
+from app.core.database import create_tables
+from app.core.embeddings import get_embedder
+from app.core.response_cache import response_cache
+from app.core.semantic_search import semantic_index
+from app.core.vector_index import VectorStore
+from seed_data import generate_dataset, synthetic_emails
+
+K = 10
+
+def summary(latencies):
+    ordered = sorted(latencies)
+    return f"{statistics.median(ordered):8.2f} ms p50, {ordered[int(len(ordered) * 0.95)]:8.2f} ms p95"
+
+def documents(count, vocabulary, seed):
+    """Synthetic email texts, each with a few rare-ish words appended"""
+    rng = random.Random(seed)
+    words = [f"{rng.choice('bcdfgklmnprstvz')}{rng.choice('aeiou')}{rng.getrandbits(20):x}" for _ in range(vocabulary)]
+    weights = list(np.cumsum(1 / np.arange(1, vocabulary + 1)))
+    for row in synthetic_emails(rng, count, datetime(2025, 1, 6)):
+        extra = " ".join(rng.choices(words, cum_weights=weights, k=8))
+        yield f"{row['subject']}\n{row['sender']}\n{row['body']}\n{extra}"
+
+def build(store, embedder, args):
+    """Embed and store the corpus, keeping a few texts to derive queries from"""
+    kept, embed_time, store_time, batch = [], 0.0, 0.0, []
+    keep_every = max(1, args.vectors // (args.queries * 4))
+
+    def flush():
+        nonlocal embed_time, store_time
+        started = time.perf_counter()
+        vectors = embedder.embed(batch)
+        embedded = time.perf_counter()
+        first = len(store)
+        store.upsert(2, range(first, first + len(batch)), [0] * len(batch), vectors)
+        embed_time += embedded - started
+        store_time += time.perf_counter() - embedded
+        batch.clear()
+
+    for i, text in enumerate(documents(args.vectors, args.vocabulary, args.seed)):
+        if i % keep_every == 0:
+            kept.append(text)
+        batch.append(text)
+        if len(batch) == 1000:
+            flush()
+    if batch:
+        flush()
+    started = time.perf_counter()
+    store.flush()
+    flushed = time.perf_counter() - started
+    print(
+        f"  embedded {args.vectors:,} documents at {args.vectors / embed_time:,.0f}/s, "
+        f"stored at {args.vectors / store_time:,.0f}/s, flushed in {flushed:.1f} s"
+    )
+    return kept
+
+def make_queries(rng, kept, count):
+    """Short queries: a few words from a stored document"""
+    queries = []
+    for text in rng.sample(kept, count):
+        words = text.split()
+        start = rng.randrange(max(1, len(words) - 4))
+        queries.append(" ".join(words[start:start + rng.randint(2, 4)]))
+    return queries
+
+def timed_search(store, vectors, **options):
+    latencies, results = [], []
+    for vector in vectors:
+        started = time.perf_counter()
+        results.append(store.search(vector, K, **options)[0])
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies, results
+
+def recall(approximate, exact):
+    found = []
+    for hits, truth in zip(approximate, exact):
+        if truth:
+            threshold = truth[-1].score - 1e-6
+            found.append(sum(hit.score >= threshold for hit in hits) / len(truth))
+    return statistics.mean(found)
+
+def index_benchmark(args):
+    path = tempfile.mkdtemp(prefix="vectors_", dir=_db_dir)
+    embedder = get_embedder()
+    store = VectorStore(path, embedder.dim, embedder.name)
+    print(f"store: {args.vectors:,} x {embedder.dim} float32 ({args.vectors * embedder.dim * 4 / 2**20:,.0f} MiB) in {path}")
+    kept = build(store, embedder, args)
+
+    started = time.perf_counter()
+    store = VectorStore(path, embedder.dim, embedder.name)
+    print(f"  reopened in {(time.perf_counter() - started) * 1000:,.0f} ms")
+
+    rng = random.Random(args.seed)
+    queries = embedder.embed(make_queries(rng, kept, args.queries))
+    exact_latencies, exact = timed_search(store, queries, exact=True)
+    print(f"  exact, 1 query:          {summary(exact_latencies)}")
+    started = time.perf_counter()
+    for offset in range(0, len(queries), args.batch):
+        store.search(queries[offset:offset + args.batch], K, exact=True)
+    per_query = (time.perf_counter() - started) * 1000 / len(queries)
+    print(f"  exact, {args.batch} per batch:     {per_query:8.2f} ms per query")
+
+    started = time.perf_counter()
+    store.train()
+    print(f"  trained {store.partitions} IVF partitions in {time.perf_counter() - started:.1f} s")
+    for probes in args.probes:
+        latencies, approximate = timed_search(store, queries, probes=probes)
+        print(f"  IVF, {probes:>3} probes:         {summary(latencies)}, recall@{K} {recall(approximate, exact):.3f}")
+    started = time.perf_counter()
+    for offset in range(0, len(queries), args.batch):
+        store.search(queries[offset:offset + args.batch], K)
+    per_query = (time.perf_counter() - started) * 1000 / len(queries)
+    print(f"  IVF, {args.batch} per batch:       {per_query:8.2f} ms per query ({vector_index.IVF_PROBES} probes)")
+
+    # Incremental updates: re-embed and overwrite random rows in batches, as the indexer does
+    texts = make_queries(rng, kept, min(len(kept), 500))
+    latencies = []
+    for _ in range(20):
+        ids = rng.sample(range(args.vectors), len(texts))
+        started = time.perf_counter()
+        store.upsert(2, ids, [1] * len(ids), embedder.embed(texts))
+        latencies.append((time.perf_counter() - started) * 1000)
+    print(f"  update of {len(texts)} rows:      {summary(latencies)} ({len(texts) / statistics.median(latencies) * 1000:,.0f} rows/s)")
+    del store
+    shutil.rmtree(path, ignore_errors=True)
+
+async def app_benchmark(args):
+    from main import app
+    response_cache.max_entry_bytes = 0
+    rng = random.Random(args.seed)
+    async with app.router.lifespan_context(app):
+        started = time.perf_counter()
+        await semantic_index.settle()
+        elapsed = time.perf_counter() - started
+        print(f"  indexed {semantic_index.indexed:,} rows on startup in {elapsed:.1f} s ({semantic_index.indexed / elapsed:,.0f} rows/s)")
+        words = ["proposal", "quarterly report numbers", "vendor invoice", "security audit staging", "budget", "client timeline"]
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            for params in ({}, {"types": "task"}):
+                latencies = []
+                for i in range(args.queries):
+                    started = time.perf_counter()
+                    response = await client.get("/api/search/", params={"q": rng.choice(words), **params})
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    response.raise_for_status()
+                print(f"  GET /api/search {'(' + params['types'] + 's) ' if params else '':<9} {summary(latencies)}")
+
+            latencies = []
+            for i in range(50):
+                started = time.perf_counter()
+                response = await client.post("/api/tasks/", json={"title": f"Benchmark marker zq{i}x"})
+                response.raise_for_status()
+                await semantic_index.settle()
+                latencies.append((time.perf_counter() - started) * 1000)
+                hits = (await client.get("/api/search/", params={"q": f"benchmark marker zq{i}x"})).json()
+                assert hits and hits[0]["id"] == response.json()["id"], hits
+            print(f"  task created to searchable: {summary(latencies)}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--vectors", type=int, default=1_000_000)
+    parser.add_argument("--vocabulary", type=int, default=50_000, help="made-up words mixed into the documents")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=32, help="queries per batched search")
+    parser.add_argument("--probes", type=int, nargs="+", default=[8, 24, 64])
+    parser.add_argument("--rows", type=int, default=20_000, help="tasks and emails for the end-to-end run")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    index_benchmark(args)
+    print(f"app: {args.rows:,} tasks and {args.rows:,} emails")
+    create_tables()
+    generate_dataset({"tasks": args.rows, "emails": args.rows}, seed=args.seed, log=lambda message: None)
+    asyncio.run(app_benchmark(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Serialization microbenchmarks: rows/sec through each list endpoint's encoding.
+
+For pages of --page rows from tasks, calendar events and emails, compares the
+previous path (ORM entities validated through the response model by FastAPI)
+with the fast path (Core rows encoded straight to JSON, with orjson and with
+the standard library encoder), then measures whole requests to each endpoint
+with the response cache disabled.
+
+    python -m benchmarks.serialization --rows 5000 --page 100 --repeat 200
+"""
+import argparse
+import asyncio
+import atexit
+import os
+import shutil
+import tempfile
+import time
+from typing import List
+
+_db_dir = tempfile.mkdtemp(prefix="bench_")
+atexit.register(shutil.rmtree, _db_dir, ignore_errors=True)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import select
+import httpx
+
+from app.core import serialization
+from app.core.database import AsyncReadSessionLocal, create_tables
+from app.core.response_cache import response_cache
+from app.core.serialization import response_columns
+from app.models.calendar_event import CalendarEvent, CalendarEventResponse
+from app.models.email_message import EmailMessage, EmailMessageResponse
+from app.models.task import Task, TaskResponse
+from benchmarks.response_cache import generate
+
+ENDPOINTS = [
+    ("tasks", "/api/tasks/", Task, TaskResponse),
+    ("calendar", "/api/calendar/", CalendarEvent, CalendarEventResponse),
+    ("email", "/api/email/", EmailMessage, EmailMessageResponse),
+]
+
+def rate(rows, seconds):
+    return f"{rows / seconds:>11,.0f} rows/s"
+
+async def orm_path(model, schema, page, repeat):
+    """What FastAPI did with ORM results: validate each row, encode, render"""
+    adapter = TypeAdapter(List[schema])
+    started = time.perf_counter()
+    for _ in range(repeat):
+        async with AsyncReadSessionLocal() as db:
+            rows = (await db.scalars(select(model).limit(page))).all()
+        JSONResponse(jsonable_encoder(adapter.validate_python(rows, from_attributes=True)))
+    return time.perf_counter() - started
+
+async def core_path(model, schema, page, repeat):
+    columns = response_columns(model, schema)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        async with AsyncReadSessionLocal() as db:
+            rows = (await db.execute(select(*columns).limit(page))).all()
+        serialization.dumps([row._asdict() for row in rows])
+    return time.perf_counter() - started
+
+async def run(page, repeat):
+    from main import app
+    orjson = serialization.orjson
+    response_cache.max_entry_bytes = 0
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for name, path, model, schema in ENDPOINTS:
+            rows = page * repeat
+            orm = await orm_path(model, schema, page, repeat)
+            fast = await core_path(model, schema, page, repeat)
+            serialization.orjson = None
+            stdlib = await core_path(model, schema, page, repeat)
+            serialization.orjson = orjson
+            started = time.perf_counter()
+            for _ in range(repeat):
+                (await client.get(path, params={"limit": page})).raise_for_status()
+            request = time.perf_counter() - started
+            print(
+                f"{name:>9}: ORM + validation {rate(rows, orm)} | Core + orjson {rate(rows, fast)} "
+                f"({orm / fast:.1f}x) | Core + json {rate(rows, stdlib)} | via HTTP {rate(rows, request)}"
+            )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--page", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    create_tables()
+    print(f"🌱 Generating {args.rows:,} rows per table...")
+    generate(args.rows)
+    asyncio.run(run(args.page, args.repeat))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Storage profile benchmark: read, write and mixed throughput per SQLite profile.
+
+Each profile runs in a fresh subprocess on its own database file (the profile
+is picked at import time from STORAGE_PROFILE) and drives the API in-process
+with concurrent clients:
+
+- read: GET /api/tasks/ pages and task detail lookups
+- write: POST /api/tasks/ creates
+- mixed: readers and writers at the same time
+
+    python -m benchmarks.storage_profiles --clients 16 --seconds 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+PROFILES = ["dev", "desktop", "server"]
+
+async def drive(client, request, clients, seconds):
+    done, failed = 0, 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker(n):
+        nonlocal done, failed
+        rng = random.Random(n)
+        while time.perf_counter() < deadline:
+            response = await request(client, rng)
+            done += 1
+            failed += response.is_error
+
+    await asyncio.gather(*(worker(n) for n in range(clients)))
+    return done / seconds, failed
+
+async def read(client, rng):
+    if rng.random() < 0.5:
+        return await client.get("/api/tasks/", params={"limit": 50, "skip": rng.randint(0, 1000)})
+    return await client.get(f"/api/tasks/{rng.randint(1, 2000)}")
+
+async def write(client, rng):
+    return await client.post("/api/tasks/", json={"title": f"Task {rng.random()}", "description": "x" * 200})
+
+async def measure(clients, seconds):
+    import httpx
+    from sqlalchemy import insert
+    from app.core.database import create_tables, engine
+    from app.models.task import Task
+
+    create_tables()
+    with engine.begin() as conn:
+        conn.execute(insert(Task), [{"title": f"Task {i}", "description": "y" * 200} for i in range(2000)])
+
+    from main import app
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        results = {
+            "read": await drive(client, read, clients, seconds),
+            "write": await drive(client, write, clients, seconds),
+        }
+        half = max(1, clients // 2)
+        (mixed_reads, read_failed), (mixed_writes, write_failed) = await asyncio.gather(
+            drive(client, read, half, seconds), drive(client, write, half, seconds),
+        )
+        results["mixed"] = (mixed_reads + mixed_writes, read_failed + write_failed)
+    return results
+
+def run_profile(profile, clients, seconds):
+    db_dir = tempfile.mkdtemp(prefix="bench_")
+    try:
+        env = {**os.environ, "STORAGE_PROFILE": profile, "DATABASE_URL": f"sqlite:///{db_dir}/bench.db"}
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.storage_profiles", "--worker", "--clients", str(clients), "--seconds", str(seconds)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--profiles", nargs="+", default=PROFILES, choices=PROFILES)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(asyncio.run(measure(args.clients, args.seconds))))
+        return
+
+    print(f"{'profile':>8} {'read req/s':>12} {'write req/s':>12} {'mixed req/s':>12} {'failed':>7}")
+    for profile in args.profiles:
+        results = run_profile(profile, args.clients, args.seconds)
+        failed = sum(result[1] for result in results.values())
+        print(f"{profile:>8} {results['read'][0]:12,.0f} {results['write'][0]:12,.0f} {results['mixed'][0]:12,.0f} {failed:7}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Suggestion benchmark: evaluation cost per write vs rescanning the tables.
+
+Grows tasks, calendar events and recent emails (a share of them high-priority,
+overlapping or mentioning meetings) to each --rows size, reconciles everything
+once as on startup, then makes --writes single-row writes through the API and
+reports, per write, how many rows the engine evaluated and how long it took
+from commit until the suggestions were up to date. A full reconcile is what
+every write would cost if the engine rescanned instead.
+
+    python -m benchmarks.suggestions --rows 1000 10000 100000 --writes 200
+"""
+import argparse
+import asyncio
+import atexit
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_db_dir = tempfile.mkdtemp(prefix="bench_")
+atexit.register(shutil.rmtree, _db_dir, ignore_errors=True)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+from sqlalchemy import func, insert, select
+import httpx
+
+from app.core.database import create_tables, engine
+from app.core.suggestions import suggestion_engine
+from app.models.calendar_event import CalendarEvent
+from app.models.email_message import EmailMessage
+from app.models.suggestion import Suggestion
+from app.models.task import Task
+
+BODIES = (
+    "Quarterly numbers attached, let me know if anything looks off.",
+    "Can we meet tomorrow at 3pm to go over the draft?",
+    "Reminder: the team sync moved to Friday at 10:30.",
+    "Thanks, that works for me.",
+)
+
+def grow(target, now, batch_size=10_000):
+    rng = random.Random(target)
+    with engine.begin() as conn:
+        current = conn.execute(select(func.count()).select_from(Task)).scalar()
+        for offset in range(current, target, batch_size):
+            rows = range(offset, min(target, offset + batch_size))
+            conn.execute(insert(Task), [
+                {"title": f"Task {i}", "priority": rng.choice(("low", "medium", "high")),
+                 "completed": rng.random() < 0.5, "due_date": now + timedelta(hours=rng.randint(-2000, 2000))}
+                for i in rows
+            ])
+            conn.execute(insert(EmailMessage), [
+                {"subject": f"Email {i}", "sender": "colleague@example.com", "recipient": "me@example.com",
+                 "body": rng.choice(BODIES), "received_at": now - timedelta(minutes=rng.randint(0, 60 * 24 * 20))}
+                for i in rows
+            ])
+            # About eight events a day, most of them still ahead
+            span = max(1, target // 8) * 24 * 60
+            starts = [now + timedelta(minutes=rng.randint(-span // 10, span)) for _ in rows]
+            conn.execute(insert(CalendarEvent), [
+                {"title": f"Event {i}", "start_time": start, "end_time": start + timedelta(minutes=rng.choice((30, 60, 90)))}
+                for i, start in zip(rows, starts)
+            ])
+
+async def single_writes(client, count, size, now):
+    rng = random.Random(count)
+    latencies, evaluated = [], []
+    for n in range(count):
+        kind = n % 3
+        if kind == 0:
+            task_id = rng.randint(1, size)
+            due = now + timedelta(hours=rng.randint(-48, 48))
+            write = client.put(f"/api/tasks/{task_id}", json={"title": f"Task {task_id}", "priority": "high", "due_date": due.isoformat()})
+        elif kind == 1:
+            write = client.post("/api/email/", json={
+                "subject": "Follow-up", "sender": "colleague@example.com", "recipient": "me@example.com",
+                "body": rng.choice(BODIES), "received_at": now.isoformat(),
+            })
+        else:
+            event_id = rng.randint(1, size)
+            start = now + timedelta(minutes=rng.randint(0, 60 * 24 * 60))
+            write = client.put(f"/api/calendar/{event_id}", json={
+                "title": f"Event {event_id}", "start_time": start.isoformat(), "end_time": (start + timedelta(hours=1)).isoformat(),
+            })
+        before = suggestion_engine.evaluated
+        (await write).raise_for_status()
+        started = time.perf_counter()
+        await suggestion_engine.settle()
+        latencies.append((time.perf_counter() - started) * 1000)
+        evaluated.append(suggestion_engine.evaluated - before)
+    return latencies, evaluated
+
+async def run(sizes, writes):
+    from main import app
+    now = datetime.utcnow()
+    suggestion_engine.start()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for size in sizes:
+            grow(size, now)
+            await suggestion_engine.settle()
+            before = suggestion_engine.evaluated
+            started = time.perf_counter()
+            suggestion_engine.reconcile()
+            await suggestion_engine.settle()
+            rescan_ms = (time.perf_counter() - started) * 1000
+            rescanned = suggestion_engine.evaluated - before
+
+            latencies, evaluated = await single_writes(client, writes, size, now)
+            with engine.connect() as conn:
+                stored = conn.execute(select(func.count()).select_from(Suggestion)).scalar()
+            print(
+                f"{size:>8,} rows/table: per write {statistics.median(latencies):6.2f} ms p50, "
+                f"{max(latencies):6.2f} ms max, {statistics.mean(evaluated):4.1f} rows evaluated | "
+                f"full reconcile {rescan_ms:9.1f} ms, {rescanned:,} rows | {stored:,} suggestions"
+            )
+    await suggestion_engine.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--writes", type=int, default=200)
+    args = parser.parse_args()
+
+    create_tables()
+    asyncio.run(run(sorted(args.rows), args.writes))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Badge counters benchmark: client-side counting vs /api/summary.
+
+Compares fetching the email, task and calendar lists and counting on the
+client (what the dashboard did before) against the grouped COUNT queries
+behind /api/summary, both right after a write and when served from cache.
+
+    python -m benchmarks.summary --rows 20000
+"""
+import argparse
+import asyncio
+import atexit
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_db_dir = tempfile.mkdtemp(prefix="bench_")
+atexit.register(shutil.rmtree, _db_dir, ignore_errors=True)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+from sqlalchemy import insert
+import httpx
+
+from app.core.database import create_tables, engine
+from app.models.calendar_event import CalendarEvent
+from app.models.email_message import EmailMessage
+from app.models.task import Task
+
+def generate(rows, batch_size=5000):
+    rng = random.Random(3)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        for offset in range(0, rows, batch_size):
+            batch = range(offset, min(rows, offset + batch_size))
+            conn.execute(insert(EmailMessage), [
+                {
+                    "subject": f"Subject {i}", "sender": f"sender{i % 50}@example.com", "recipient": "you@example.com",
+                    "body": "Body text " * 20, "is_read": rng.random() < 0.7, "is_important": rng.random() < 0.1,
+                    "received_at": now - timedelta(minutes=i),
+                }
+                for i in batch
+            ])
+            conn.execute(insert(Task), [
+                {"title": f"Task {i}", "completed": rng.random() < 0.5, "due_date": now + timedelta(hours=rng.randint(-2000, 2000))}
+                for i in batch
+            ])
+            conn.execute(insert(CalendarEvent), [
+                {"title": f"Event {i}", "start_time": now + timedelta(hours=h), "end_time": now + timedelta(hours=h + 1)}
+                for i in batch
+                for h in [rng.randint(-5000, 5000)]
+            ])
+
+async def timed(repeat, request):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await request()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+async def run(rows, repeat):
+    from main import app
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def client_side():
+            now = datetime.utcnow()
+            emails = (await client.get("/api/email/", params={"limit": rows})).json()
+            tasks = (await client.get("/api/tasks/", params={"limit": rows})).json()
+            events = (await client.get("/api/calendar/", params={"limit": rows})).json()
+            today = now.date().isoformat()
+            return (
+                sum(not e["is_read"] for e in emails),
+                sum(not t["completed"] and t["due_date"] and t["due_date"] < now.isoformat() for t in tasks),
+                sum(e["start_time"].startswith(today) for e in events),
+            )
+
+        async def after_write():
+            await client.patch("/api/email/1/important")
+            started = time.perf_counter()
+            await client.get("/api/summary/")
+            return time.perf_counter() - started
+
+        listed = await timed(max(1, repeat // 10), client_side)
+        recomputed = statistics.median([await after_write() for _ in range(repeat)])
+        cached = await timed(repeat, lambda: client.get("/api/summary/"))
+    print(f"  fetch lists and count: {listed * 1000:9.2f} ms")
+    print(f"  summary after a write: {recomputed * 1000:9.2f} ms")
+    print(f"  summary from cache:    {cached * 1000:9.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    create_tables()
+    print(f"🌱 Generating {args.rows:,} emails, tasks and events...")
+    generate(args.rows)
+    asyncio.run(run(args.rows, args.repeat))
+
+if __name__ == "__main__":
+    main()
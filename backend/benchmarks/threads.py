@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Threading benchmark: conversation list from maintained counts versus GROUP BY.
+
+Generates --rows synthetic emails (nearly half of them replies) and pages
+through the conversation list with the counts kept by triggers, then with the
+portable query that aggregates every message per request. Also measures what
+threading costs on ingest: bulk inserts of --batch replies, and messages
+arriving before the parent they reply to, whose threads are merged when the
+parent comes in (response cache disabled).
+
+    python -m benchmarks.threads --rows 200000 --requests 200
+"""
+import argparse
+import asyncio
+import atexit
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_db_dir = tempfile.mkdtemp(prefix="bench_")
+atexit.register(shutil.rmtree, _db_dir, ignore_errors=True)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+os.environ.setdefault("SLOW_QUERY_MS", "10000")
+
+from sqlalchemy import func, select
+import httpx
+
+from app.core.database import create_tables, engine
+from app.core.response_cache import response_cache
+from app.models.email_message import EmailThread
+from seed_data import generate_dataset
+
+def summary(latencies):
+    ordered = sorted(latencies)
+    return f"{statistics.median(ordered):8.2f} ms p50, {ordered[int(len(ordered) * 0.95)]:8.2f} ms p95"
+
+async def timed(client, method, url, count, json=None):
+    latencies = []
+    for i in range(count):
+        started = time.perf_counter()
+        response = await client.request(method, url(i) if callable(url) else url, json=json(i) if json else None)
+        latencies.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+    return latencies
+
+def email(i, subject, message_id, in_reply_to=None):
+    return {
+        "subject": subject, "sender": "bench@example.com", "recipient": "you@company.com", "body": f"Message {i}",
+        "received_at": (datetime(2025, 2, 1) + timedelta(minutes=i)).isoformat(),
+        "message_id": message_id, "in_reply_to": in_reply_to, "references": in_reply_to,
+    }
+
+async def run(args):
+    from main import app
+    import app.api.routes.email as email_routes
+    response_cache.max_entry_bytes = 0
+    with engine.connect() as conn:
+        threads = conn.execute(select(func.count()).select_from(EmailThread).where(EmailThread.parent_id.is_(None))).scalar()
+    print(f"{args.rows:,} emails in {threads:,} conversations")
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        pages = {
+            "first page": "/api/email/threads?limit=50",
+            "unread": "/api/email/threads?limit=50&unread=true",
+            "page 20": "/api/email/threads?limit=50&skip=950",
+        }
+        for maintained in (True, False):
+            email_routes.IS_SQLITE = maintained
+            label = "maintained" if maintained else "GROUP BY"
+            for name, url in pages.items():
+                count = args.requests if maintained else max(5, args.requests // 20)
+                print(f"  {label:>10} {name:<10} {summary(await timed(client, 'GET', url, count))}")
+        email_routes.IS_SQLITE = True
+
+        # Ingest: replies to existing conversations, in bulk
+        batches = args.requests // 4
+        latencies = await timed(
+            client, "POST", "/api/email/bulk", batches,
+            json=lambda n: [email(n * args.batch + i, "Re: bench", f"<bulk{n}.{i}@bench>", f"<bulk{n}.{i - 1}@bench>") for i in range(args.batch)],
+        )
+        rate = args.batch / (statistics.median(latencies) / 1000)
+        print(f"  bulk insert of {args.batch} chained replies: {summary(latencies)} ({rate:,.0f} emails/s)")
+
+        # Late parents: each reply starts a thread, then its parent arrives and merges two of them
+        replies = await timed(
+            client, "POST", "/api/email/", args.requests,
+            json=lambda i: email(2 * i + 1, "Re: late", f"<late{2 * i + 1}@bench>", f"<late{2 * i}@bench>"),
+        )
+        parents = await timed(
+            client, "POST", "/api/email/", args.requests,
+            json=lambda i: email(2 * i, "late", f"<late{2 * i}@bench>", f"<late{2 * i - 1}@bench>" if i else None),
+        )
+        print(f"  single insert, new thread:    {summary(replies)}")
+        print(f"  single insert, merging two:   {summary(parents)}")
+        conversation = (await client.get("/api/email/threads?limit=1")).json()[0]
+        print(f"  late chain ended up as one conversation of {conversation['message_count']} messages")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=500, help="emails per bulk insert")
+    args = parser.parse_args()
+
+    create_tables()
+    generate_dataset({"emails": args.rows}, seed=args.seed)
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Flag toggle benchmark: commit-per-click vs write-behind batching.
+
+Fires concurrent task completion toggles, as when triaging a list quickly,
+and reports toggles/sec for the batched /api/tasks/{id}/toggle endpoint and
+for an inline copy of the previous handler (SELECT, commit, refresh).
+
+    python -m benchmarks.toggles --clients 20 --toggles 2000
+"""
+import argparse
+import asyncio
+import atexit
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime
+
+_db_dir = tempfile.mkdtemp(prefix="bench_")
+atexit.register(shutil.rmtree, _db_dir, ignore_errors=True)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+from fastapi import Depends
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+import httpx
+
+from app.core.database import AsyncSessionLocal, create_tables, engine, get_async_db
+from app.core.write_behind import flag_writer
+from app.models.task import Task, TaskResponse
+
+async def commit_per_toggle(task_id: int, db: AsyncSession = Depends(get_async_db)):
+    task = await db.get(Task, task_id)
+    task.completed = not task.completed
+    task.updated_at = datetime.utcnow()
+    await db.commit()
+    await db.refresh(task)
+    return task
+
+def generate(rows):
+    with engine.begin() as conn:
+        conn.execute(insert(Task), [{"title": f"Task {i}"} for i in range(rows)])
+
+async def hammer(client, path, ids, clients):
+    failed = 0
+
+    async def worker(worker_ids):
+        nonlocal failed
+        for task_id in worker_ids:
+            response = await client.patch(path.format(task_id))
+            failed += response.is_error
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(ids[n::clients]) for n in range(clients)))
+    await flag_writer.flush()
+    return len(ids) / (time.perf_counter() - started), failed
+
+async def completed_count():
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(func.count()).select_from(Task).where(Task.completed.is_(True)))
+
+async def run(rows, clients, toggles):
+    from main import app
+    app.add_api_route("/bench/toggle/{task_id}", commit_per_toggle, methods=["PATCH"], response_model=TaskResponse)
+    rng = random.Random(5)
+    ids = [rng.randint(1, rows) for _ in range(toggles)]
+    # Tasks toggled an odd number of times must end up completed, however the clicks interleave
+    expected = sum(ids.count(task_id) % 2 for task_id in set(ids))
+
+    # Concurrent read-then-write transactions can deadlock on SQLite's lock upgrade
+    # and fail with "database is locked"; count those instead of aborting
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        batched, batched_failed = await hammer(client, "/api/tasks/{}/toggle", ids, clients)
+        batched_completed = await completed_count()
+        direct, direct_failed = await hammer(client, "/bench/toggle/{}", ids, clients)
+
+    print(f"  commit per toggle: {direct:9,.0f} toggles/s  {direct_failed} failed")
+    print(f"  write-behind:      {batched:9,.0f} toggles/s  {batched_failed} failed  ({batched / direct:.1f}x)")
+    print(f"  completed tasks after write-behind run: {batched_completed} (expected {expected})")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--toggles", type=int, default=2000)
+    args = parser.parse_args()
+
+    create_tables()
+    generate(args.rows)
+    asyncio.run(run(args.rows, args.clients, args.toggles))
+
+if __name__ == "__main__":
+    main()
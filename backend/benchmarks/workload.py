@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Workload benchmark: throughput and latency per endpoint under a request mix.
+
+Generates a synthetic dataset with ``seed_data.generate_dataset`` (--rows per
+table, --seed), records --requests calls drawn from a weighted --mix of list,
+detail, toggle and create calls (the same seed always records the same
+calls), and replays them through the app in-process with --clients concurrent
+clients, after --warmup unmeasured calls. Reports throughput and latency
+percentiles per endpoint.
+
+A recording can be saved with --record and replayed with --replay, and
+--json writes the results; given a --baseline results file, changes against
+it are reported and the exit status is 1 when an endpoint's p95 got worse by
+more than --tolerance percent, so per-commit runs show regressions:
+
+    python -m benchmarks.workload --rows 100000 --mix mixed --json HEAD.json --baseline main.json
+"""
+import argparse
+import asyncio
+import atexit
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple
+
+_db_dir = tempfile.mkdtemp(prefix="bench_")
+atexit.register(shutil.rmtree, _db_dir, ignore_errors=True)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+import httpx
+
+from app.core.database import create_tables
+from seed_data import DEFAULT_ANCHOR, generate_dataset
+
+ANCHOR = datetime.combine(DEFAULT_ANCHOR, datetime.min.time())
+
+class Call(NamedTuple):
+    endpoint: str  # method and route template, the reporting key
+    method: str
+    url: str
+    body: dict = None
+
+class _Context(NamedTuple):
+    rng: random.Random
+    rows: int
+
+    def id(self) -> int:
+        return self.rng.randint(1, self.rows)
+
+    def day(self) -> datetime:
+        return ANCHOR + timedelta(days=self.rng.randint(-365, 90))
+
+def _calendar_week(ctx: _Context) -> str:
+    start = ctx.day().date()
+    return f"/api/calendar/?start_date={start}&end_date={start + timedelta(days=7)}&limit=100"
+
+def _new_task(ctx: _Context) -> dict:
+    return {"title": f"Benchmark task {ctx.rng.randrange(10**6)}", "priority": ctx.rng.choice(("low", "medium", "high"))}
+
+def _new_event(ctx: _Context) -> dict:
+    start = ctx.day().replace(hour=ctx.rng.randint(8, 17))
+    return {"title": "Benchmark event", "start_time": start.isoformat(), "end_time": (start + timedelta(minutes=30)).isoformat()}
+
+# endpoint -> (method, url(ctx), body(ctx) or None)
+CALLS: Dict[str, tuple] = {
+    "GET /api/tasks/": ("GET", lambda ctx: "/api/tasks/?limit=100", None),
+    "GET /api/tasks/{task_id}": ("GET", lambda ctx: f"/api/tasks/{ctx.id()}", None),
+    "PATCH /api/tasks/{task_id}/toggle": ("PATCH", lambda ctx: f"/api/tasks/{ctx.id()}/toggle", None),
+    "POST /api/tasks/": ("POST", lambda ctx: "/api/tasks/", _new_task),
+    "GET /api/calendar/": ("GET", _calendar_week, None),
+    "GET /api/calendar/{event_id}": ("GET", lambda ctx: f"/api/calendar/{ctx.id()}", None),
+    "POST /api/calendar/": ("POST", lambda ctx: "/api/calendar/", _new_event),
+    "GET /api/email/": ("GET", lambda ctx: "/api/email/?limit=50", None),
+    "GET /api/email/summary": ("GET", lambda ctx: "/api/email/summary?is_read=false&limit=100", None),
+    "GET /api/email/{email_id}": ("GET", lambda ctx: f"/api/email/{ctx.id()}", None),
+    "PATCH /api/email/{email_id}/read": ("PATCH", lambda ctx: f"/api/email/{ctx.id()}/read", None),
+    "GET /api/summary/": ("GET", lambda ctx: "/api/summary/", None),
+}
+
+# Relative weights of the calls in each mix
+MIXES: Dict[str, Dict[str, int]] = {
+    "browse": {
+        "GET /api/tasks/": 30, "GET /api/calendar/": 20, "GET /api/email/summary": 25,
+        "GET /api/tasks/{task_id}": 10, "GET /api/email/{email_id}": 10, "GET /api/summary/": 5,
+    },
+    "triage": {
+        "GET /api/email/summary": 20, "GET /api/email/{email_id}": 25, "PATCH /api/email/{email_id}/read": 25,
+        "PATCH /api/tasks/{task_id}/toggle": 15, "POST /api/tasks/": 10, "GET /api/tasks/": 5,
+    },
+    "mixed": {
+        "GET /api/tasks/": 15, "GET /api/tasks/{task_id}": 10, "PATCH /api/tasks/{task_id}/toggle": 10,
+        "POST /api/tasks/": 5, "GET /api/calendar/": 10, "GET /api/calendar/{event_id}": 5,
+        "POST /api/calendar/": 3, "GET /api/email/": 5, "GET /api/email/summary": 15,
+        "GET /api/email/{email_id}": 10, "PATCH /api/email/{email_id}/read": 7, "GET /api/summary/": 5,
+    },
+}
+
+def record(mix: str, count: int, rows: int, seed: int) -> List[Call]:
+    ctx = _Context(random.Random(f"{seed}:{mix}"), rows)
+    endpoints = list(MIXES[mix])
+    weights = list(MIXES[mix].values())
+    calls = []
+    for endpoint in ctx.rng.choices(endpoints, weights, k=count):
+        method, url, body = CALLS[endpoint]
+        calls.append(Call(endpoint, method, url(ctx), body(ctx) if body else None))
+    return calls
+
+def save(calls: List[Call], path: str):
+    with open(path, "w") as f:
+        for call in calls:
+            f.write(json.dumps(call._asdict()) + "\n")
+
+def load(path: str) -> List[Call]:
+    with open(path) as f:
+        return [Call(**json.loads(line)) for line in f if line.strip()]
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+async def replay(client: httpx.AsyncClient, calls: List[Call], clients: int) -> tuple:
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    pending = iter(calls)
+
+    async def worker():
+        for call in pending:
+            started = time.perf_counter()
+            response = await client.request(call.method, call.url, json=call.body)
+            latencies[call.endpoint].append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors[call.endpoint] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    return latencies, errors, time.perf_counter() - started
+
+def _row(values: List[float], errors: int, elapsed: float) -> Dict:
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "rps": round(len(values) / elapsed, 1),
+        "p50_ms": round(percentile(values, 0.5), 3),
+        "p95_ms": round(percentile(values, 0.95), 3),
+        "p99_ms": round(percentile(values, 0.99), 3),
+        "max_ms": round(max(values), 3),
+    }
+
+def results_of(latencies, errors, elapsed: float) -> Dict:
+    endpoints = {
+        endpoint: _row(values, errors.get(endpoint, 0), elapsed) for endpoint, values in sorted(latencies.items())
+    }
+    every = [value for values in latencies.values() for value in values]
+    return {"endpoints": endpoints, "total": _row(every, sum(errors.values()), elapsed), "seconds": round(elapsed, 3)}
+
+def _change(current: float, previous: float) -> float:
+    return (current - previous) / previous * 100 if previous else 0.0
+
+def report(results: Dict, baseline: Dict = None, tolerance: float = 20.0) -> List[str]:
+    """Print the results table, returning the endpoints whose p95 regressed past ``tolerance``"""
+    regressed = []
+    print(f"{'endpoint':<36} {'reqs':>6} {'err':>4} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for endpoint, row in [*results["endpoints"].items(), ("total", results["total"])]:
+        line = (
+            f"{endpoint:<36} {row['requests']:>6} {row['errors']:>4} {row['rps']:>8.1f} "
+            f"{row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['max_ms']:>8.2f}"
+        )
+        previous = baseline and (baseline["total"] if endpoint == "total" else baseline["endpoints"].get(endpoint))
+        if previous:
+            p95 = _change(row["p95_ms"], previous["p95_ms"])
+            line += f"   p95 {p95:+.0f}%, req/s {_change(row['rps'], previous['rps']):+.0f}%"
+            if p95 > tolerance:
+                line += "  REGRESSION"
+                regressed.append(endpoint)
+        print(line)
+    return regressed
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+async def run(args, calls: List[Call]) -> Dict:
+    from main import app
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            await replay(client, calls[:args.warmup], args.clients)
+            return results_of(*await replay(client, calls[args.warmup:], args.clients))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=20_000, help="rows per table")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--warmup", type=int, default=500)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--record", metavar="PATH", help="save the recorded calls as JSON lines")
+    parser.add_argument("--replay", metavar="PATH", help="replay calls saved with --record")
+    parser.add_argument("--json", metavar="PATH", help="write the results as JSON")
+    parser.add_argument("--baseline", metavar="PATH", help="results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=20.0, help="allowed p95 increase over the baseline, in percent")
+    args = parser.parse_args()
+
+    create_tables()
+    generate_dataset({"tasks": args.rows, "events": args.rows, "emails": args.rows}, seed=args.seed, anchor=ANCHOR)
+    if args.replay:
+        calls = load(args.replay)
+    else:
+        calls = record(args.mix, args.warmup + args.requests, args.rows, args.seed)
+    if args.record:
+        save(calls, args.record)
+
+    print(f"🌱 Replaying {len(calls) - args.warmup:,} calls ({args.mix} mix, {args.clients} clients, {args.warmup} warm-up)")
+    results = asyncio.run(run(args, calls))
+    results.update(commit=_commit(), mix=args.mix, rows=args.rows, seed=args.seed, clients=args.clients)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"Compared with {baseline.get('commit', 'baseline')} ({args.tolerance:g}% p95 tolerance)")
+    regressed = report(results, baseline, args.tolerance)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if regressed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
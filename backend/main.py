@@ -1,7 +1,14 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.database import create_tables
-from app.api.routes import tasks, calendar, email
+from app.core.auth import current_user
+from app.core.database import create_tables, dispose_engines
+from app.core.instrumentation import InstrumentationMiddleware, render_metrics
+from app.core.scheduler import job_scheduler
+from app.core.semantic_search import semantic_index
+from app.core.suggestions import suggestion_engine
+from app.core.write_behind import flag_writer
+from app.api.routes import auth, tasks, calendar, email, chat, summary, events, suggestions, notifications, metrics, search
 
 # Create FastAPI app
 app = FastAPI(title="AI Assistant Backend", version="1.0.0")
@@ -13,17 +20,43 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
-# Create database tables on startup
+# Request timing, SQL profiling and the X-Profile header; outermost so it times everything
+app.add_middleware(InstrumentationMiddleware)
+
+# Apply pending schema migrations on startup (a no-op once the schema is current)
 @app.on_event("startup")
 async def startup_event():
     create_tables()
+    suggestion_engine.start()
+    semantic_index.start()
+    job_scheduler.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await suggestion_engine.stop()
+    await semantic_index.stop()
+    await job_scheduler.stop()
+    await flag_writer.flush()
+    await dispose_engines()
 
-# Include routers
-app.include_router(tasks.router, prefix="/api")
-app.include_router(calendar.router, prefix="/api")
-app.include_router(email.router, prefix="/api")
+# Include routers. Resolving the user first rejects unauthenticated requests when
+# AUTH_REQUIRED is set, and keys the ETags and cached responses by user.
+authenticated = [Depends(current_user)]
+app.include_router(auth.router, prefix="/api")
+app.include_router(tasks.router, prefix="/api", dependencies=authenticated)
+app.include_router(calendar.router, prefix="/api", dependencies=authenticated)
+app.include_router(email.router, prefix="/api", dependencies=authenticated)
+app.include_router(chat.router, prefix="/api", dependencies=authenticated)
+app.include_router(summary.router, prefix="/api", dependencies=authenticated)
+# The bearer scheme needs an HTTP request, so the change feed resolves its user per route
+app.include_router(events.router, prefix="/api")
+app.include_router(suggestions.router, prefix="/api", dependencies=authenticated)
+app.include_router(notifications.router, prefix="/api", dependencies=authenticated)
+app.include_router(metrics.router, prefix="/api", dependencies=authenticated)
+app.include_router(search.router, prefix="/api", dependencies=authenticated)
 
 @app.get("/")
 async def root():
@@ -33,6 +66,10 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
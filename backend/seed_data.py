@@ -1,14 +1,33 @@
 #!/usr/bin/env python3
 """
 Seed script to populate the database with sample data
+
+Without arguments a handful of hand-written tasks, events and emails are
+added. With --tasks/--events/--emails (or --rows for all three) a synthetic
+dataset of that size is generated instead: rows are drawn from a
+``random.Random`` seeded with --seed around a fixed --anchor date, so the same
+arguments always produce the same rows, and are written with bulk Core
+inserts in transactions of --batch-size rows.
+
+    python seed_data.py --rows 1000000 --seed 42
 """
+import argparse
 import asyncio
-from datetime import datetime, timedelta
+import json
+import random
+import time
+from collections import deque
+from itertools import accumulate
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional
+from sqlalchemy import delete, insert
 from sqlalchemy.orm import Session
 from app.core.database import engine, SessionLocal, create_tables
+from app.core.email_threads import assign_threads
+from app.core.semantic_search import semantic_index
 from app.models.task import Task
 from app.models.calendar_event import CalendarEvent
-from app.models.email_message import EmailMessage
+from app.models.email_message import EmailMessage, EmailThread, EmailThreadRef
 
 def seed_database():
     # Create tables
@@ -22,6 +41,8 @@ def seed_database():
         db.query(Task).delete()
         db.query(CalendarEvent).delete()
         db.query(EmailMessage).delete()
+        db.query(EmailThread).delete()
+        db.query(EmailThreadRef).delete()
         
         # Seed tasks
         tasks = [
@@ -163,6 +184,8 @@ def seed_database():
         
         # Commit all changes
         db.commit()
+        # Ids are reused after the wipe, so indexed vectors could belong to other rows now
+        semantic_index.store.clear()
         print("✅ Database seeded successfully!")
         print(f"   - Added {len(tasks)} tasks")
         print(f"   - Added {len(events)} calendar events") 
@@ -174,5 +197,241 @@ def seed_database():
     finally:
         db.close()
 
+# Synthetic datasets
+
+DEFAULT_ANCHOR = date(2025, 1, 6)
+DEFAULT_BATCH_SIZE = 10_000
+
+_FIRST_NAMES = [
+    "alex", "sam", "jordan", "taylor", "morgan", "casey", "riley", "jamie", "avery", "quinn",
+    "maria", "david", "li", "priya", "omar", "sofia", "lucas", "emma", "noah", "yuki",
+]
+_LAST_NAMES = ["smith", "garcia", "chen", "patel", "kim", "novak", "silva", "müller", "okafor", "rossi"]
+_DOMAINS = ["company.com", "example.com", "client.io", "vendor.net", "partners.org"]
+_TOPICS = [
+    "project proposal", "quarterly report", "API documentation", "budget forecast", "onboarding checklist",
+    "release notes", "client contract", "team offsite", "database backup", "expense report",
+    "design mockups", "security audit", "hiring plan", "sprint backlog", "vendor invoice",
+    "performance reviews", "marketing brief", "test coverage", "login flow", "support tickets",
+]
+_TASK_VERBS = [
+    "Review", "Update", "Prepare", "Draft", "Fix", "Schedule", "Follow up on", "Send",
+    "Plan", "Clean up", "Test", "Deploy", "Document", "Organize", "Renew",
+]
+_SENTENCES = [
+    "Let me know if you have any questions.",
+    "I've attached the latest version for reference.",
+    "We need to finalise this before the end of the week.",
+    "The numbers from last quarter look better than expected.",
+    "Could you take a look when you have a moment?",
+    "A few items are still blocked on the vendor.",
+    "Please add your comments directly in the document.",
+    "This came up again in yesterday's meeting.",
+    "The deadline moved up by two days.",
+    "I'll share a summary with the wider team afterwards.",
+    "Most of the open issues are minor.",
+    "Happy to jump on a call to go through it.",
+    "We agreed to revisit the scope next sprint.",
+    "The client asked for an updated timeline.",
+    "Testing on staging went smoothly.",
+    "There is still some budget left for this.",
+]
+_SUBJECTS = [
+    "{topic} update", "Re: {topic}", "Question about the {topic}", "Reminder: {topic} due {weekday}",
+    "Fwd: {topic}", "Draft {topic} for review", "Invitation: {topic} sync @ {weekday}", "Action needed: {topic}",
+]
+_EVENT_TITLES = [
+    "Team Standup", "1:1 with {name}", "{topic} review", "Sprint planning", "Lunch with {name}",
+    "Client call: {domain}", "All hands", "Focus time", "{topic} workshop", "Interview",
+]
+_LOCATIONS = [
+    "Conference Room A", "Conference Room B", "Main Conference Room", "Boardroom",
+    "Development Lab", "Manager's Office", "Video call", "Cafeteria",
+]
+_WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+_DURATIONS = ([15, 30, 45, 60, 90, 120], [10, 35, 10, 30, 10, 5])  # minutes, weights
+
+# Most mail comes from a few people: contact i is weighted 1 / (i + 1)
+_CONTACTS = [f"{first}.{last}@{domain}" for domain in _DOMAINS for last in _LAST_NAMES for first in _FIRST_NAMES]
+random.Random(0).shuffle(_CONTACTS)
+_CONTACT_WEIGHTS = list(accumulate(1 / (i + 1) for i in range(len(_CONTACTS))))  # cumulative
+
+def _spread(rng: random.Random, i: int, count: int, start: datetime, span: timedelta) -> datetime:
+    """The i-th of ``count`` instants spread over ``span`` from ``start``, in increasing order"""
+    return start + span * ((i + rng.random()) / count)
+
+def _paragraph(rng: random.Random, low: int, high: int) -> str:
+    return " ".join(rng.sample(_SENTENCES, rng.randint(low, high)))
+
+def synthetic_tasks(rng: random.Random, count: int, anchor: datetime) -> Iterator[Dict]:
+    """Tasks created over the year before ``anchor``; most of the overdue ones are done"""
+    for i in range(count):
+        created = _spread(rng, i, count, anchor - timedelta(days=365), timedelta(days=365))
+        due = None
+        if rng.random() < 0.85:
+            due = (created + timedelta(days=rng.randint(1, 60))).replace(
+                hour=rng.choice((9, 12, 17)), minute=0, second=0, microsecond=0,
+            )
+        completed = rng.random() < (0.8 if (due or created + timedelta(days=14)) < anchor else 0.15)
+        updated = created + (anchor - created) * rng.random() if completed else created
+        yield {
+            "title": f"{rng.choice(_TASK_VERBS)} {rng.choice(_TOPICS)}",
+            "description": _paragraph(rng, 1, 3) if rng.random() < 0.7 else None,
+            "completed": completed,
+            "priority": rng.choices(("low", "medium", "high"), (3, 5, 2))[0],
+            "due_date": due,
+            "created_at": created,
+            "updated_at": updated,
+        }
+
+def synthetic_events(rng: random.Random, count: int, anchor: datetime) -> Iterator[Dict]:
+    """Weekday events in working hours from a year before ``anchor`` to three months after"""
+    start_day = anchor - timedelta(days=365)
+    days = 365 + 90
+    for i in range(count):
+        day = start_day + timedelta(days=days * i // count)
+        if day.weekday() >= 5:
+            day -= timedelta(days=day.weekday() - 4)  # to the Friday before
+        start = day.replace(hour=rng.randint(8, 17), minute=rng.choice((0, 15, 30, 45)))
+        end = start + timedelta(minutes=rng.choices(*_DURATIONS)[0])
+        title = rng.choice(_EVENT_TITLES).format(
+            name=rng.choice(_FIRST_NAMES).title(), topic=rng.choice(_TOPICS).capitalize(), domain=rng.choice(_DOMAINS),
+        )
+        attendees = None
+        if rng.random() < 0.4:
+            attendees = json.dumps(rng.choices(_CONTACTS, cum_weights=_CONTACT_WEIGHTS, k=rng.randint(1, 6)))
+        created = min(start, anchor) - timedelta(days=rng.randint(0, 30))
+        yield {
+            "title": title,
+            "description": _paragraph(rng, 1, 2) if rng.random() < 0.5 else None,
+            "start_time": start,
+            "end_time": end,
+            "location": rng.choice(_LOCATIONS) if rng.random() < 0.6 else None,
+            "attendees": attendees,
+            "created_at": created,
+            "updated_at": created,
+        }
+
+_REPLY_RATE = 0.45
+_REPLY_WINDOW = 500  # replies answer one of this many most recent messages
+_MAX_REFERENCES = 10
+
+def synthetic_emails(rng: random.Random, count: int, anchor: datetime) -> Iterator[Dict]:
+    """A year of mail up to ``anchor`` in arrival order; the last week's is mostly unread.
+
+    Nearly half the messages reply to a recent one, with In-Reply-To and
+    References headers, so the mail forms conversations of varying length.
+    """
+    recent = deque(maxlen=_REPLY_WINDOW)  # (message_id, subject, references)
+    for i in range(count):
+        received = _spread(rng, i, count, anchor - timedelta(days=365), timedelta(days=365))
+        sender = rng.choices(_CONTACTS, cum_weights=_CONTACT_WEIGHTS)[0]
+        subject = rng.choice(_SUBJECTS).format(topic=rng.choice(_TOPICS), weekday=rng.choice(_WEEKDAYS))
+        subject = subject[0].upper() + subject[1:]
+        message_id = f"<{rng.getrandbits(64):016x}@{sender.split('@')[1]}>"
+        in_reply_to = references = None
+        if recent and rng.random() < _REPLY_RATE:
+            in_reply_to, parent_subject, parent_references = rng.choice(recent)
+            subject = parent_subject if parent_subject.startswith("Re: ") else f"Re: {parent_subject}"
+            references = (parent_references + [in_reply_to])[-_MAX_REFERENCES:]
+        recent.append((message_id, subject, references or []))
+        body = "\n\n".join((
+            "Hi,",
+            _paragraph(rng, 2, 6),
+            _paragraph(rng, 1, 4),
+            f"Best regards,\n{sender.split('.')[0].title()}",
+        ))
+        yield {
+            "subject": subject,
+            "sender": sender,
+            "recipient": "you@company.com",
+            "body": body,
+            "is_read": rng.random() < (0.97 if anchor - received > timedelta(days=7) else 0.4),
+            "is_important": rng.random() < 0.08,
+            "received_at": received,
+            "created_at": received,
+            "message_id": message_id,
+            "in_reply_to": in_reply_to,
+            "references": " ".join(references) if references else None,
+        }
+
+# name -> (model, row generator, tables cleared with it, batch preparation run before each insert)
+GENERATORS: Dict[str, tuple] = {
+    "tasks": (Task, synthetic_tasks, (), None),
+    "events": (CalendarEvent, synthetic_events, (), None),
+    "emails": (EmailMessage, synthetic_emails, (EmailThread, EmailThreadRef), assign_threads),
+}
+
+def _batches(rows: Iterator[Dict], size: int) -> Iterator[List[Dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def generate_dataset(
+    counts: Dict[str, int],
+    seed: int = 0,
+    anchor: Optional[datetime] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    append: bool = False,
+    log: Callable[[str], None] = print,
+) -> Dict[str, float]:
+    """Insert ``counts[name]`` synthetic rows per table named in ``GENERATORS``, returning rows/s per table
+
+    Each table draws from its own generator seeded with ``seed`` and the table
+    name, so a table's rows do not depend on the other tables' sizes.
+    """
+    anchor = anchor or datetime.combine(DEFAULT_ANCHOR, datetime.min.time())
+    if not append:
+        with engine.begin() as conn:
+            for name in counts:
+                model, _, dependents, _ = GENERATORS[name]
+                for table in (model, *dependents):
+                    conn.execute(delete(table))
+        semantic_index.store.clear()
+
+    rates = {}
+    for name, count in counts.items():
+        model, rows, _, prepare = GENERATORS[name]
+        rng = random.Random(f"{seed}:{name}")
+        log(f"🌱 Generating {count:,} {name} (seed {seed}, anchor {anchor:%Y-%m-%d})")
+        started = time.perf_counter()
+        for batch in _batches(rows(rng, count, anchor), batch_size):
+            with engine.begin() as conn:
+                if prepare is not None:
+                    prepare(conn, batch)
+                conn.execute(insert(model), batch)
+        elapsed = time.perf_counter() - started
+        rates[name] = count / elapsed
+        log(f"   - Added {count:,} {name} in {elapsed:.1f} s ({rates[name]:,.0f} rows/s)")
+    return rates
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, help="rows per table, unless set per table below")
+    parser.add_argument("--tasks", type=int)
+    parser.add_argument("--events", type=int)
+    parser.add_argument("--emails", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--anchor", type=date.fromisoformat, default=DEFAULT_ANCHOR, help="the dataset's today (YYYY-MM-DD)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--append", action="store_true", help="keep the existing rows")
+    args = parser.parse_args()
+
+    counts = {name: getattr(args, name) if getattr(args, name) is not None else args.rows for name in GENERATORS}
+    if all(count is None for count in counts.values()):
+        seed_database()
+        return
+    create_tables()
+    generate_dataset(
+        {name: count for name, count in counts.items() if count},
+        seed=args.seed, anchor=datetime.combine(args.anchor, datetime.min.time()),
+        batch_size=args.batch_size, append=args.append,
+    )
+
 if __name__ == "__main__":
-    seed_database()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,41 @@
+"""
+The tests run the app in-process against a temporary SQLite database.
+
+Settings are read when the app modules are imported, so they are set here
+first. One app and database serve the whole session; tests create their own
+rows (and users, through ``login``) instead of relying on a clean slate.
+"""
+import atexit
+import itertools
+import os
+import shutil
+import tempfile
+
+_db_dir = tempfile.mkdtemp(prefix="tests_")
+atexit.register(shutil.rmtree, _db_dir, ignore_errors=True)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/test.db")
+os.environ.setdefault("SEARCH_INDEX_DIR", f"{_db_dir}/vectors")
+os.environ.setdefault("AUTH_SECRET_KEY", "tests")
+os.environ.setdefault("AUTH_BCRYPT_ROUNDS", "4")
+
+import pytest
+from fastapi.testclient import TestClient
+
+_users = itertools.count(1)
+
+@pytest.fixture(scope="session")
+def client():
+    from main import app
+    with TestClient(app) as client:
+        yield client
+
+@pytest.fixture
+def login(client):
+    """Register a new user and return the headers authenticating as them"""
+    def login():
+        email, password = f"user{next(_users)}@tests.example", "password"
+        response = client.post("/api/auth/register", json={"email": email, "full_name": "Test User", "password": password})
+        assert response.status_code == 201, response.text
+        token = client.post("/api/auth/login", json={"email": email, "password": password}).json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+    return login
@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app.core.auth import owned_by
+from app.core.database import engine
+from app.models.calendar_event import CalendarEvent, overlapping
+
+def test_overlap_window_is_scoped_to_the_owner(client, login):
+    alice, bob = login(), login()
+    event = {"start_time": "2031-03-03T10:00:00", "end_time": "2031-03-03T11:00:00"}
+    client.post("/api/calendar/", json={**event, "title": "Alice's"}, headers=alice)
+    client.post("/api/calendar/", json={**event, "title": "Bob's"}, headers=bob)
+    window = {"mode": "overlap", "start_date": "2031-03-03", "end_date": "2031-03-04"}
+
+    assert [e["title"] for e in client.get("/api/calendar/", params=window, headers=alice).json()] == ["Alice's"]
+    busy = client.get("/api/calendar/freebusy", params={"start": "2031-03-03T00:00:00", "end": "2031-03-04T00:00:00"}, headers=bob)
+    assert len(busy.json()["busy"]) == 1
+
+def test_overlap_window_is_planned_through_the_rtree(client):
+    query = overlapping(select(CalendarEvent.id), datetime(2031, 3, 3), datetime(2031, 3, 4))
+    query = query.where(owned_by(CalendarEvent, None, indexed=False))
+    sql = str(query.compile(engine, compile_kwargs={"literal_binds": True}))
+
+    with engine.connect() as conn:
+        plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").all()
+
+    assert "VIRTUAL TABLE" in plan[0][-1]
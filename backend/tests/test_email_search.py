@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+
+def email(subject, body, received_at):
+    return {"subject": subject, "sender": "a@x.example", "recipient": "b@x.example", "body": body, "received_at": received_at.isoformat()}
+
+def search_all(client, headers, q, limit):
+    pages, cursor = [], ""
+    while cursor is not None:
+        response = client.get("/api/email/search", params={"q": q, "limit": limit, "cursor": cursor}, headers=headers)
+        assert response.status_code == 200, response.text
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+    return pages
+
+def test_search_ranks_every_match_not_only_the_newest(client, login):
+    alice = login()
+    start = datetime(2020, 1, 1)
+    best = client.post("/api/email/", json=email("Walrus walrus walrus", "walrus", start), headers=alice).json()["id"]
+    newer = [email("Weekly notes", f"note {i} mentions a walrus", start + timedelta(minutes=i + 1)) for i in range(5001)]
+    for offset in range(0, len(newer), 2500):
+        assert client.post("/api/email/bulk", json=newer[offset:offset + 2500], headers=alice).status_code == 200
+
+    hits = client.get("/api/email/search", params={"q": "walrus", "limit": 1}, headers=alice).json()
+    assert [hit["id"] for hit in hits] == [best]
+
+def test_search_pages_through_tied_ranks(client, login):
+    alice, bob = login(), login()
+    start = datetime(2021, 1, 1)
+    ids = [
+        client.post("/api/email/", json=email("Quokka", "quokka sighting", start + timedelta(days=i)), headers=alice).json()["id"]
+        for i in range(7)
+    ]
+    client.post("/api/email/", json=email("Quokka", "quokka sighting", start), headers=bob)
+
+    pages = search_all(client, alice, "quokka", limit=3)
+    hits = [hit for page in pages for hit in page]
+    assert [len(page) for page in pages] == [3, 3, 1]
+    # Identical messages tie on rank and continue in id order across pages
+    assert [hit["id"] for hit in hits] == ids
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+def next_change(socket):
+    while True:
+        message = json.loads(socket.receive_text())
+        if message["op"] != "ping":
+            return message
+
+def test_websocket_streams_changes(client):
+    with client.websocket_connect("/api/events/ws?entity=tasks") as socket:
+        task = client.post("/api/tasks/", json={"title": "Streamed"}).json()
+
+        change = next_change(socket)
+        assert (change["entity"], change["id"], change["op"]) == ("tasks", task["id"], "create")
+
+def test_websocket_accepts_a_token_in_the_query(client, login):
+    token = login()["Authorization"].split()[1]
+    with client.websocket_connect(f"/api/events/ws?entity=tasks&access_token={token}") as socket:
+        task = client.post("/api/tasks/", json={"title": "Mine"}, headers={"Authorization": f"Bearer {token}"}).json()
+
+        assert next_change(socket)["id"] == task["id"]
+
+def test_websocket_rejects_an_invalid_token(client):
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect("/api/events/ws?access_token=bogus"):
+            pass
+    assert closed.value.code == 1008
+
+def test_changes_reach_only_the_owners_sockets(client, login):
+    alice, bob = login(), login()
+    token = alice["Authorization"].split()[1]
+    with client.websocket_connect(f"/api/events/ws?entity=tasks&access_token={token}") as mine, \
+            client.websocket_connect("/api/events/ws?entity=tasks") as local:
+        client.post("/api/tasks/", json={"title": "Bob's"}, headers=bob)
+        task = client.post("/api/tasks/", json={"title": "Alice's"}, headers=alice).json()
+        client.patch(f"/api/tasks/{task['id']}/toggle", headers=alice)
+        marker = client.post("/api/tasks/", json={"title": "Local"}).json()
+
+        assert [(c["id"], c["op"]) for c in (next_change(mine), next_change(mine))] == [(task["id"], "create"), (task["id"], "update")]
+        seen = next_change(local)
+        assert seen["id"] == marker["id"], f"the local profile was told about {seen} before its own task"
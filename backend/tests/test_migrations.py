@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+
+from app.core.migrations import MIGRATIONS, run_migrations
+
+# The tables migrations 9-14 alter, as version 8 (before reminders and owners) left them
+VERSION_8 = (
+    "CREATE TABLE tasks (id INTEGER NOT NULL, title VARCHAR(255) NOT NULL, description TEXT, completed BOOLEAN, "
+    "priority VARCHAR(50), due_date DATETIME, created_at DATETIME, updated_at DATETIME, PRIMARY KEY (id))",
+    "CREATE INDEX ix_tasks_due_date_id ON tasks (due_date, id)",
+    "CREATE TABLE calendar_events (id INTEGER NOT NULL, title VARCHAR(255) NOT NULL, description TEXT, "
+    "start_time DATETIME NOT NULL, end_time DATETIME NOT NULL, location VARCHAR(255), attendees TEXT, "
+    "created_at DATETIME, updated_at DATETIME, PRIMARY KEY (id))",
+    "CREATE INDEX ix_calendar_events_start_id ON calendar_events (start_time, id)",
+    "CREATE TABLE email_messages (id INTEGER NOT NULL, subject VARCHAR(255) NOT NULL, sender VARCHAR(255) NOT NULL, "
+    "recipient VARCHAR(255) NOT NULL, body TEXT NOT NULL, preview VARCHAR(160), is_read BOOLEAN, is_important BOOLEAN, "
+    "received_at DATETIME NOT NULL, created_at DATETIME, PRIMARY KEY (id))",
+    "CREATE TABLE suggestions (id INTEGER NOT NULL, title VARCHAR(255) NOT NULL, description TEXT, "
+    "action_type VARCHAR(100) NOT NULL, action_data TEXT, is_dismissed BOOLEAN, source_type VARCHAR(50), "
+    "source_id INTEGER, rule VARCHAR(50), created_at DATETIME, PRIMARY KEY (id))",
+    "CREATE INDEX ix_suggestions_dismissed_created_id ON suggestions (is_dismissed, created_at, id)",
+    "CREATE TABLE push_subscriptions (id INTEGER NOT NULL, endpoint TEXT NOT NULL, keys TEXT NOT NULL, "
+    "created_at DATETIME, PRIMARY KEY (id))",
+    "CREATE TABLE schema_version (version INTEGER PRIMARY KEY, description VARCHAR(255) NOT NULL, applied_at TIMESTAMP NOT NULL)",
+)
+
+def test_version_8_database_upgrades_to_head(tmp_path):
+    bind = create_engine(f"sqlite:///{tmp_path}/version8.db")
+    due = (datetime.utcnow() + timedelta(days=1)).strftime("%Y-%m-%d %H:%M:%S.%f")
+    with bind.begin() as conn:
+        for statement in VERSION_8:
+            conn.execute(text(statement))
+        conn.execute(
+            text("INSERT INTO schema_version VALUES (:v, :d, :t)"),
+            [{"v": v, "d": d, "t": datetime.utcnow()} for v, d, _ in MIGRATIONS if v <= 8],
+        )
+        conn.execute(text("INSERT INTO tasks (id, title, completed, due_date) VALUES (1, 'Existing', 0, :due)"), {"due": due})
+
+    assert run_migrations(bind) == MIGRATIONS[-1][0]
+
+    with bind.begin() as conn:
+        # Scheduled by migration 9's backfill; the row predates owners
+        assert conn.execute(text("SELECT key, user_id FROM scheduled_jobs")).all() == [("tasks:1", None)]
+        conn.execute(text("INSERT INTO tasks (id, title, completed, due_date, user_id) VALUES (2, 'Owned', 0, :due, 7)"), {"due": due})
+        conn.execute(text("UPDATE tasks SET user_id = 8 WHERE id = 1"))
+        owners = dict(conn.execute(text("SELECT key, user_id FROM scheduled_jobs")).all())
+    assert owners == {"tasks:1": 8, "tasks:2": 7}
+    bind.dispose()
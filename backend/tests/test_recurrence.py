@@ -0,0 +1,24 @@
+from datetime import datetime
+
+import pytest
+
+from app.core.recurrence import recurrence_end
+
+EVENT = {"title": "Check-in", "start_time": "2025-01-06T09:00:00", "end_time": "2025-01-06T09:15:00"}
+
+@pytest.mark.parametrize("rule", [
+    "FREQ=HOURLY;COUNT=100000000",
+    "FREQ=YEARLY;BYMONTH=2;BYMONTHDAY=30;UNTIL=99991231T000000Z",
+    "FREQ=HOURLY;UNTIL=20990101T000000Z",
+])
+def test_rules_too_long_to_walk_are_rejected(client, login, rule):
+    response = client.post("/api/calendar/", json={**EVENT, "rrule": rule}, headers=login())
+
+    assert response.status_code == 422
+
+def test_bounded_rule_ends_with_its_last_occurrence(client, login):
+    response = client.post("/api/calendar/", json={**EVENT, "rrule": "FREQ=DAILY;COUNT=10000"}, headers=login())
+
+    assert response.status_code == 200, response.text
+    start, end = datetime(2025, 1, 6, 9), datetime(2025, 1, 6, 9, 15)
+    assert recurrence_end("FREQ=DAILY;COUNT=10000", start, end) == datetime(2052, 5, 23, 9, 15)
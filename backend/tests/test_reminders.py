@@ -0,0 +1,44 @@
+import time
+from datetime import datetime, timedelta
+
+from app.core.push import get_push_sender
+
+def deliveries_to(endpoint, title, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        found = [d for d in get_push_sender().deliveries if d.endpoint == endpoint and d.payload["title"] == title]
+        if found:
+            return found
+        time.sleep(0.05)
+    return []
+
+def test_reminders_go_only_to_the_owners_subscriptions(client, login):
+    alice, bob = login(), login()
+    for name, headers in (("alice", alice), ("bob", bob), ("local", None)):
+        subscription = {"endpoint": f"https://push.example/{name}", "keys": "{}"}
+        assert client.post("/api/notifications/subscriptions", json=subscription, headers=headers).status_code == 200
+    due = (datetime.utcnow() + timedelta(minutes=5)).isoformat()
+
+    client.post("/api/tasks/", json={"title": "Alice's secret", "due_date": due}, headers=alice)
+
+    assert len(deliveries_to("https://push.example/alice", "Due soon: Alice's secret")) == 1
+    assert deliveries_to("https://push.example/bob", "Due soon: Alice's secret", timeout=0.2) == []
+    assert deliveries_to("https://push.example/local", "Due soon: Alice's secret", timeout=0.2) == []
+
+def test_notifications_are_listed_for_their_owner_only(client, login):
+    alice, bob = login(), login()
+    endpoint = {"endpoint": "https://push.example/shared-browser", "keys": "{}"}
+    subscription = client.post("/api/notifications/subscriptions", json=endpoint, headers=alice).json()
+    due = (datetime.utcnow() + timedelta(days=1)).isoformat()
+    task = client.post("/api/tasks/", json={"title": "Later", "due_date": due}, headers=alice).json()
+
+    reminders = client.get("/api/notifications/reminders", headers=alice).json()
+    assert [r["key"] for r in reminders] == [f"tasks:{task['id']}"]
+    assert client.get("/api/notifications/reminders", headers=bob).json() == []
+    assert client.get("/api/notifications/subscriptions", headers=bob).json() == []
+    assert client.delete(f"/api/notifications/subscriptions/{subscription['id']}", headers=bob).status_code == 404
+
+    # Signing in as someone else on the same browser hands the endpoint over
+    client.post("/api/notifications/subscriptions", json=endpoint, headers=bob)
+    assert [s["id"] for s in client.get("/api/notifications/subscriptions", headers=bob).json()] == [subscription["id"]]
+    assert client.get("/api/notifications/subscriptions", headers=alice).json() == []
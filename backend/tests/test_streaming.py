@@ -0,0 +1,23 @@
+def test_import_reports_validator_errors_as_422(client, login):
+    user = login()
+    event = '{"title": "Standup", "start_time": "2025-01-06T09:00:00", "end_time": "2025-01-06T09:15:00"'
+    body = f'{event}}}\n{event}, "rrule": "FREQ=BOGUS"}}\n'.encode()
+
+    response = client.post("/api/calendar/import", content=body, headers=user)
+
+    assert response.status_code == 422
+    detail = response.json()["detail"]
+    assert detail["line"] == 2
+    assert detail["imported"] == 1
+    assert "FREQ" in detail["errors"][0]["msg"]
+    assert len(client.get("/api/calendar/", headers=user).json()) == 1
+
+def test_export_round_trips_imported_rows(client, login):
+    user = login()
+    body = b'{"title": "first"}\n\n{"title": "second", "priority": "high"}\n'
+
+    assert client.post("/api/tasks/import", content=body, headers=user).json() == {"imported": 2}
+
+    lines = client.get("/api/tasks/export", headers=user).text.splitlines()
+    assert [line.count('"title"') for line in lines] == [1, 1]
+    assert '"second"' in lines[1] and '"high"' in lines[1]
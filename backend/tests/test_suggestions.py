@@ -0,0 +1,32 @@
+import json
+from datetime import datetime, timedelta
+
+from app.core.suggestions import suggestion_engine
+
+def test_suggestions_belong_to_the_owner_of_their_source(client, login):
+    alice, bob = login(), login()
+    now = datetime.utcnow()
+    overdue = {"title": "Private overdue", "priority": "high", "due_date": (now - timedelta(days=1)).isoformat()}
+    client.post("/api/tasks/", json=overdue, headers=alice)
+    email = {
+        "subject": "Meeting tomorrow at 3pm", "sender": "a@x.example", "recipient": "b@x.example",
+        "body": "", "received_at": now.isoformat(),
+    }
+    client.post("/api/email/", json=email, headers=alice)
+    start = (now + timedelta(days=2)).replace(microsecond=0)
+    event = {"start_time": start.isoformat(), "end_time": (start + timedelta(hours=1)).isoformat()}
+    ids = [client.post("/api/calendar/", json={**event, "title": "Alice's"}, headers=alice).json()["id"] for _ in range(2)]
+    client.post("/api/calendar/", json={**event, "title": "Bob's"}, headers=bob)
+    client.portal.call(suggestion_engine.settle)
+
+    mine = client.get("/api/suggestions/", headers=alice).json()
+    assert sorted(s["rule"] for s in mine) == ["calendar_conflict", "calendar_conflict", "meeting_email", "overdue_task"]
+    conflicts = {s["source_id"]: json.loads(s["action_data"])["conflicts_with"] for s in mine if s["rule"] == "calendar_conflict"}
+    assert conflicts == {ids[0]: [ids[1]], ids[1]: [ids[0]]}
+
+    theirs = client.get("/api/suggestions/", headers=bob).json()
+    local = client.get("/api/suggestions/").json()
+    assert not {s["id"] for s in mine} & {s["id"] for s in theirs + local}
+    assert client.patch(f"/api/suggestions/{mine[0]['id']}/dismiss", headers=bob).status_code == 404
+    assert client.get(f"/api/suggestions/{mine[0]['id']}").status_code == 404
+    assert client.delete(f"/api/suggestions/{mine[0]['id']}").status_code == 404
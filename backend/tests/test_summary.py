@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+
+COUNTS = ("unread_emails", "important_emails", "open_tasks", "overdue_tasks", "todays_events")
+
+def counts(client, headers=None):
+    summary = client.get("/api/summary/", headers=headers).json()
+    return {name: summary[name] for name in COUNTS}
+
+def test_summary_counts_only_the_callers_rows(client, login):
+    alice, bob = login(), login()
+    local = counts(client)
+    now = datetime.utcnow()
+
+    for i in range(3):
+        email = {"subject": f"Hello {i}", "sender": "a@x.example", "recipient": "b@x.example", "body": "", "received_at": now.isoformat()}
+        assert client.post("/api/email/", json=email, headers=alice).status_code == 200
+    overdue = {"title": "Overdue", "due_date": (now - timedelta(days=1)).isoformat()}
+    assert client.post("/api/tasks/", json=overdue, headers=alice).status_code == 200
+    event = {"title": "Today", "start_time": now.isoformat(), "end_time": (now + timedelta(minutes=1)).isoformat()}
+    assert client.post("/api/calendar/", json=event, headers=alice).status_code == 200
+
+    assert counts(client, alice) == {
+        "unread_emails": 3, "important_emails": 0, "open_tasks": 1, "overdue_tasks": 1, "todays_events": 1,
+    }
+    assert counts(client, bob) == dict.fromkeys(COUNTS, 0)
+    assert counts(client) == local
+
+def test_summary_cache_keeps_the_most_recent_owners(client, login, monkeypatch):
+    from app.api.routes import summary
+    monkeypatch.setattr(summary, "_CACHE_SIZE", 2)
+    users = [login() for _ in range(3)]
+    for headers in users:
+        counts(client, headers)
+    counts(client, users[1])
+    assert len(summary._cached) == 2
+    counts(client, users[0])
+    assert len(summary._cached) == 2